@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+目录扫描规模基准 - 用合成目录测量课程提取和按序号查找课程的开销随小节数的变化
+
+不启动浏览器、不联网：目录由fake_driver.generate_catalog生成（与超星目录相同的
+posCatalog_select firstLayer / posCatalog_name / catalog_points_yi prevTips / em.posCatalog_sbar 结构），
+每条WebDriver命令按--latency计入虚拟耗时，因此"虚拟耗时"近似真实浏览器中的往返开销。
+
+用法:
+    python bench_catalog.py
+    python bench_catalog.py --sizes 20 200 1200 --completed-ratio 0.8 --output catalog_scaling.json
+    python bench_catalog.py --html synthetic_pages   # 另存合成目录页面，便于在真实浏览器中对照
+"""
+
+import os
+import json
+import time
+import argparse
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import InvalidSelectorException
+from fake_driver import FakeClock, FakeChaoxingSite, FakeDriver, generate_catalog, catalog_page_html, quiet_logs
+from chaoxing_auto_learner import ChaoxingAutoLearner
+
+DEFAULT_SIZES = [10, 100, 1000, 5000]
+
+# xpath: get_uncompleted_courses的XPath主路径; fallback: XPath失败后逐个课程检查兄弟元素的备用路径
+MODES = ["xpath", "fallback"]
+
+
+def build_driver(size, completed_ratio, latency, mode, seed=0):
+    """构建带合成目录的假驱动；fallback模式下XPath查询直接失败"""
+    site = FakeChaoxingSite(FakeClock(), generate_catalog(size, completed_ratio, seed=seed))
+    driver = FakeDriver(site, latency=latency)
+    if mode == "fallback":
+        original_select = driver._select
+
+        def select(root, by, value):
+            if by == By.XPATH:
+                raise InvalidSelectorException("基准测试: 强制走备用路径")
+            return original_select(root, by, value)
+
+        driver._select = select
+    return driver
+
+
+def measure(driver, operation):
+    """返回(结果, 实际毫秒, 虚拟秒, 命令数)"""
+    commands_before = driver.command_total
+    virtual_before = driver.clock.now
+    started = time.perf_counter()
+    with driver.clock.patched():
+        result = operation()
+    real_ms = (time.perf_counter() - started) * 1000
+    return result, real_ms, driver.clock.now - virtual_before, driver.command_total - commands_before
+
+
+def bench_size(size, completed_ratio, latency, mode):
+    driver = build_driver(size, completed_ratio, latency, mode)
+    learner = ChaoxingAutoLearner(driver=driver)
+    courses, scan_ms, scan_virtual, scan_commands = measure(driver, learner.get_uncompleted_courses)
+
+    # 按序号重新查找最后一个未完成课程（handle_click每个课程都会做一次，两种模式都走XPath）
+    if mode == "fallback":
+        del driver._select
+    lookup_index = max(len(courses) - 1, 0)
+    _, lookup_ms, lookup_virtual, lookup_commands = measure(
+        driver, lambda: learner.find_course_element(lookup_index))
+
+    return {
+        "sections": size,
+        "mode": mode,
+        "uncompleted": len(courses),
+        "scan_real_ms": round(scan_ms, 2),
+        "scan_virtual_seconds": round(scan_virtual, 3),
+        "scan_commands": scan_commands,
+        "lookup_real_ms": round(lookup_ms, 2),
+        "lookup_virtual_seconds": round(lookup_virtual, 3),
+        "lookup_commands": lookup_commands,
+    }
+
+
+def run_benchmark(sizes=None, completed_ratio=0.5, latency=0.005, modes=None):
+    """按规模依次测量，返回每个(规模, 模式)一行的结果列表"""
+    rows = []
+    with quiet_logs():
+        for mode in modes or MODES:
+            for size in sizes or DEFAULT_SIZES:
+                rows.append(bench_size(size, completed_ratio, latency, mode))
+    return rows
+
+
+def print_table(rows, latency):
+    print("=" * 96)
+    print(f"目录扫描规模基准（每条命令延迟 {latency * 1000:.1f}ms，虚拟耗时含get_uncompleted_courses中固定的2秒等待）")
+    print("-" * 96)
+    print(f"{'模式':<10}{'小节数':>8}{'未完成':>8}{'扫描命令':>10}{'扫描虚拟耗时':>14}{'扫描实际耗时':>14}"
+          f"{'查找命令':>10}{'查找虚拟耗时':>14}")
+    for row in rows:
+        print(f"{row['mode']:<10}{row['sections']:>8}{row['uncompleted']:>8}{row['scan_commands']:>10}"
+              f"{row['scan_virtual_seconds']:>13.2f}s{row['scan_real_ms']:>12.1f}ms"
+              f"{row['lookup_commands']:>10}{row['lookup_virtual_seconds']:>13.3f}s")
+    print("-" * 96)
+
+    # 扫描曲线的斜率：每多一个小节增加多少条命令
+    for mode in MODES:
+        points = [r for r in rows if r["mode"] == mode]
+        if len(points) >= 2:
+            first, last = points[0], points[-1]
+            slope = (last["scan_commands"] - first["scan_commands"]) / max(last["sections"] - first["sections"], 1)
+            print(f"{mode}: 每个小节约 {slope:.2f} 条WebDriver命令")
+    print("=" * 96)
+
+
+def write_pages(directory, sizes, completed_ratio):
+    os.makedirs(directory, exist_ok=True)
+    for size in sizes:
+        path = os.path.join(directory, f"catalog_{size}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(catalog_page_html(generate_catalog(size, completed_ratio)))
+        print(f"已保存合成目录: {path}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="目录扫描规模基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="目录小节数")
+    parser.add_argument("--completed-ratio", type=float, default=0.5, help="已完成小节比例")
+    parser.add_argument("--latency", type=float, default=0.005, help="每条WebDriver命令的往返延迟（秒）")
+    parser.add_argument("--mode", choices=MODES, action="append", help="只测某个路径（可重复）")
+    parser.add_argument("--output", help="把结果写入JSON文件")
+    parser.add_argument("--html", metavar="DIR", help="另存合成目录页面")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.html:
+        write_pages(args.html, args.sizes, args.completed_ratio)
+    rows = run_benchmark(args.sizes, args.completed_ratio, args.latency, args.mode)
+    print_table(rows, args.latency)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"latency": args.latency, "completed_ratio": args.completed_ratio, "rows": rows},
+                      f, ensure_ascii=False, indent=2)
+        print(f"结果已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
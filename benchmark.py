@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基准回归检查 - 在假驱动上测量关键路径，保存带机器信息的JSON基线，并与基线对比
+
+测量的路径：
+    catalog_scan         get_uncompleted_courses（100个小节的合成目录）
+    iframe_switch        switch_to_video_iframe
+    video_status_probe   check_video_status
+    course_cycle         study_course 完整跑一个5分钟视频的课程（含wait_for_course_completion的轮询）
+
+每个路径记录三项：虚拟耗时（含time.sleep和按--latency计的命令往返，结果确定）、
+WebDriver命令数（确定）、实际耗时（中位数，受机器负载影响）。
+多加一个time.sleep会让虚拟耗时变大，多一次find_elements会让命令数变多，对比时都会被标出。
+实际耗时只作参考：超过阈值时会提示，但不算回归，不影响退出码。
+
+用法:
+    python benchmark.py run                      # 只测量并输出
+    python benchmark.py save                     # 测量并保存为 baselines/<版本>_<提交>.json
+    python benchmark.py compare                  # 与最新基线对比，有回归时退出码为1
+    python benchmark.py compare --baseline baselines/1.4.6_abc1234.json --threshold 0.05
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import platform
+import argparse
+import statistics
+import subprocess
+from datetime import datetime
+import selenium
+from fake_driver import FakeClock, FakeChaoxingSite, FakeDriver, generate_catalog, quiet_logs, simulated_config
+from chaoxing_auto_learner import ChaoxingAutoLearner, __version__
+
+BASELINE_DIR = "baselines"
+SCHEMA_VERSION = 1
+
+# 对比时的默认阈值（相对基线的增幅）
+DEFAULT_THRESHOLD = 0.10  # 虚拟耗时和命令数是确定的，10%足够区分，超过即为回归
+DEFAULT_REAL_THRESHOLD = 0.50  # 实际耗时波动大，只在超过阈值时提示，不算回归
+REAL_MS_FLOOR = 1.0  # 实际耗时增加不足1毫秒时不提示（亚毫秒级路径的抖动）
+
+
+# ---------------------------------------------------------------- 测量路径
+
+def _open_player(size=1, duration=300, playing=False):
+    """构建已打开第一个小节、播放器已加载的假站点"""
+    site = FakeChaoxingSite(FakeClock(), generate_catalog(size, completed_ratio=0, duration=duration))
+    site.open_section(site.sections[0])
+    site.clock.advance(site.player_ready_delay)
+    site.tick()
+    if playing:
+        site.videos[0].play()
+    return site
+
+
+def _learner(driver):
+    learner = ChaoxingAutoLearner(driver=driver)
+    learner.setup_driver()
+    return learner
+
+
+def setup_catalog_scan(latency):
+    driver = FakeDriver(FakeChaoxingSite(FakeClock(), generate_catalog(100, completed_ratio=0.5)), latency=latency)
+    learner = _learner(driver)
+    return driver, learner.get_uncompleted_courses
+
+
+def setup_iframe_switch(latency):
+    driver = FakeDriver(_open_player(), latency=latency)
+    learner = _learner(driver)
+    return driver, learner.switch_to_video_iframe
+
+
+def setup_video_status_probe(latency):
+    driver = FakeDriver(_open_player(playing=True), latency=latency)
+    learner = _learner(driver)
+    return driver, learner.check_video_status
+
+
+def setup_course_cycle(latency):
+    site = FakeChaoxingSite(FakeClock(), generate_catalog(1, completed_ratio=0, duration=300))
+    driver = FakeDriver(site, latency=latency)
+    learner = _learner(driver)
+    course_info = {"title": site.sections[0].title, "chapter_number": site.sections[0].chapter_number,
+                   "onclick": "", "index": 0}
+    return driver, lambda: learner.study_course(course_info)
+
+
+BENCHMARKS = {
+    "catalog_scan": setup_catalog_scan,
+    "iframe_switch": setup_iframe_switch,
+    "video_status_probe": setup_video_status_probe,
+    "course_cycle": setup_course_cycle,
+}
+
+
+def measure(name, latency, repeat):
+    """每次重新构建站点后测量一次，虚拟耗时和命令数取第一次，实际耗时取中位数"""
+    samples = []
+    for _ in range(repeat):
+        driver, operation = BENCHMARKS[name](latency)
+        commands_before = driver.command_total
+        virtual_before = driver.clock.now
+        started = time.perf_counter()
+        with driver.clock.patched():
+            operation()
+        samples.append((driver.clock.now - virtual_before, driver.command_total - commands_before,
+                        (time.perf_counter() - started) * 1000))
+    virtual_seconds, commands, _ = samples[0]
+    return {
+        "virtual_seconds": round(virtual_seconds, 3),
+        "commands": commands,
+        "real_ms": round(statistics.median(s[2] for s in samples), 3),
+    }
+
+
+def run_benchmarks(names=None, latency=0.005, repeat=5):
+    """运行基准，返回{路径: 指标}；关闭校准避免本地latency_profile.json影响等待时间"""
+    with simulated_config(), quiet_logs():
+        return {name: measure(name, latency, repeat) for name in names or BENCHMARKS}
+
+
+# ---------------------------------------------------------------- 基线
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def machine_info():
+    return {
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "selenium": selenium.__version__,
+    }
+
+
+def build_baseline(results, latency, repeat):
+    return {
+        "schema": SCHEMA_VERSION,
+        "version": __version__,
+        "commit": git_commit(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "machine": machine_info(),
+        "latency": latency,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def save_baseline(baseline, directory=BASELINE_DIR):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{baseline['version']}_{baseline['commit']}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def load_baseline(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def latest_baseline(directory=BASELINE_DIR):
+    paths = glob.glob(os.path.join(directory, "*.json"))
+    if not paths:
+        return None
+    return max(paths, key=lambda p: load_baseline(p).get("created", ""))
+
+
+def compare(baseline, results, threshold=DEFAULT_THRESHOLD, real_threshold=DEFAULT_REAL_THRESHOLD):
+    """返回对比行列表：(路径, 指标, 基线值, 当前值, 变化比例, 是否回归, 是否变慢)
+
+    只有虚拟耗时和命令数会被判为回归；实际耗时超过阈值时只标记变慢（仅供参考）。
+    """
+    thresholds = {"virtual_seconds": threshold, "commands": threshold, "real_ms": real_threshold}
+    rows = []
+    for name, current in results.items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        for metric, limit in thresholds.items():
+            old, new = base.get(metric), current.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old else (0.0 if new == old else float("inf"))
+            if metric == "real_ms":
+                regressed = False
+                slower = change > limit and new - old >= REAL_MS_FLOOR
+            else:
+                regressed = slower = change > limit
+            rows.append((name, metric, old, new, change, regressed, slower))
+    return rows
+
+
+# ---------------------------------------------------------------- 命令行
+
+def print_results(results):
+    print(f"{'路径':<22}{'虚拟耗时':>12}{'命令数':>10}{'实际耗时':>12}")
+    for name, result in results.items():
+        print(f"{name:<22}{result['virtual_seconds']:>11.2f}s{result['commands']:>10}{result['real_ms']:>10.2f}ms")
+
+
+def print_comparison(rows):
+    print(f"{'路径':<22}{'指标':<18}{'基线':>12}{'当前':>12}{'变化':>10}")
+    for name, metric, old, new, change, regressed, slower in rows:
+        flag = "  ❌ 回归" if regressed else ("  ⚠️ 变慢（仅供参考）" if slower else "")
+        print(f"{name:<22}{metric:<18}{old:>12}{new:>12}{change:>+9.1%}{flag}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="基准回归检查")
+    parser.add_argument("command", choices=["run", "save", "compare"])
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="只测量部分路径")
+    parser.add_argument("--latency", type=float, default=None, help="每条WebDriver命令的往返延迟（秒），对比时默认沿用基线的值")
+    parser.add_argument("--repeat", type=int, default=5, help="每个路径重复次数（实际耗时取中位数）")
+    parser.add_argument("--baseline", help="对比用的基线文件，默认为baselines/下最新的一份")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="虚拟耗时和命令数的回归阈值")
+    parser.add_argument("--real-threshold", type=float, default=DEFAULT_REAL_THRESHOLD, help="实际耗时的提示阈值（不算回归）")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.command == "compare":
+        path = args.baseline or latest_baseline()
+        if path is None:
+            print(f"❌ {BASELINE_DIR}/ 下没有基线，请先运行: python benchmark.py save")
+            return 2
+        baseline = load_baseline(path)
+        latency = baseline["latency"] if args.latency is None else args.latency
+        results = run_benchmarks(args.only, latency, args.repeat)
+        print(f"基线: {path} (版本 {baseline['version']}, 提交 {baseline['commit']}, {baseline['created']})")
+        if baseline["machine"] != machine_info():
+            print("⚠️ 基线来自不同的机器或环境，实际耗时仅供参考")
+        rows = compare(baseline, results, args.threshold, args.real_threshold)
+        print_comparison(rows)
+        regressions = [row for row in rows if row[5]]
+        if regressions:
+            print(f"❌ 发现 {len(regressions)} 项回归")
+            return 1
+        print("✅ 没有超过阈值的回归")
+        return 0
+
+    latency = 0.005 if args.latency is None else args.latency
+    results = run_benchmarks(args.only, latency, args.repeat)
+    print_results(results)
+    if args.command == "save":
+        path = save_baseline(build_baseline(results, latency, args.repeat))
+        print(f"基线已保存: {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
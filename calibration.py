@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+超时自动校准 - 记录目录加载、播放器就绪、倍速菜单就绪等实际延迟，
+按滚动百分位（默认p99 × 1.5）推算各等待时间，结果保存在本地文件中
+
+网速快的用户不用再每次都付出最坏情况的等待；网速慢的用户样本偏大，
+推算出的超时也随之变大（最多为默认值的CALIBRATION_MAX_FACTOR倍），安全余量不变。
+"""
+
+import os
+import json
+import logging
+from config import Config
+
+# 各等待时间配置项由哪个延迟指标推算
+TIMEOUT_METRICS = {
+    "VIDEO_WAIT_TIME": "player_ready",        # 点击课程 -> 视频iframe中出现播放按钮
+    "PLAY_BUTTON_WAIT": "player_ready",
+    "PLAYBACK_SPEED_WAIT": "rate_menu_ready",  # 点击播放 -> 出现倍速控件
+    "PAGE_LOAD_WAIT": "catalog_load",          # 点击目录 -> 目录项出现
+    # FACE_RECOGNITION_WAIT 等的是人脸识别弹窗稳定，没有可测量的对应指标，不参与校准
+}
+
+
+def percentile(samples, p):
+    """最近秩法计算百分位"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(1, int(-(-p * len(ordered) // 100)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class LatencyProfile:
+    """本地延迟样本（每个指标保留最近LATENCY_WINDOW个）"""
+
+    def __init__(self, path=None):
+        self.path = path or Config.LATENCY_PROFILE_FILE
+        self.samples = {}
+        self.logger = logging.getLogger(__name__)
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.samples = {name: [float(v) for v in values] for name, values in data.get("samples", {}).items()}
+        except Exception as e:
+            self.logger.warning(f"读取延迟记录失败，将重新统计: {e}")
+            self.samples = {}
+
+    def save(self):
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump({"samples": self.samples, "percentiles": self.describe()}, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            self.logger.warning(f"保存延迟记录失败: {e}")
+
+    def record(self, metric, seconds):
+        values = self.samples.setdefault(metric, [])
+        values.append(round(float(seconds), 3))
+        del values[:-Config.LATENCY_WINDOW]
+
+    def percentile(self, metric, p):
+        return percentile(self.samples.get(metric, []), p)
+
+    def describe(self):
+        return {
+            metric: {
+                "count": len(values),
+                "p50": percentile(values, 50),
+                "p90": percentile(values, 90),
+                "p99": percentile(values, 99),
+            }
+            for metric, values in self.samples.items()
+        }
+
+    def timeout(self, name):
+        """返回配置项name的校准值；样本不足或未开启校准时返回Config中的默认值"""
+        default = getattr(Config, name)
+        metric = TIMEOUT_METRICS.get(name)
+        if not Config.AUTO_CALIBRATE or metric is None:
+            return default
+        values = self.samples.get(metric, [])
+        if len(values) < Config.CALIBRATION_MIN_SAMPLES:
+            return default
+        value = percentile(values, Config.CALIBRATION_PERCENTILE) * Config.CALIBRATION_MARGIN
+        return round(min(max(value, Config.CALIBRATION_MIN_TIMEOUT), default * Config.CALIBRATION_MAX_FACTOR), 1)
+
+    def timeouts(self):
+        return {name: self.timeout(name) for name in TIMEOUT_METRICS}
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+目录状态监听 - 在页面中用MutationObserver收集课程任务点的完成变化，学习程序只取上次以来的变化
+
+原来每学完一个课程都要回到目录（点击目录标签）、等待页面稳定，再用XPath重新扫描整个目录。
+任务点完成后，目录中该课程的 span.catalog_points_yi prevTips 会被替换成已完成图标，
+页面中的MutationObserver可以直接记下这个变化：
+    install()  在主文档的目录上挂监听，记录当前每个课程是否有待完成任务点
+    take()     一次调用取回上次以来状态变化的课程 [{title, chapter_number, pending}]，
+               页面刷新后监听随文档消失，返回None，调用方重新扫描目录并重新install()
+"""
+
+import logging
+
+CATALOG_WATCH_JS = """
+return (function () {
+    if (window.__cxCatalog) window.__cxCatalog.disconnect();
+    var all = document.querySelectorAll('.posCatalog_select');
+    if (!all.length) return false;
+
+    function describe(entry) {
+        var name = entry.querySelector('span.posCatalog_name');
+        if (!name) return null;
+        var sbar = name.querySelector('em.posCatalog_sbar');
+        var next = name.nextElementSibling;
+        return {
+            title: name.getAttribute('title') || name.textContent.trim(),
+            chapter_number: sbar ? sbar.textContent.trim() : '',
+            pending: !!next && (next.className || '').indexOf('catalog_points_yi prevTips') >= 0
+        };
+    }
+    function key(d) { return d.chapter_number + '|' + d.title; }
+
+    // 监听所有目录项的最近公共祖先
+    var root = all[0].parentNode, last = all[all.length - 1];
+    while (root && !root.contains(last)) root = root.parentNode;
+
+    var known = {}, changes = [];
+    for (var i = 0; i < all.length; i++) {
+        var d = describe(all[i]);
+        if (d) known[key(d)] = d.pending;
+    }
+
+    var observer = new MutationObserver(function (records) {
+        var touched = [];
+        function add(node) {
+            if (node && touched.indexOf(node) < 0) touched.push(node);
+        }
+        records.forEach(function (record) {
+            var target = record.target.nodeType === 1 ? record.target : record.target.parentNode;
+            var entry = target && target.closest ? target.closest('.posCatalog_select') : null;
+            if (entry) {
+                add(entry);
+                return;
+            }
+            // 目录整体重新渲染时新增的目录项
+            Array.prototype.forEach.call(record.addedNodes, function (node) {
+                if (node.nodeType !== 1) return;
+                if (node.matches('.posCatalog_select')) add(node);
+                Array.prototype.forEach.call(node.querySelectorAll('.posCatalog_select'), add);
+            });
+        });
+        touched.forEach(function (entry) {
+            var d = describe(entry);
+            if (!d || known[key(d)] === d.pending) return;
+            known[key(d)] = d.pending;
+            changes.push(d);
+        });
+    });
+    observer.observe(root, {childList: true, subtree: true, characterData: true,
+                            attributes: true, attributeFilter: ['class']});
+
+    window.__cxCatalog = {
+        take: function () { var out = changes; changes = []; return out; },
+        disconnect: function () { observer.disconnect(); }
+    };
+    return true;
+})();
+"""
+
+CATALOG_TAKE_JS = "return window.__cxCatalog ? window.__cxCatalog.take() : null;"
+
+
+def course_key(course):
+    return course.get("chapter_number", ""), course.get("title", "")
+
+
+class CatalogWatcher:
+    """主文档中的目录变化监听"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.logger = logging.getLogger(__name__)
+        self.installed = False
+
+    def install(self):
+        """在当前（主）文档的目录上挂监听，目录不存在或脚本失败时返回False"""
+        try:
+            self.installed = bool(self.driver.execute_script(CATALOG_WATCH_JS))
+        except Exception as e:
+            self.logger.debug(f"挂载目录监听失败: {e}")
+            self.installed = False
+        if self.installed:
+            self.logger.info("👀 已开始监听目录中的任务点变化")
+        return self.installed
+
+    def take(self):
+        """取回上次以来的变化；监听已随页面刷新消失时返回None"""
+        if not self.installed:
+            return None
+        try:
+            self.driver.switch_to.default_content()
+            changes = self.driver.execute_script(CATALOG_TAKE_JS)
+        except Exception as e:
+            self.logger.debug(f"读取目录变化失败: {e}")
+            changes = None
+        if changes is None:
+            self.installed = False
+            self.logger.info("目录监听已失效（页面可能已刷新）")
+        return changes
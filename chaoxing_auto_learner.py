@@ -1,14 +1,34 @@
 import time
 import logging
+from collections import Counter
+from contextlib import nullcontext
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException, \
+    ElementClickInterceptedException, ElementNotInteractableException
 from webdriver_manager.chrome import ChromeDriverManager
 from config import Config
+from state_machine import CourseState, CourseContext, CourseStateMachine, StateMetrics
+from timeline import RunTimeline, parse_playback_rate, format_bytes
+from calibration import LatencyProfile
+from tracing import span, traced
+from status_server import StatusServer
+from screenshots import ScreenshotBuffer
+from player_helper import PlayerHelper
+from catalog_watch import CatalogWatcher, course_key
+from network_observer import NetworkObserver, enable_performance_log
+from checkpoint import CourseCheckpoint
+from retry_policy import RetryPolicy
+from dom_fingerprint import DomFingerprints
+from element_cache import ElementCache
+from diagnostics import FailureDiagnostics, PLAY_BUTTON_SELECTORS, FACE_POPUP_SELECTORS, FACE_TEXTS
+from preflight import resolve_driver_path
+
+__version__ = "1.4.6"
 
 # 配置日志
 logging.basicConfig(
@@ -21,13 +41,132 @@ logging.basicConfig(
 )
 
 class ChaoxingAutoLearner:
-    def __init__(self):
-        self.driver = None
+    VIDEO_STATUS_MESSAGES = {
+        "completed": "✅ 视频播放完成",
+        "playing": "📺 视频正在播放中...",
+        "paused": "⏸️ 视频已暂停",
+        "stalled": "🧊 视频卡住，播放进度不再前进",
+        "unknown": "❓ 视频状态未知",
+    }
+    
+    # 目录中带待完成任务点（catalog_points_yi prevTips）的课程名
+    UNCOMPLETED_COURSE_XPATH = "//span[@class='catalog_points_yi prevTips']/preceding-sibling::span[@class='posCatalog_name'][1]"
+    
+    # 轮询就绪状态用的脚本（一次往返，不受隐式等待影响）
+    CATALOG_READY_JS = "return document.querySelectorAll('span.posCatalog_name').length > 0;"
+    PLAYER_READY_JS = """
+        try {
+            var main = document.getElementById('iframe');
+            var doc = main && main.contentDocument;
+            if (!doc) return false;
+            var frames = doc.querySelectorAll('iframe.ans-insertvideo-online');
+            for (var i = 0; i < frames.length; i++) {
+                var inner = frames[i].contentDocument;
+                if (inner && inner.querySelector('.vjs-big-play-button')) return true;
+            }
+            return false;
+        } catch (e) { return false; }
+    """
+    PLAY_BUTTON_READY_JS = "return document.querySelector('.vjs-big-play-button') !== null;"
+    # 主iframe中的视频任务点iframe，任务点统计和切换视频iframe时的序号都按它计算
+    VIDEO_IFRAME_SELECTOR = "iframe.ans-insertvideo-online"
+    # 在主iframe中列出所有视频任务点及其是否已完成（已完成的任务点外层有ans-job-finished）
+    VIDEO_TASK_POINTS_JS = (
+        "return Array.from(document.querySelectorAll('" + VIDEO_IFRAME_SELECTOR + "'))"
+        ".map(function (f) { return !!f.closest('.ans-job-finished'); });"
+    )
+    RATE_MENU_READY_JS = "return document.querySelector('div.vjs-playback-rate-value') !== null;"
+    # 页面（含隐藏元素）中是否有人脸识别相关文本，代替读取整个page_source
+    FACE_TEXT_JS = ("var text = document.documentElement ? document.documentElement.textContent : '';"
+                    "return arguments[0].some(function (t) { return text.indexOf(t) >= 0; });")
+    
+    def __init__(self, driver=None, profiler=None):
+        # driver: 可传入已创建的驱动（如fake_driver.FakeDriver），此时不再启动Chrome
+        # profiler: 可传入profiler.RunProfiler，每个课程单独输出性能分析文件
+        self.driver = driver
+        self.profiler = profiler
         self.wait = None
         self.logger = logging.getLogger(__name__)
         
+        # 课程学习状态机及各状态耗时统计
+        self.course_machine = CourseStateMachine(
+            handlers={
+                CourseState.NAVIGATE: self.handle_navigate,
+                CourseState.CLICK: self.handle_click,
+                CourseState.PLAYER_READY: self.handle_player_ready,
+                CourseState.PLAYING: self.handle_playing,
+                CourseState.ENDED: self.handle_ended,
+                CourseState.CLEANUP: self.handle_cleanup,
+            },
+            timeouts=Config.STATE_TIMEOUTS,
+            on_timeout=self.handle_state_timeout,
+            logger=self.logger,
+        )
+        self.course_state_metrics = []
+        self.run_state_metrics = StateMetrics()
+        
+        # 每个课程的关键节点时间线
+        self.timeline = RunTimeline("run", version=__version__)
+        
+        # 实测延迟，用于校准各等待时间
+        self.latency = LatencyProfile()
+        
+        # 最近一次探测到的视频属性（当前时间、总时长、播放倍速）及探测时间
+        self.last_video_probe = None
+        self.last_video_probe_at = None
+        
+        # 运行进度和计数（状态接口读取）
+        self.course_position = 0
+        self.course_total = 0
+        self.counters = Counter()
+        self.status_server = None
+        
+        # 卡顿检测：上次播放进度前进的位置和时间，以及当前这次卡顿的开始时间
+        self.video_progress = None
+        self.stall_started = None
+        self.stall_reload_started = None  # 因卡顿重新打开课程时那次卡顿的开始时间，重新打开后进度前进时记为恢复
+        
+        # 当前正在处理的视频任务点（小节内第几个视频iframe）
+        self.current_video_index = 0
+        
+        # 后台截图缓冲（课程失败或超时时写盘）
+        self.screenshots = None
+        
+        # 播放器控制脚本（播放、设置倍速、读取状态各一次调用）
+        self.player_helper = None
+        
+        # 目录状态监听，以及按目录顺序排列的未完成课程（学完后由监听到的变化更新）
+        self.catalog_watcher = None
+        self.catalog_view = []
+        
+        # 播放器进度上报响应的观察（只读），服务器确认完成的课程不再回到目录重新扫描，全部学完后统一核对
+        self.network_observer = None
+        self.confirmed_courses = set()
+        self.catalog_unverified = False
+        
+        # 统一的重试策略（指数退避 + 随机抖动，单个操作和单个课程的重试等待都有上限）
+        self.retry = RetryPolicy(on_retry=self.note_retry)
+        
+        # 目录和播放器的结构指纹（与上次正常时比较，发现改版时报警并保存快照）
+        self.fingerprints = None
+        # 本课程是否靠逐个扫描iframe才找到视频，以及上次扫描成功的iframe序号（下次先试它）
+        self.video_frame_fallback = False
+        self.video_frame_hint = None
+        
+        # 按frame路径缓存的iframe和视频元素句柄，状态检查时只探测是否仍在页面中
+        self.elements = None
+        self.video_frame_path = None  # 当前视频iframe在缓存中的路径
+        
+        # 失败时抓取frame树快照，在后台线程中分析选择器
+        self.diagnostics = None
+        self.diagnosed = set()  # 当前课程已提交诊断的原因，每个原因每个课程只抓取一次
+        
     def setup_driver(self):
         """设置Chrome浏览器驱动"""
+        if self.driver is not None:
+            self.logger.info("使用外部传入的浏览器驱动")
+            return self.configure_driver()
+        
         try:
             chrome_options = Options()
             if Config.BROWSER_HEADLESS:
@@ -40,16 +179,16 @@ class ChaoxingAutoLearner:
             chrome_options.add_argument("--allow-running-insecure-content")
             chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
             chrome_options.add_experimental_option('useAutomationExtension', False)
+            if Config.NETWORK_OBSERVER_ENABLED:
+                enable_performance_log(chrome_options)
             
             # 尝试多种方式获取ChromeDriver
             driver_path = None
             try:
-                # 方法1: 优先使用项目根目录的chromedriver.exe
-                import os
-                current_dir = os.path.dirname(os.path.abspath(__file__))
-                chromedriver_path = os.path.join(current_dir, "chromedriver.exe")
+                # 方法1: 优先使用项目根目录的chromedriver.exe（与启动前检查使用同一个查找函数）
+                chromedriver_path = resolve_driver_path()
                 
-                if os.path.exists(chromedriver_path):
+                if chromedriver_path is not None:
                     self.logger.info(f"使用本地ChromeDriver: {chromedriver_path}")
                     service = Service(chromedriver_path)
                     self.driver = webdriver.Chrome(service=service, options=chrome_options)
@@ -82,14 +221,7 @@ class ChaoxingAutoLearner:
                 service = Service(driver_path)
                 self.driver = webdriver.Chrome(service=service, options=chrome_options)
             
-            self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-            
-            self.driver.implicitly_wait(Config.IMPLICIT_WAIT)
-            self.driver.set_page_load_timeout(Config.PAGE_LOAD_TIMEOUT)
-            self.wait = WebDriverWait(self.driver, Config.IMPLICIT_WAIT)
-            
-            self.logger.info("浏览器驱动设置成功")
-            return True
+            return self.configure_driver()
             
         except Exception as e:
             self.logger.error(f"设置浏览器驱动失败: {e}")
@@ -99,11 +231,45 @@ class ChaoxingAutoLearner:
             self.logger.error("3. 或者降级Chrome浏览器版本")
             return False
     
-    def login(self):
-        """登录超星平台"""
+    def configure_driver(self):
+        """设置驱动的等待时间等通用参数"""
+        self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        
+        self.driver.implicitly_wait(Config.IMPLICIT_WAIT)
+        self.driver.set_page_load_timeout(Config.PAGE_LOAD_TIMEOUT)
+        self.wait = WebDriverWait(self.driver, Config.IMPLICIT_WAIT)
+        
+        if Config.SCREENSHOT_BUFFER_ENABLED and self.screenshots is None:
+            self.screenshots = ScreenshotBuffer(self.driver)
+        
+        if Config.PLAYER_HELPER_ENABLED and self.player_helper is None:
+            self.player_helper = PlayerHelper(self.driver)
+            self.player_helper.register()
+        
+        if Config.CATALOG_WATCH_ENABLED and self.catalog_watcher is None:
+            self.catalog_watcher = CatalogWatcher(self.driver)
+        
+        if Config.NETWORK_OBSERVER_ENABLED and self.network_observer is None:
+            self.network_observer = NetworkObserver(self.driver)
+        
+        if Config.FINGERPRINT_ENABLED and self.fingerprints is None:
+            self.fingerprints = DomFingerprints(self.driver)
+        
+        if self.elements is None:
+            self.elements = ElementCache(self.driver, self.logger)
+        
+        if Config.DIAGNOSTICS_ENABLED and self.diagnostics is None:
+            self.diagnostics = FailureDiagnostics(self.driver)
+        
+        self.logger.info("浏览器驱动设置成功")
+        return True
+    
+    @traced()
+    def login(self, course_url=None):
+        """登录超星平台（打开course_url，默认为Config.COURSE_URL）"""
         try:
             self.logger.info("开始登录超星平台...")
-            self.driver.get(Config.COURSE_URL)
+            self.driver.get(course_url or Config.COURSE_URL)
             
             # 等待登录页面加载
             time.sleep(3)
@@ -139,6 +305,7 @@ class ChaoxingAutoLearner:
             self.logger.error(f"登录失败: {e}")
             return False
     
+    @traced()
     def navigate_to_catalog(self):
         """导航到课程目录"""
         try:
@@ -164,7 +331,8 @@ class ChaoxingAutoLearner:
             )
             catalog_tab.click()
             
-            time.sleep(3)
+            self.poll_until(lambda: self.driver.execute_script(self.CATALOG_READY_JS),
+                            self.wait_time("PAGE_LOAD_WAIT"), metric="catalog_load")
             self.logger.info("已进入课程目录")
             return True
             
@@ -172,24 +340,7 @@ class ChaoxingAutoLearner:
             self.logger.error(f"导航到目录失败: {e}")
             return False
     
-    def retry_operation(self, operation, max_retries=3, operation_name="操作"):
-        """重试操作，处理stale element等问题"""
-        for attempt in range(max_retries):
-            try:
-                return operation()
-            except StaleElementReferenceException as e:
-                if attempt == max_retries - 1:
-                    self.logger.error(f"{operation_name}失败，元素已过期: {e}")
-                    raise e
-                self.logger.warning(f"{operation_name}遇到stale element，重试中... (尝试 {attempt + 1}/{max_retries})")
-                time.sleep(2)
-            except Exception as e:
-                if attempt == max_retries - 1:
-                    self.logger.error(f"{operation_name}失败: {e}")
-                    raise e
-                self.logger.warning(f"{operation_name}失败，重试中... (尝试 {attempt + 1}/{max_retries})")
-                time.sleep(2)
-    
+    @traced()
     def get_uncompleted_courses(self):
         """获取未完成的课程列表"""
         try:
@@ -199,47 +350,20 @@ class ChaoxingAutoLearner:
             # 等待页面完全加载
             time.sleep(2)
             
-            # 直接查找所有带有待完成任务点的课程
-            # 使用XPath查找：catalog_points_yi prevTips元素前面的posCatalog_name元素
-            xpath_selector = "//span[@class='catalog_points_yi prevTips']/preceding-sibling::span[@class='posCatalog_name'][1]"
-            
+            # 直接查找所有带有待完成任务点的课程（目录重新渲染导致元素过期时按重试策略重新扫描）
             try:
-                uncompleted_elements = self.driver.find_elements(By.XPATH, xpath_selector)
-                self.logger.info(f"使用XPath找到 {len(uncompleted_elements)} 个未完成课程")
-                
-                for i, element in enumerate(uncompleted_elements):
-                    try:
-                        # 获取课程信息
-                        course_title = element.get_attribute("title")
-                        course_text = element.text.strip()
-                        onclick = element.get_attribute("onclick")
-                        
-                        # 获取章节编号
-                        chapter_number = ""
-                        try:
-                            sbar_element = element.find_element(By.CSS_SELECTOR, "em.posCatalog_sbar")
-                            chapter_number = sbar_element.text.strip()
-                        except:
-                            pass
-                        
-                        uncompleted_courses.append({
-                            'element': element,
-                            'title': course_title or course_text,
-                            'onclick': onclick,
-                            'chapter_number': chapter_number,
-                            'index': i
-                        })
-                        
-                        self.logger.info(f"发现未完成课程 {i+1}: {course_title or course_text} ({chapter_number})")
-                        
-                    except Exception as e:
-                        self.logger.warning(f"处理未完成课程 {i} 时出错: {e}")
-                        continue
-                
+                uncompleted_courses = self.retry.call(self.scan_uncompleted_courses, "扫描目录")
+                # 没有未完成课程但目录中仍有小节时是正常的全部完成；连小节都找不到时可能是选择器已失效，只比较不更新记录
+                healthy = bool(uncompleted_courses) or \
+                    bool(self.driver.find_elements(By.CSS_SELECTOR, Config.SELECTORS["course"]))
+                self.check_fingerprint("catalog", healthy=healthy,
+                                       hint="" if healthy else "如果课程确实已全部完成，可以忽略")
             except Exception as e:
                 self.logger.warning(f"XPath查找失败，尝试备用方法: {e}")
                 
                 # 备用方法：查找所有课程，然后检查后面的元素
+                self.note_fallback("catalog_scan")
+                self.check_fingerprint("catalog", healthy=False)
                 all_courses = self.driver.find_elements(By.CSS_SELECTOR, Config.SELECTORS["course"])
                 self.logger.info(f"备用方法找到 {len(all_courses)} 个课程")
                 
@@ -287,174 +411,838 @@ class ChaoxingAutoLearner:
             self.logger.error(f"获取未完成课程列表失败: {e}")
             return []
     
+    def scan_uncompleted_courses(self):
+        """用XPath查找：catalog_points_yi prevTips元素前面的posCatalog_name元素；元素过期时抛出异常由调用方重试"""
+        uncompleted_courses = []
+        uncompleted_elements = self.driver.find_elements(By.XPATH, self.UNCOMPLETED_COURSE_XPATH)
+        self.logger.info(f"使用XPath找到 {len(uncompleted_elements)} 个未完成课程")
+        
+        for i, element in enumerate(uncompleted_elements):
+            try:
+                # 获取课程信息
+                course_title = element.get_attribute("title")
+                course_text = element.text.strip()
+                onclick = element.get_attribute("onclick")
+                
+                # 获取章节编号
+                chapter_number = ""
+                try:
+                    sbar_element = element.find_element(By.CSS_SELECTOR, "em.posCatalog_sbar")
+                    chapter_number = sbar_element.text.strip()
+                except StaleElementReferenceException:
+                    raise
+                except:
+                    pass
+                
+                uncompleted_courses.append({
+                    'element': element,
+                    'title': course_title or course_text,
+                    'onclick': onclick,
+                    'chapter_number': chapter_number,
+                    'index': i
+                })
+                
+                self.logger.info(f"发现未完成课程 {i+1}: {course_title or course_text} ({chapter_number})")
+                
+            except StaleElementReferenceException:
+                # 目录已重新渲染，之前拿到的元素全部失效，整体重新扫描
+                raise
+            except Exception as e:
+                self.logger.warning(f"处理未完成课程 {i} 时出错: {e}")
+                continue
+        return uncompleted_courses
+    
     def study_course(self, course_info):
-        """学习指定课程"""
+        """学习指定课程（按状态机流转：目录 -> 点击 -> 播放器 -> 播放 -> 结束 -> 收尾）"""
+        course_title = course_info['title']
+        chapter_number = course_info.get('chapter_number', '')
+        self.logger.info(f"开始学习课程: {course_title} ({chapter_number})")
+        
+        self.timeline.start_course(course_info)
+        self.retry.start_course()
+        self.elements.clear()
+        self.video_frame_path = None
+        if self.screenshots is not None:
+            self.screenshots.reset()
+        self.diagnosed.clear()
+        bytes_before = self.network_bytes()
+        self.stall_started = None
+        self.stall_reload_started = None
+        self.current_video_index = 0
+        with span("study_course", title=course_title, chapter=chapter_number):
+            ctx = self.course_machine.run(CourseContext(course_info), start=CourseState.NAVIGATE)
+        self.record_state_metrics(course_title, ctx.metrics)
+        bytes_after = self.network_bytes()
+        if bytes_before is not None and bytes_after is not None:
+            self.timeline.current.bytes_received = bytes_after - bytes_before
+            self.logger.info(f"📶 本课程网络流量: {format_bytes(bytes_after - bytes_before)}")
+        self.timeline.finish_course(ctx.result, ctx.metrics)
+        self.counters["courses_completed" if ctx.result else "courses_failed"] += 1
+        if ctx.result and ctx.videos_ended and ctx.videos_confirmed == ctx.videos_ended:
+            self.confirmed_courses.add(course_key(course_info))
+            self.counters["server_confirmed"] += 1
+        if self.screenshots is not None and (not ctx.result or ctx.timed_out):
+            self.screenshots.flush(course_title, f"timeout_{ctx.timed_out}" if ctx.timed_out else "failed")
+        return ctx.result
+    
+    def handle_navigate(self, ctx):
+        """状态: 重新导航到目录"""
+        if not self.navigate_to_catalog():
+            self.logger.error("无法导航到目录")
+            return CourseState.CLEANUP
+        return CourseState.CLICK
+    
+    def handle_click(self, ctx):
+        """状态: 重新获取课程元素并点击"""
+        course_info = ctx.course_info
+        course_index = course_info.get('index', 0)
+        
+        # 前面的课程完成后目录中的序号会前移，按监听到的最新状态重新定位
+        if self.apply_catalog_changes():
+            position = self.catalog_position(course_info)
+            if position is not None:
+                course_index = position
+        
         try:
-            course_title = course_info['title']
-            chapter_number = course_info.get('chapter_number', '')
-            course_index = course_info.get('index', 0)
+            # 使用XPath重新查找该课程
+            course_element = self.retry.call(lambda: self.find_course_element(course_index, course_info.get('title')),
+                                             "定位课程")
+            if course_element is None:
+                self.logger.error(f"课程索引超出范围: {course_index}")
+                return CourseState.CLEANUP
+            
+            # 滚动到课程位置并等待
+            self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", course_element)
+            time.sleep(3)
             
-            self.logger.info(f"开始学习课程: {course_title} ({chapter_number})")
+            # 获取onclick事件内容
+            onclick = course_info.get('onclick', '')
+            self.logger.info(f"课程onclick事件: {onclick}")
             
-            # 重新导航到目录
-            if not self.navigate_to_catalog():
-                self.logger.error("无法导航到目录")
-                return False
+            # 尝试多种点击方法
+            click_success = False
             
-            # 重新获取课程元素
+            # 方法1: 使用onclick事件（最可靠）
+            if onclick:
+                try:
+                    self.logger.info("尝试方法1: 执行onclick事件")
+                    self.driver.execute_script(onclick)
+                    click_success = True
+                    self.logger.info("方法1: onclick事件执行成功")
+                except Exception as e:
+                    self.logger.warning(f"方法1失败: {e}")
+            
+            # 方法2: JavaScript点击
+            if not click_success:
+                self.note_fallback("click:js")
+                try:
+                    self.logger.info("尝试方法2: JavaScript点击")
+                    self.driver.execute_script("arguments[0].click();", course_element)
+                    click_success = True
+                    self.logger.info("方法2: JavaScript点击成功")
+                except Exception as e:
+                    self.logger.warning(f"方法2失败: {e}")
+            
+            # 方法3: 直接点击（最后尝试）
+            if not click_success:
+                self.note_fallback("click:direct")
+                try:
+                    self.logger.info("尝试方法3: 直接点击")
+                    # 确保元素在视图中
+                    self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", course_element)
+                    
+                    # 被遮挡或暂时不可交互时按重试策略等待后再点
+                    self.retry.call(course_element.click, "直接点击课程",
+                                    exceptions=(ElementClickInterceptedException, ElementNotInteractableException))
+                    click_success = True
+                    self.logger.info("方法3: 直接点击成功")
+                except Exception as e:
+                    self.logger.warning(f"方法3失败: {e}")
+            
+            if not click_success:
+                self.logger.error("所有点击方法都失败")
+                return CourseState.CLEANUP
+            
+            self.mark_timeline("click")
+            self.logger.info("已点击课程，等待页面加载...")
+            self.wait_for_player()
+            
+        except Exception as e:
+            self.logger.error(f"重新获取课程元素失败: {e}")
+            # 尝试备用方法：通过onclick直接执行
             try:
-                # 使用XPath重新查找该课程
-                xpath_selector = "//span[@class='catalog_points_yi prevTips']/preceding-sibling::span[@class='posCatalog_name'][1]"
-                uncompleted_elements = self.driver.find_elements(By.XPATH, xpath_selector)
-                
-                if course_index >= len(uncompleted_elements):
-                    self.logger.error(f"课程索引超出范围: {course_index}")
-                    return False
-                
-                course_element = uncompleted_elements[course_index]
-                
-                # 滚动到课程位置并等待
-                self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", course_element)
-                time.sleep(3)
-                
-                # 获取onclick事件内容
                 onclick = course_info.get('onclick', '')
-                self.logger.info(f"课程onclick事件: {onclick}")
-                
-                # 尝试多种点击方法
-                click_success = False
-                
-                # 方法1: 使用onclick事件（最可靠）
                 if onclick:
-                    try:
-                        self.logger.info("尝试方法1: 执行onclick事件")
-                        self.driver.execute_script(onclick)
-                        click_success = True
-                        self.logger.info("方法1: onclick事件执行成功")
-                    except Exception as e:
-                        self.logger.warning(f"方法1失败: {e}")
+                    self.logger.info("尝试通过onclick执行课程...")
+                    self.note_fallback("click:onclick_backup")
+                    self.driver.execute_script(onclick)
+                    self.mark_timeline("click")
+                    self.wait_for_player()
+                else:
+                    return CourseState.CLEANUP
+            except Exception as e2:
+                self.logger.error(f"onclick执行也失败: {e2}")
+                return CourseState.CLEANUP
+        
+        return CourseState.PLAYER_READY
+    
+    def learn_course_url(self, course_url, opened=False):
+        """学习一个课程主页中所有未完成的小节，进度写入该主页的检查点；opened表示主页已在浏览器中打开"""
+        checkpoint = CourseCheckpoint.load(course_url)
+        if checkpoint.is_recently_done():
+            self.logger.info(f"⏭️ 检查点显示该课程主页已全部完成，跳过（删除 {checkpoint.path} 可重新检查）")
+            return True
+        checkpoint.restart()
+        
+        # 每个课程主页的目录状态单独维护
+        self.timeline.course_url = course_url
+        self.catalog_view = []
+        self.confirmed_courses = set()
+        self.catalog_unverified = False
+        self.course_position = 0
+        self.course_total = 0
+        
+        if not opened:
+            self.driver.get(course_url)
+            self.wait_for_page_load()
+        
+        # 导航到目录
+        if not self.navigate_to_catalog():
+            checkpoint.finish("failed")
+            return False
+        
+        # 获取未完成课程
+        uncompleted_courses = self.get_uncompleted_courses()
+        self.timeline.register_courses(uncompleted_courses)
+        self.catalog_view = list(uncompleted_courses)
+        self.watch_catalog()
+        
+        if not uncompleted_courses:
+            self.logger.info("所有课程已完成！")
+            checkpoint.remaining = 0
+            checkpoint.finish("done")
+            return True
+        
+        # 依次学习未完成课程
+        self.course_total = len(uncompleted_courses)
+        failed_courses = []
+        for i, course_info in enumerate(uncompleted_courses, 1):
+            self.course_position = i
+            
+            # 按最新的目录状态定位课程（前面的课程完成后序号会前移）
+            position = self.catalog_position(course_info)
+            if position is None:
+                self.logger.info(f"课程 {course_info['title']} 已不在未完成列表中，跳过")
+                continue
+            course_info['index'] = position
+            self.logger.info(f"🎯 学习进度: {i}/{len(uncompleted_courses)} - {course_info['title']}")
+            
+            # 学习当前课程
+            with self.profile_section(f"course{i}_{course_info['title']}"):
+                study_result = self.study_course(course_info)
+            
+            if study_result:
+                self.logger.info(f"✅ 课程 {course_info['title']} 学习完成")
+            else:
+                self.logger.warning(f"⚠️ 课程 {course_info['title']} 学习失败，继续下一个")
+                failed_courses.append(course_info['title'])
+                checkpoint.record(course_info['title'], False)
+                continue
+            
+            # 更新未完成课程列表（目录监听可用时不必回到目录重新扫描）
+            remaining_courses = self.refresh_catalog_view(course_info)
+            checkpoint.record(course_info['title'], True,
+                              remaining=len(remaining_courses) if remaining_courses is not None else None)
+            if remaining_courses is None:
+                self.logger.warning("⚠️ 重新导航到目录失败")
+                continue
+            self.timeline.register_courses(remaining_courses)
+            if not remaining_courses:
+                self.logger.info("🎉 所有课程已完成！")
+                break
+            else:
+                self.logger.info(f"📋 还有 {len(remaining_courses)} 个课程未完成")
+        
+        if self.catalog_unverified:
+            self.cross_check_catalog()
+        
+        # 还有未完成（例如学习失败）的小节时保持in_progress，下次运行继续
+        checkpoint.remaining = len(self.catalog_view)
+        checkpoint.finish("in_progress" if self.catalog_view else "done")
+        if failed_courses:
+            self.logger.warning(f"⚠️ 有 {len(failed_courses)} 个课程学习失败或被跳过: {', '.join(failed_courses)}")
+            return False
+        self.logger.info("所有课程学习完成！")
+        return True
+    
+    def watch_catalog(self):
+        """在当前目录上挂载状态监听"""
+        if self.catalog_watcher is not None:
+            self.catalog_watcher.install()
+    
+    def apply_catalog_changes(self):
+        """把目录监听收集的变化应用到未完成课程列表，监听不可用或需要重新扫描时返回False"""
+        if self.catalog_watcher is None or not self.catalog_view:
+            return False
+        changes = self.catalog_watcher.take()
+        if changes is None:
+            return False
+        
+        pending = {course_key(course) for course in self.catalog_view}
+        if any(change["pending"] and course_key(change) not in pending for change in changes):
+            # 新出现的未完成课程不知道在目录中的位置
+            self.logger.info("目录中出现新的未完成任务点，需要重新扫描")
+            return False
+        
+        done = {course_key(change) for change in changes if not change["pending"]}
+        if done:
+            self.catalog_view = [course for course in self.catalog_view if course_key(course) not in done]
+            for change in changes:
+                if not change["pending"]:
+                    self.logger.info(f"👀 目录状态变化: {change['title']} ({change['chapter_number']}) 已完成")
+        return True
+    
+    def refresh_catalog_view(self, course_info=None):
+        """学完一个课程后更新未完成课程列表：优先使用目录监听，其次采用服务器的完成确认，
+        都不可用时回到目录重新扫描；导航失败返回None"""
+        if self.apply_catalog_changes():
+            return self.catalog_view
+        
+        if course_info is not None and course_key(course_info) in self.confirmed_courses:
+            self.logger.info("📨 服务器已确认课程完成，不重新扫描目录（全部学完后统一核对）")
+            self.catalog_view = [course for course in self.catalog_view if course_key(course) != course_key(course_info)]
+            self.catalog_unverified = True
+            return self.catalog_view
+        
+        self.logger.info("⏳ 等待页面稳定，准备获取最新课程列表...")
+        time.sleep(5)
+        
+        # 重新导航到目录并获取最新的未完成课程
+        if not self.navigate_to_catalog():
+            return None
+        self.catalog_view = self.get_uncompleted_courses()
+        self.watch_catalog()
+        return self.catalog_view
+    
+    def cross_check_catalog(self):
+        """重新扫描目录，核对服务器确认完成的课程在目录中是否也已完成"""
+        self.catalog_unverified = False
+        if not self.navigate_to_catalog():
+            self.logger.warning("⚠️ 无法回到目录核对课程状态")
+            return
+        self.catalog_view = self.get_uncompleted_courses()
+        self.timeline.register_courses(self.catalog_view)
+        self.watch_catalog()
+        mismatched = [course['title'] for course in self.catalog_view if course_key(course) in self.confirmed_courses]
+        if mismatched:
+            self.logger.warning(f"⚠️ 服务器确认完成但目录中仍未完成的课程: {', '.join(mismatched)}")
+        else:
+            self.logger.info("✅ 目录核对通过")
+    
+    def catalog_position(self, course_info):
+        """课程在当前未完成课程列表中的序号，已不在列表中时返回None"""
+        key = course_key(course_info)
+        for position, course in enumerate(self.catalog_view):
+            if course_key(course) == key:
+                return position
+        return None
+    
+    def find_course_element(self, course_index, title=None):
+        """按序号重新查找目录中第course_index个未完成课程，超出范围返回None；
+        给出title时核对课程名，不一致（目录尚未反映之前的完成状态）时按课程名查找"""
+        uncompleted_elements = self.driver.find_elements(By.XPATH, self.UNCOMPLETED_COURSE_XPATH)
+        if title is None:
+            return uncompleted_elements[course_index] if course_index < len(uncompleted_elements) else None
+        
+        def element_title(element):
+            return element.get_attribute("title") or element.text.strip()
+        
+        if course_index < len(uncompleted_elements) and element_title(uncompleted_elements[course_index]) == title:
+            return uncompleted_elements[course_index]
+        self.note_fallback("course_lookup:title")
+        return next((element for element in uncompleted_elements if element_title(element) == title), None)
+    
+    def handle_player_ready(self, ctx):
+        """状态: 等待视频播放器加载并点击播放按钮"""
+        try:
+            self.logger.info("等待视频播放器加载...")
+            
+            # 第一次进入时列出本节所有未完成的视频任务点，之后在同一次访问中依次播放
+            if ctx.video_points is None:
+                ctx.video_points = self.list_video_task_points()
+            self.current_video_index = ctx.video_points[0]
+            
+            # 丢弃之前的网络日志，之后收到的完成确认只属于这个视频
+            if self.network_observer is not None:
+                self.network_observer.reset()
+            
+            # 检查并切换到iframe
+            iframe_found = self.switch_to_video_iframe()
+            if not iframe_found:
+                self.logger.warning("未找到视频iframe，继续在主文档中查找")
+            elif self.player_helper is not None:
+                if self.start_with_player_helper():
+                    self.check_fingerprint("player", healthy=not self.video_frame_fallback)
+                    self.logger.info("🎯 开始等待课程完成检测...")
+                    return CourseState.PLAYING
+                self.logger.info("未能通过播放器控制脚本开始播放，改为点击播放按钮")
+            
+            # 等待播放按钮出现，确保视频播放器完全加载
+            self.poll_until(lambda: self.driver.execute_script(self.PLAY_BUTTON_READY_JS),
+                            self.wait_time("PLAY_BUTTON_WAIT"))
+            
+            # 在视频iframe中查找播放按钮（与测试程序保持一致）
+            play_buttons = self.driver.find_elements(By.CSS_SELECTOR, ".vjs-big-play-button")
+            self.logger.info(f"找到 {len(play_buttons)} 个播放按钮")
+            
+            if len(play_buttons) == 0:
+                if self.check_fingerprint("player", healthy=False) == "known_drift":
+                    # 同样的结构变化已经报告并保存过快照，不再每个课程重复调试
+                    self.logger.error("未找到播放按钮（播放器结构变化已记录），跳过调试")
+                    return CourseState.CLEANUP
+                self.note_fallback("debug_play_button")
+                if self.diagnose("no_play_button", ctx.title, PLAY_BUTTON_SELECTORS):
+                    self.logger.error("未找到播放按钮，已提交后台诊断")
+                else:
+                    self.logger.error("未找到播放按钮，开始调试...")
+                    self.debug_play_button()
+                return CourseState.CLEANUP
+            
+            # 找到可用的播放按钮
+            for i, button in enumerate(play_buttons):
+                class_name = button.get_attribute("class")
+                title = button.get_attribute("title")
+                is_displayed = button.is_displayed()
+                is_enabled = button.is_enabled()
                 
-                # 方法2: JavaScript点击
-                if not click_success:
-                    try:
-                        self.logger.info("尝试方法2: JavaScript点击")
-                        self.driver.execute_script("arguments[0].click();", course_element)
-                        click_success = True
-                        self.logger.info("方法2: JavaScript点击成功")
-                    except Exception as e:
-                        self.logger.warning(f"方法2失败: {e}")
+                self.logger.info(f"播放按钮 {i+1}: class='{class_name}', title='{title}', 可见={is_displayed}, 启用={is_enabled}")
                 
-                # 方法3: 直接点击（最后尝试）
-                if not click_success:
+                if is_displayed and is_enabled:
+                    self.logger.info("✅ 找到可用的播放按钮！")
+                    self.mark_timeline("player_ready")
+                    
+                    # 尝试点击播放按钮
                     try:
-                        self.logger.info("尝试方法3: 直接点击")
-                        # 确保元素在视图中
-                        self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", course_element)
-                        time.sleep(2)
+                        self.logger.info("尝试点击播放按钮...")
+                        button.click()
+                        self.logger.info("✅ 播放按钮点击成功！")
+                        # set_playback_speed会切回主文档，播放器结构要在仍位于视频iframe中时记录
+                        self.check_fingerprint("player", healthy=not self.video_frame_fallback)
+                        self.select_lowest_quality()
+                        
+                        # 等待倍速控件出现后设置播放速度
+                        self.poll_until(lambda: self.driver.execute_script(self.RATE_MENU_READY_JS),
+                                        self.wait_time("PLAYBACK_SPEED_WAIT"), metric="rate_menu_ready")
+                        if self.set_playback_speed():
+                            self.mark_timeline("rate_set")
                         
-                        # 等待元素可交互
-                        WebDriverWait(self.driver, 10).until(
-                            EC.element_to_be_clickable((By.XPATH, f"({xpath_selector})[{course_index + 1}]"))
-                        )
+                        self.logger.info("🎯 开始等待课程完成检测...")
+                        return CourseState.PLAYING
                         
-                        course_element.click()
-                        click_success = True
-                        self.logger.info("方法3: 直接点击成功")
                     except Exception as e:
-                        self.logger.warning(f"方法3失败: {e}")
-                
-                if not click_success:
-                    self.logger.error("所有点击方法都失败")
-                    return False
-                
-                self.logger.info("已点击课程，等待页面加载...")
-                time.sleep(Config.VIDEO_WAIT_TIME)
-                
-            except Exception as e:
-                self.logger.error(f"重新获取课程元素失败: {e}")
-                # 尝试备用方法：通过onclick直接执行
-                try:
-                    onclick = course_info.get('onclick', '')
-                    if onclick:
-                        self.logger.info("尝试通过onclick执行课程...")
-                        self.driver.execute_script(onclick)
-                        time.sleep(Config.VIDEO_WAIT_TIME)
-                    else:
-                        return False
-                except Exception as e2:
-                    self.logger.error(f"onclick执行也失败: {e2}")
-                    return False
+                        self.logger.error(f"播放按钮点击失败: {e}")
+                        continue
+            
+            self.logger.error("所有播放按钮都无法点击")
+            return CourseState.CLEANUP
             
-            # 等待视频播放器加载
+        except TimeoutException:
+            self.logger.warning(f"课程 {ctx.title} 可能已经完成或无法播放")
+            ctx.result = True
+            return CourseState.CLEANUP
+    
+    def start_with_player_helper(self):
+        """通过控制脚本播放并设置倍速（视频真正开始播放后各一次调用），失败时返回False"""
+        result = {}
+        
+        def playing(state):
+            return state.get("ready") and (not state.get("paused") or state.get("ended"))
+        
+        def play():
+            # ready只表示<video>已存在，play()被拒绝（例如自动播放限制）时视频仍是暂停的，需要一直轮询到开始播放
+            result["state"] = self.player_helper.call("play")
+            # 脚本无法执行时不再等待
+            return result["state"] is None or playing(result["state"])
+        
+        self.poll_until(play, self.wait_time("PLAY_BUTTON_WAIT"))
+        state = result.get("state")
+        if not state or not state.get("ready"):
+            return False
+        if not playing(state):
+            self.logger.warning("控制脚本调用play()后视频仍处于暂停状态")
+            return False
+        self.logger.info("✅ 已通过控制脚本开始播放")
+        self.mark_timeline("player_ready")
+        self.select_lowest_quality()
+        
+        rate = parse_playback_rate(Config.PLAYBACK_SPEED)
+        state = self.player_helper.call("setRate", rate)
+        if state and state.get("playbackRate") == rate:
+            self.logger.info(f"播放速度已设置为 {Config.PLAYBACK_SPEED}")
+            self.mark_timeline("rate_set")
+        else:
+            self.logger.warning("通过控制脚本设置播放速度失败")
+        return True
+    
+    def handle_playing(self, ctx):
+        """状态: 播放中，每隔STATUS_CHECK_INTERVAL秒检查一次视频状态"""
+        if ctx.playing_started is None:
+            self.logger.info("🔍 开始课程完成检测流程...")
+            ctx.playing_started = time.time()
+            
+            # 拿到视频时长之前先用保守预算，之后按时长重新计算
+            self.last_video_probe = None
+            self.video_progress = None
+            ctx.budget_known = False
+            self.set_course_budget(ctx, Config.COURSE_BUDGET_NO_DURATION)
+            
+            # 确保在主文档中查找完成标志
             try:
-                self.logger.info("等待视频播放器加载...")
-                
-                # 检查并切换到iframe
-                iframe_found = self.switch_to_video_iframe()
-                if not iframe_found:
-                    self.logger.warning("未找到视频iframe，继续在主文档中查找")
-                
-                # 增加等待时间，确保视频播放器完全加载
-                time.sleep(5)
-                
-                # 在视频iframe中查找播放按钮（与测试程序保持一致）
-                play_buttons = self.driver.find_elements(By.CSS_SELECTOR, ".vjs-big-play-button")
-                self.logger.info(f"找到 {len(play_buttons)} 个播放按钮")
-                
-                if len(play_buttons) > 0:
-                    # 找到可用的播放按钮
-                    for i, button in enumerate(play_buttons):
-                        class_name = button.get_attribute("class")
-                        title = button.get_attribute("title")
-                        is_displayed = button.is_displayed()
-                        is_enabled = button.is_enabled()
-                        
-                        self.logger.info(f"播放按钮 {i+1}: class='{class_name}', title='{title}', 可见={is_displayed}, 启用={is_enabled}")
-                        
-                        if is_displayed and is_enabled:
-                            self.logger.info("✅ 找到可用的播放按钮！")
-                            
-                            # 尝试点击播放按钮
-                            try:
-                                self.logger.info("尝试点击播放按钮...")
-                                button.click()
-                                self.logger.info("✅ 播放按钮点击成功！")
-                                
-                                # 设置播放速度为2x
-                                time.sleep(Config.PLAYBACK_SPEED_WAIT)
-                                self.set_playback_speed()
-                                
-                                # 等待学习完成（多种判断方式）
-                                self.logger.info("🎯 开始等待课程完成检测...")
-                                completion_result = self.wait_for_course_completion()
-                                
-                                if completion_result:
-                                    self.logger.info(f"✅ 课程 {course_title} 学习完成")
-                                else:
-                                    self.logger.warning(f"⚠️ 课程 {course_title} 可能未完成，但继续下一个课程")
-                                
-                                # 切回主文档，准备下一个课程
-                                self.driver.switch_to.default_content()
-                                return completion_result
-                                
-                            except Exception as e:
-                                self.logger.error(f"播放按钮点击失败: {e}")
-                                continue
-                    
-                    self.logger.error("所有播放按钮都无法点击")
-                    return False
-                else:
-                    self.logger.error("未找到播放按钮，开始调试...")
-                    self.debug_play_button()
-                    return False
-                
-            except TimeoutException:
-                self.logger.warning(f"课程 {course_title} 可能已经完成或无法播放")
+                current_frame = self.driver.execute_script("return window.frameElement;")
+                if current_frame:
+                    self.logger.info("当前在iframe中，切回主文档检查课程完成状态...")
+                    self.driver.switch_to.default_content()
+                    time.sleep(1)
+            except:
+                pass
+        
+        # 服务器确认任务点完成时不必等到下一次检查视频状态
+        if not ctx.server_passed and self.poll_progress_reports():
+            ctx.server_passed = True
+            return CourseState.ENDED
+        
+        current_time = time.time()
+        if current_time - ctx.last_check_time >= Config.STATUS_CHECK_INTERVAL:
+            self.logger.info(f"⏰ 已等待 {current_time - ctx.playing_started:.0f} 秒，检查课程状态...")
+            ctx.last_check_time = current_time
+            ctx.last_video_status = self.check_video_status()
+            self.logger.info(self.VIDEO_STATUS_MESSAGES.get(ctx.last_video_status, "❓ 视频状态未知"))
+            self.update_course_budget(ctx)
+            self.capture_screenshot(f"probe_{ctx.last_video_status}")
+            
+            if ctx.last_video_status == "completed":
+                return CourseState.ENDED
+            if ctx.last_video_status == "stalled":
+                return self.recover_stalled_video(ctx)
+        
+        # 视频正在播放，不检查弹窗，继续等待
+        if ctx.last_video_status == "playing":
+            self.logger.info("📺 视频正在播放中，不检查人脸识别弹窗...")
+            time.sleep(5)
+            return CourseState.PLAYING
+        
+        # 暂停或状态未知时检查人脸识别弹窗
+        self.logger.info(f"{self.VIDEO_STATUS_MESSAGES.get(ctx.last_video_status, '❓ 视频状态未知')}，检查人脸识别弹窗...")
+        if self.check_face_recognition_popup():
+            ctx.popup_detected = True
+            return CourseState.ENDED
+        
+        time.sleep(5)  # 短暂等待后继续检查
+        return CourseState.PLAYING
+    
+    def select_lowest_quality(self):
+        """开启VIDEO_LOWEST_QUALITY时把当前视频切换到最低清晰度（在视频iframe中调用）"""
+        if not Config.VIDEO_LOWEST_QUALITY:
+            return
+        helper = self.player_helper or PlayerHelper(self.driver)
+        quality = (helper.call("lowestQuality") or {}).get("quality")
+        if quality:
+            self.logger.info(f"📉 已切换到最低清晰度: {quality}")
+        else:
+            self.logger.info("未找到清晰度选项，保持默认清晰度")
+    
+    def network_bytes(self):
+        """浏览器累计收到的字节数（处理完已有的网络日志），无法统计时返回None"""
+        if self.network_observer is None:
+            return None
+        self.network_observer.reset()
+        return self.network_observer.bytes_received if self.network_observer.available else None
+    
+    def poll_progress_reports(self):
+        """读取播放器的进度上报响应，服务器确认当前视频任务点完成时返回True"""
+        if self.network_observer is None:
+            return False
+        for report in self.network_observer.poll():
+            if report.passed:
+                self.logger.info("📨 服务器已确认视频任务点完成")
                 return True
-                
+        return False
+    
+    def recover_stalled_video(self, ctx):
+        """视频卡住时依次尝试: 重新播放 -> 跳到当前位置 -> 重新打开课程，每步最多等待STALL_STEP_WAIT秒"""
+        if ctx.stall_exhausted:
+            # 重新打开的次数已用完，播放和跳转也已试过，不再重复，只等待课程时间预算
+            time.sleep(5)
+            return CourseState.PLAYING
+        
+        self.capture_screenshot("stalled", force=True)
+        try:
+            video = self.find_video_element()
+            position = video.get_property("currentTime") or 0.0
         except Exception as e:
-            self.logger.error(f"学习课程 {course_title} 失败: {e}")
+            self.logger.warning(f"获取卡住的视频失败: {e}")
+            video = None
+        
+        if video is not None:
+            steps = [
+                ("play", "arguments[0].play();"),
+                ("seek", "arguments[0].currentTime = arguments[1]; arguments[0].play();"),
+            ]
+            for step, script in steps:
+                self.logger.info(f"🔧 尝试恢复播放: {step}")
+                try:
+                    self.driver.execute_script(script, video, position)
+                except Exception as e:
+                    self.logger.warning(f"恢复操作 {step} 失败: {e}")
+                    continue
+                self.note_fallback(f"stall:{step}")
+                if self.poll_until(lambda: (video.get_property("currentTime") or 0.0) > position + 0.5,
+                                   Config.STALL_STEP_WAIT):
+                    self.finish_stall(step)
+                    ctx.last_video_status = "playing"
+                    return CourseState.PLAYING
+        
+        if ctx.stall_reloads < Config.STALL_MAX_RELOADS:
+            ctx.stall_reloads += 1
+            self.logger.warning("🔧 尝试恢复播放: 重新打开课程")
+            self.note_fallback("stall:reload")
+            # 重新打开后是新的播放过程：卡顿计时转给stall_reload_started，重新打开后再卡住算新的一次卡顿
+            self.stall_reload_started = self.stall_started
+            self.stall_started = None
+            self.video_progress = None
+            ctx.reset_playback()
+            return CourseState.NAVIGATE
+        
+        # 已经重新打开过，交给课程时间预算处理
+        self.logger.warning("⚠️ 视频仍然卡住，等待课程时间预算到期")
+        ctx.stall_exhausted = True
+        time.sleep(5)
+        return CourseState.PLAYING
+    
+    def track_video_progress(self, current_time, ready_state, network_state, error):
+        """比较两次探测之间的播放进度，进度超过STALL_DETECT_SECONDS秒不动或视频出错时判定为卡住"""
+        now = time.time()
+        progress = self.video_progress
+        if progress is None or current_time > progress[0] + 0.5:
+            if progress is not None and self.stall_started is not None:
+                self.finish_stall("resume")
+            elif progress is not None and self.stall_reload_started is not None:
+                self.finish_stall("reload")
+            self.video_progress = progress = (current_time, now)
+            if error is None:
+                return False
+        elif error is None and now - progress[1] < Config.STALL_DETECT_SECONDS:
             return False
+        
+        if self.stall_started is None:
+            self.stall_started = progress[1]
+            self.counters["stalls"] += 1
+            self.logger.warning(f"🧊 视频卡住: 位置={current_time:.1f}s, 已 {now - progress[1]:.0f} 秒没有前进, "
+                                f"readyState={ready_state}, networkState={network_state}, error={error}")
+        return True
+    
+    def finish_stall(self, step):
+        """记录卡顿恢复耗时（从最后一次看到进度前进算起，重新打开课程时从重新打开前那次卡顿算起）"""
+        started = self.stall_reload_started if step == "reload" else self.stall_started
+        self.stall_started = None
+        self.stall_reload_started = None
+        if started is None:
+            return
+        latency = time.time() - started
+        self.video_progress = None
+        self.latency.record("stall_recovery", latency)
+        self.counters["stall_recoveries"] += 1
+        self.logger.info(f"✅ 视频已恢复播放 (方式: {step}, 卡顿 {latency:.1f} 秒)")
+    
+    def handle_ended(self, ctx):
+        """状态: 播放结束，关闭人脸识别弹窗"""
+        if not ctx.popup_detected:
+            self.logger.info("✅ 检测到视频播放完成")
+            self.count_video_ended(ctx)
+            if len(ctx.video_points) > 1:
+                finished = ctx.video_points.pop(0)
+                self.logger.info(f"▶️ 视频任务点 {finished + 1} 已完成，继续播放本节下一个视频 (剩余 {len(ctx.video_points)} 个)")
+                ctx.reset_playback()
+                self.driver.switch_to.default_content()
+                return CourseState.PLAYER_READY
+            self.mark_timeline("ended")
+            ctx.result = True
+            return CourseState.CLEANUP
+        
+        self.mark_timeline("ended")
+        
+        self.logger.info("✅ 检测到人脸识别弹窗，课程学习完成")
+        
+        # 短暂等待弹窗稳定
+        time.sleep(self.wait_time("FACE_RECOGNITION_WAIT"))
+        
+        # 关闭人脸识别弹窗
+        if self.close_face_recognition_popup():
+            self.logger.info("✅ 人脸识别弹窗已关闭，准备学习下一个课程")
+            self.count_video_ended(ctx)
+            ctx.result = True
+            return CourseState.CLEANUP
+        
+        self.logger.error("❌ 关闭人脸识别弹窗失败，课程可能未真正完成")
+        # 继续等待，不要立即返回失败
+        self.logger.info("⏳ 继续等待，尝试其他方式关闭弹窗...")
+        ctx.popup_detected = False
+        return CourseState.PLAYING
+    
+    def count_video_ended(self, ctx):
+        """记录一个视频播完，以及服务器是否确认了它的完成"""
+        ctx.videos_ended += 1
+        if ctx.server_passed or self.poll_progress_reports():
+            ctx.videos_confirmed += 1
+    
+    def list_video_task_points(self):
+        """返回本节未完成的视频任务点序号列表；无法判断时按只有一个视频处理"""
+        try:
+            self.driver.switch_to.default_content()
+            main_iframe = self.elements.find((), "iframe", By.ID)
+            if main_iframe is not None:
+                self.driver.switch_to.frame(main_iframe)
+                finished = self.driver.execute_script(self.VIDEO_TASK_POINTS_JS) or []
+                self.driver.switch_to.default_content()
+                pending = [i for i, done in enumerate(finished) if not done]
+                self.logger.info(f"本节共有 {len(finished)} 个视频任务点，未完成 {len(pending)} 个")
+                if pending:
+                    return pending
+        except Exception as e:
+            self.logger.warning(f"获取视频任务点失败: {e}")
+            try:
+                self.driver.switch_to.default_content()
+            except:
+                pass
+        return [0]
+    
+    def handle_cleanup(self, ctx):
+        """状态: 切回主文档，准备下一个课程"""
+        if ctx.playing_started is not None and ctx.title:
+            if ctx.result:
+                self.logger.info(f"✅ 课程 {ctx.title} 学习完成")
+            else:
+                self.logger.warning(f"⚠️ 课程 {ctx.title} 可能未完成，但继续下一个课程")
+        
+        try:
+            self.driver.switch_to.default_content()
+        except:
+            pass
+        return CourseState.NEXT
+    
+    def handle_state_timeout(self, ctx, state):
+        """状态超时后的去向；播放超出时间预算时先重新打开课程，仍超出则跳过"""
+        self.capture_screenshot(f"timeout_{state}", force=True)
+        if state == CourseState.PLAYING:
+            self.logger.warning(f"⏰ 课程 {ctx.title} 超出时间预算 ({ctx.timeouts.get(state, 0):.0f}秒)")
+            if ctx.recoveries < Config.COURSE_BUDGET_RECOVERIES:
+                ctx.recoveries += 1
+                self.logger.warning(f"🔁 重新打开课程恢复播放 (第 {ctx.recoveries}/{Config.COURSE_BUDGET_RECOVERIES} 次)")
+                self.record_budget_action("recover")
+                ctx.reset_playback()
+                return CourseState.NAVIGATE
+            
+            self.logger.error(f"⏭️ 课程 {ctx.title} 多次超出时间预算，跳过该课程")
+            self.record_budget_action("skip")
+            ctx.result = False
+            return CourseState.CLEANUP
+        
+        if state == CourseState.ENDED:
+            self.logger.warning(f"⏰ 等待超时 ({ctx.timeouts.get(state, 0):.0f}秒)，课程可能已完成")
+            ctx.result = True
+        return CourseState.CLEANUP
+    
+    def set_course_budget(self, ctx, seconds):
+        """设置播放状态的剩余时间预算（状态机按累计时间判断，所以要加上已用时间）"""
+        spent = ctx.metrics.time_in(CourseState.PLAYING) + time.time() - ctx.state_entered
+        budget = min(seconds, Config.STATE_TIMEOUTS[CourseState.PLAYING])
+        ctx.timeouts[CourseState.PLAYING] = spent + budget
+        if self.timeline.current is not None:
+            self.timeline.current.budget_seconds = round(spent + budget, 1)
+        return budget
+    
+    def update_course_budget(self, ctx):
+        """拿到视频时长后按 剩余时长 / 倍速 × 系数 + 余量 计算课程时间预算"""
+        if ctx.budget_known or self.last_video_probe is None:
+            return
+        current_time, duration, playback_rate = self.last_video_probe
+        rate = playback_rate if playback_rate and playback_rate > 0 else parse_playback_rate(Config.PLAYBACK_SPEED)
+        remaining = max(0.0, duration - current_time) / rate
+        budget = self.set_course_budget(ctx, remaining * Config.COURSE_BUDGET_FACTOR + Config.COURSE_BUDGET_MARGIN)
+        ctx.budget_known = True
+        self.logger.info(f"⏳ 课程时间预算: {budget:.0f}秒 (剩余 {duration - current_time:.0f}秒视频, {rate}倍速)")
+    
+    def record_budget_action(self, action):
+        """在运行记录中登记超出预算后的处理方式"""
+        self.counters[f"budget_{action}"] += 1
+        if self.timeline.current is not None:
+            self.timeline.current.budget_actions.append(action)
+    
+    def record_state_metrics(self, course_title, metrics):
+        """记录并输出课程的状态耗时直方图"""
+        if metrics is None:
+            return
+        self.course_state_metrics.append((course_title, metrics))
+        self.run_state_metrics.merge(metrics)
+        self.logger.info(f"⏱️ 课程 {course_title} 各状态耗时:")
+        for line in metrics.histogram():
+            self.logger.info(f"    {line}")
+    
+    def mark_timeline(self, event):
+        """在当前课程的时间线上记录节点"""
+        if self.timeline.current is not None:
+            self.timeline.current.mark(event)
+        self.capture_screenshot(event)
+    
+    def capture_screenshot(self, label, force=False):
+        """截图放入后台缓冲（未开启时不做任何事）"""
+        if self.screenshots is not None:
+            self.screenshots.capture(label, force=force)
+    
+    def diagnose(self, reason, course=None, selectors=(), texts=()):
+        """抓取frame树快照交给后台诊断，未开启或抓取失败时返回False
+
+        同一原因在一个课程中只抓取一次（例如每次弹窗检查都会遇到的残留人脸识别文本），之后直接返回True。
+        """
+        if self.diagnostics is None:
+            return False
+        if reason in self.diagnosed:
+            return True
+        if not self.diagnostics.capture(reason, course, selectors, texts):
+            return False
+        self.diagnosed.add(reason)
+        return True
+    
+    def check_fingerprint(self, name, healthy, hint=""):
+        """在当前frame中比较目录/播放器的结构指纹，返回DomFingerprints.check的结果（未开启时为None）"""
+        if self.fingerprints is None:
+            return None
+        return self.fingerprints.check(name, healthy, hint)
+    
+    def note_fallback(self, name):
+        """记录当前课程用到的备用方案"""
+        if self.timeline.current is not None:
+            self.timeline.current.add_fallback(name)
+    
+    def note_retry(self, name=None, error=None, delay=0.0):
+        """记录当前课程的一次重试及重试前的等待时间（RetryPolicy的on_retry回调）"""
+        if self.timeline.current is not None:
+            self.timeline.current.add_retry(seconds=delay)
+    
+    def observe_video(self, current_time, duration, playback_rate=None):
+        """根据探测到的视频属性记录视频时长和首帧时间"""
+        valid_duration = bool(duration) and duration == duration and duration != float("inf")
+        if valid_duration:
+            self.last_video_probe = (current_time or 0.0, duration, playback_rate)
+            self.last_video_probe_at = time.time()
+        
+        course = self.timeline.current
+        if course is None:
+            return
+        if valid_duration:
+            course.set_video_duration(self.current_video_index, duration)
+        if current_time and current_time > 0:
+            course.mark("first_frame")
     
     def set_playback_speed(self):
         """设置播放速度为2x"""
@@ -486,23 +1274,24 @@ class ChaoxingAutoLearner:
                     self.logger.info(f"当前播放速度: {current_speed}")
                     
                     if current_speed != Config.PLAYBACK_SPEED:
-                        # 点击播放速度控制
-                        element.click()
-                        time.sleep(1)
-                        
-                        # 查找并点击2x选项
-                        speed_options = self.driver.find_elements(By.CSS_SELECTOR, ".vjs-playback-rate .vjs-menu-item")
-                        for option in speed_options:
-                            if Config.PLAYBACK_SPEED in option.text:
-                                option.click()
-                                self.logger.info(f"播放速度已设置为 {Config.PLAYBACK_SPEED}")
-                                return True
+                        # 点击播放速度控制（被遮挡或暂时不可交互时按重试策略等待后再点）
+                        self.retry.call(element.click, "点击倍速菜单",
+                                        exceptions=(ElementClickInterceptedException, ElementNotInteractableException))
                         
-                        self.logger.warning("未找到2x播放速度选项")
+                        # 菜单展开前找不到选项，按重试策略等待后再查找，代替固定等待
+                        option = self.retry.call(self.find_playback_speed_option, "查找倍速选项",
+                                                 exceptions=(NoSuchElementException,))
+                        self.retry.call(option.click, "点击倍速选项",
+                                        exceptions=(ElementClickInterceptedException, ElementNotInteractableException))
+                        self.logger.info(f"播放速度已设置为 {Config.PLAYBACK_SPEED}")
+                        return True
                     else:
                         self.logger.info(f"播放速度已经是 {Config.PLAYBACK_SPEED}")
                         return True
                         
+                except NoSuchElementException:
+                    self.logger.warning("未找到2x播放速度选项")
+                    continue
                 except Exception as e:
                     self.logger.warning(f"处理播放速度元素时出错: {e}")
                     continue
@@ -514,8 +1303,23 @@ class ChaoxingAutoLearner:
             self.logger.warning(f"设置播放速度失败: {e}")
             return False
     
+    def find_playback_speed_option(self):
+        """在展开的倍速菜单中查找PLAYBACK_SPEED对应的选项，没有时抛出NoSuchElementException"""
+        for option in self.driver.find_elements(By.CSS_SELECTOR, ".vjs-playback-rate .vjs-menu-item"):
+            if Config.PLAYBACK_SPEED in option.text:
+                return option
+        raise NoSuchElementException(f"未找到 {Config.PLAYBACK_SPEED} 播放速度选项")
+    
+    @traced()
     def switch_to_video_iframe(self):
-        """切换到视频iframe"""
+        """切换到视频iframe（小节内有多个视频时切换到第current_video_index个）"""
+        # 上次找到的视频iframe仍在页面中时直接切换，不再列出所有iframe逐个检查
+        video_key = f"video:{self.current_video_index}"
+        if self.video_frame_path and self.video_frame_path[-1] == video_key \
+                and self.elements.switch_to(self.video_frame_path):
+            return True
+        self.video_frame_path = None
+        self.video_frame_fallback = False
         try:
             self.logger.info("检查iframe...")
             iframes = self.driver.find_elements(By.TAG_NAME, "iframe")
@@ -531,49 +1335,41 @@ class ChaoxingAutoLearner:
             
             if main_iframe:
                 self.logger.info("找到主iframe，切换到主iframe...")
+                self.elements.put((), (By.ID, "iframe"), main_iframe)
                 self.driver.switch_to.frame(main_iframe)
                 time.sleep(3)
                 
-                # 在主iframe中查找嵌套的视频iframe
-                nested_iframes = self.driver.find_elements(By.TAG_NAME, "iframe")
-                self.logger.info(f"在主iframe中找到 {len(nested_iframes)} 个嵌套iframe")
+                # 在主iframe中查找嵌套的视频iframe（与VIDEO_TASK_POINTS_JS使用同一选择器，序号才能对应任务点）
+                nested_iframes = self.driver.find_elements(By.CSS_SELECTOR, self.VIDEO_IFRAME_SELECTOR)
+                self.logger.info(f"在主iframe中找到 {len(nested_iframes)} 个视频任务点iframe")
+                if not nested_iframes:
+                    # 第二遍：视频iframe没有任务点class时按src识别（这时任务点列表为空，按出现顺序计序号）
+                    nested_iframes = []
+                    for nested_iframe in self.driver.find_elements(By.TAG_NAME, "iframe"):
+                        nested_src = (nested_iframe.get_attribute("src") or "").lower()
+                        if "video" in nested_src or "player" in nested_src:
+                            nested_iframes.append(nested_iframe)
+                    self.logger.info(f"按src识别到 {len(nested_iframes)} 个视频iframe")
                 
-                for i, nested_iframe in enumerate(nested_iframes):
-                    try:
-                        nested_src = nested_iframe.get_attribute("src")
-                        nested_class = nested_iframe.get_attribute("class")
-                        self.logger.info(f"嵌套iframe {i+1}: class='{nested_class}', src='{nested_src}'")
-                        
-                        # 检查是否是视频iframe - 扩展检查条件
-                        if (nested_class and "ans-insertvideo-online" in nested_class) or \
-                           (nested_src and ("video" in nested_src.lower() or "player" in nested_src.lower())):
-                            self.logger.info(f"找到视频iframe {i+1}，切换到视频iframe...")
-                            self.driver.switch_to.frame(nested_iframe)
-                            time.sleep(2)
-                            
-                            # 在视频iframe中查找视频元素
-                            video_elements = self.driver.find_elements(By.CSS_SELECTOR, "video, .video-js, .fullScreenContainer")
-                            if len(video_elements) > 0:
-                                self.logger.info(f"在视频iframe中找到 {len(video_elements)} 个视频元素")
-                                return True
-                            else:
-                                # 切回主iframe
-                                self.driver.switch_to.parent_frame()
-                        
-                    except Exception as e:
-                        self.logger.error(f"处理嵌套iframe {i+1} 失败: {e}")
-                        # 确保切回主iframe
-                        try:
-                            self.driver.switch_to.parent_frame()
-                        except:
-                            pass
+                # 只接受当前任务点对应的iframe：视频还在加载时等待，不能顺延到下一个任务点
+                if self.current_video_index < len(nested_iframes):
+                    nested_iframe = nested_iframes[self.current_video_index]
+                    if self.enter_video_frame(nested_iframe, self.current_video_index):
+                        self.elements.put(((By.ID, "iframe"),), video_key, nested_iframe)
+                        self.video_frame_path = ((By.ID, "iframe"), video_key)
+                        return True
                 
                 # 如果没找到视频iframe，切回主文档
                 self.driver.switch_to.default_content()
             
             # 备用方案：检查所有iframe，更仔细地查找视频元素
             self.logger.info("使用备用方案检查所有iframe...")
-            for i, iframe in enumerate(iframes):
+            self.note_fallback("iframe_scan")
+            self.video_frame_fallback = True
+            # 先试上次扫描成功的iframe，页面结构变化后不必每个课程都逐个扫描
+            order = sorted(range(len(iframes)), key=lambda i: i != self.video_frame_hint)
+            for i in order:
+                iframe = iframes[i]
                 try:
                     iframe_src = iframe.get_attribute("src")
                     iframe_id = iframe.get_attribute("id")
@@ -609,6 +1405,9 @@ class ChaoxingAutoLearner:
                             class_name = element.get_attribute("class") or ""
                             if tag_name == "video" or "video" in class_name or "player" in class_name:
                                 self.logger.info(f"确认找到视频元素: {tag_name}, class='{class_name}'")
+                                self.video_frame_hint = i
+                                self.elements.put((), video_key, iframe)
+                                self.video_frame_path = (video_key,)
                                 return True
                         
                         # 如果没有确认的视频元素，切回主文档继续检查
@@ -628,6 +1427,25 @@ class ChaoxingAutoLearner:
             self.logger.error(f"切换iframe失败: {e}")
             return False
     
+    def enter_video_frame(self, frame, index):
+        """切换到第index个视频iframe并等待其中出现视频元素，超时时切回上一级frame并返回False"""
+        try:
+            self.logger.info(f"找到视频iframe {index + 1}: src='{frame.get_attribute('src')}'，切换到视频iframe...")
+            self.driver.switch_to.frame(frame)
+        except Exception as e:
+            self.logger.error(f"切换到视频iframe {index + 1} 失败: {e}")
+            return False
+        if self.poll_until(lambda: self.driver.find_elements(By.CSS_SELECTOR, "video, .video-js, .fullScreenContainer"),
+                           self.wait_time("VIDEO_WAIT_TIME")):
+            self.logger.info(f"视频iframe {index + 1} 中已出现视频元素")
+            return True
+        self.logger.warning(f"视频iframe {index + 1} 中没有出现视频元素")
+        try:
+            self.driver.switch_to.parent_frame()
+        except Exception:
+            pass
+        return False
+    
     def debug_play_button(self):
         """调试播放按钮"""
         try:
@@ -761,7 +1579,7 @@ class ChaoxingAutoLearner:
             )
             
             self.logger.info("检测到人脸识别弹窗，课程学习完成")
-            time.sleep(Config.FACE_RECOGNITION_WAIT)
+            time.sleep(self.wait_time("FACE_RECOGNITION_WAIT"))
             
             # 尝试关闭人脸识别弹窗
             self.close_face_recognition_popup()
@@ -776,160 +1594,69 @@ class ChaoxingAutoLearner:
             return False
     
     def wait_for_course_completion(self):
-        """等待课程完成（多种判断方式）"""
-        try:
-            self.logger.info("🔍 开始课程完成检测流程...")
-            self.logger.info(f"⏰ 总等待时间: {Config.FACE_RECOGNITION_TIMEOUT}秒")
-            
-            # 确保在主文档中查找完成标志
-            try:
-                # 检查是否在iframe中
-                current_frame = self.driver.execute_script("return window.frameElement;")
-                if current_frame:
-                    self.logger.info("当前在iframe中，切回主文档检查课程完成状态...")
-                    self.driver.switch_to.default_content()
-                    time.sleep(1)
-            except:
-                pass
-            
-            # 开始持续监控课程完成状态
-            start_time = time.time()
-            check_interval = 30  # 每30秒检查一次
-            last_check_time = 0
-            last_video_status = "unknown"
-            
-            while time.time() - start_time < Config.FACE_RECOGNITION_TIMEOUT:
-                current_time = time.time()
-                elapsed_time = current_time - start_time
-                
-                # 每30秒检查一次视频状态
-                if current_time - last_check_time >= check_interval:
-                    self.logger.info(f"⏰ 已等待 {elapsed_time:.0f} 秒，检查课程状态...")
-                    last_check_time = current_time
-                    
-                    # 检查视频播放状态
-                    video_status = self.check_video_status()
-                    last_video_status = video_status
-                    
-                    if video_status == "completed":
-                        self.logger.info("✅ 检测到视频播放完成")
-                        break
-                    elif video_status == "playing":
-                        self.logger.info("📺 视频正在播放中...")
-                    elif video_status == "paused":
-                        self.logger.info("⏸️ 视频已暂停")
-                    else:
-                        self.logger.info("❓ 视频状态未知")
-                
-                # 根据视频状态决定是否检查人脸识别弹窗
-                if last_video_status == "playing":
-                    # 视频正在播放，不检查弹窗，继续等待
-                    self.logger.info("📺 视频正在播放中，不检查人脸识别弹窗...")
-                    time.sleep(5)
-                    continue
-                elif last_video_status == "completed":
-                    # 视频播放完成，检查人脸识别弹窗
-                    self.logger.info("✅ 视频播放完成，检查人脸识别弹窗...")
-                    if self.check_face_recognition_popup():
-                        self.logger.info("✅ 检测到人脸识别弹窗，课程学习完成")
-                        
-                        # 短暂等待弹窗稳定
-                        time.sleep(Config.FACE_RECOGNITION_WAIT)
-                        
-                        # 关闭人脸识别弹窗
-                        if self.close_face_recognition_popup():
-                            self.logger.info("✅ 人脸识别弹窗已关闭，准备学习下一个课程")
-                            return True
-                        else:
-                            self.logger.error("❌ 关闭人脸识别弹窗失败，课程可能未真正完成")
-                            # 继续等待，不要立即返回失败
-                            self.logger.info("⏳ 继续等待，尝试其他方式关闭弹窗...")
-                elif last_video_status == "paused":
-                    # 视频已暂停，检查人脸识别弹窗
-                    self.logger.info("⏸️ 视频已暂停，检查人脸识别弹窗...")
-                    if self.check_face_recognition_popup():
-                        self.logger.info("✅ 检测到人脸识别弹窗，课程学习完成")
-                        
-                        # 短暂等待弹窗稳定
-                        time.sleep(Config.FACE_RECOGNITION_WAIT)
-                        
-                        # 关闭人脸识别弹窗
-                        if self.close_face_recognition_popup():
-                            self.logger.info("✅ 人脸识别弹窗已关闭，准备学习下一个课程")
-                            return True
-                        else:
-                            self.logger.error("❌ 关闭人脸识别弹窗失败，课程可能未真正完成")
-                            # 继续等待，不要立即返回失败
-                            self.logger.info("⏳ 继续等待，尝试其他方式关闭弹窗...")
-                else:
-                    # 视频状态未知，谨慎检查弹窗
-                    self.logger.info("❓ 视频状态未知，谨慎检查人脸识别弹窗...")
-                    if self.check_face_recognition_popup():
-                        self.logger.info("✅ 检测到人脸识别弹窗，课程学习完成")
-                        
-                        # 短暂等待弹窗稳定
-                        time.sleep(Config.FACE_RECOGNITION_WAIT)
-                        
-                        # 关闭人脸识别弹窗
-                        if self.close_face_recognition_popup():
-                            self.logger.info("✅ 人脸识别弹窗已关闭，准备学习下一个课程")
-                            return True
-                        else:
-                            self.logger.error("❌ 关闭人脸识别弹窗失败，课程可能未真正完成")
-                            # 继续等待，不要立即返回失败
-                            self.logger.info("⏳ 继续等待，尝试其他方式关闭弹窗...")
-                
-                time.sleep(5)  # 短暂等待后继续检查
-            
-            # 超时检查
-            if time.time() - start_time >= Config.FACE_RECOGNITION_TIMEOUT:
-                self.logger.warning(f"⏰ 等待超时 ({Config.FACE_RECOGNITION_TIMEOUT}秒)，课程可能已完成")
-                return True
-            
-            return True
-            
-        except Exception as e:
-            self.logger.error(f"等待课程完成时发生错误: {e}")
-            return False
+        """等待课程完成（从播放状态开始运行状态机）"""
+        ctx = self.course_machine.run(CourseContext({'title': ''}), start=CourseState.PLAYING)
+        return ctx.result
 
     def check_video_status(self):
         """检查视频播放状态"""
         try:
+            # 从主文档开始查找（上一次检查后可能还停留在视频iframe中）
+            self.driver.switch_to.default_content()
+            
             # 切换到视频iframe
             if not self.switch_to_video_iframe():
                 return "unknown"
             
-            # 查找视频元素
-            video_elements = self.driver.find_elements(By.CSS_SELECTOR, "video")
-            if len(video_elements) == 0:
-                return "unknown"
+            # 控制脚本一次调用读取所有属性
+            if self.player_helper is not None:
+                state = self.player_helper.call("state")
+                if state and state.get("ready"):
+                    return self.classify_video(state)
             
-            for video in video_elements:
-                try:
-                    current_time = video.get_property("currentTime")
-                    duration = video.get_property("duration")
-                    paused = video.get_property("paused")
-                    ended = video.get_property("ended")
-                    
-                    self.logger.info(f"视频状态: 当前时间={current_time:.1f}s, 总时长={duration:.1f}s, 暂停={paused}, 结束={ended}")
-                    
-                    if ended or (duration > 0 and current_time >= duration - 1):
-                        return "completed"
-                    elif paused:
-                        return "paused"
-                    else:
-                        return "playing"
-                        
-                except Exception as e:
-                    self.logger.warning(f"检查视频状态失败: {e}")
-                    continue
+            # 查找视频元素（缓存的句柄仍有效时不再查找）
+            video = self.find_video_element()
+            if video is None:
+                return "unknown"
             
-            return "unknown"
+            try:
+                return self.classify_video({
+                    name: video.get_property(name)
+                    for name in ("currentTime", "duration", "paused", "ended", "playbackRate",
+                                 "readyState", "networkState", "error")
+                })
+            except Exception as e:
+                self.logger.warning(f"检查视频状态失败: {e}")
+                return "unknown"
             
         except Exception as e:
             self.logger.warning(f"检查视频状态时发生错误: {e}")
             return "unknown"
 
+    def find_video_element(self):
+        """当前视频iframe中的video元素（在switch_to_video_iframe之后调用），找不到时返回None"""
+        return self.elements.find(self.video_frame_path or (), "video")
+
+    def classify_video(self, state):
+        """根据视频属性判断播放状态"""
+        current_time = state["currentTime"]
+        duration = state["duration"]
+        paused = state["paused"]
+        ended = state["ended"]
+        playback_rate = state["playbackRate"]
+        
+        self.logger.info(f"视频状态: 当前时间={current_time:.1f}s, 总时长={duration:.1f}s, 暂停={paused}, 结束={ended}, 倍速={playback_rate}")
+        self.observe_video(current_time, duration, playback_rate)
+        
+        if ended or (duration > 0 and current_time >= duration - 1):
+            return "completed"
+        elif paused:
+            return "paused"
+        elif self.track_video_progress(current_time, state["readyState"], state["networkState"], state["error"]):
+            return "stalled"
+        else:
+            return "playing"
+    
     def check_face_recognition_popup(self):
         """检查人脸识别弹窗是否存在"""
         try:
@@ -946,21 +1673,19 @@ class ChaoxingAutoLearner:
             try:
                 # 尝试切换到视频iframe检查视频状态
                 if self.switch_to_video_iframe():
-                    video_elements = self.driver.find_elements(By.CSS_SELECTOR, "video")
-                    for video in video_elements:
-                        try:
-                            paused = video.get_property("paused")
-                            ended = video.get_property("ended")
-                            current_time = video.get_property("currentTime")
-                            duration = video.get_property("duration")
-                            
-                            # 如果视频正在播放且未结束，不检查弹窗
-                            if not paused and not ended and current_time > 0 and duration > 0:
-                                self.logger.info(f"检测到视频正在播放 (时间: {current_time:.1f}s/{duration:.1f}s)，跳过弹窗检查")
-                                self.driver.switch_to.default_content()
-                                return False
-                        except:
-                            continue
+                    video = self.find_video_element()
+                    if video is not None:
+                        paused = video.get_property("paused")
+                        ended = video.get_property("ended")
+                        current_time = video.get_property("currentTime")
+                        duration = video.get_property("duration")
+                        self.observe_video(current_time, duration)
+                        
+                        # 如果视频正在播放且未结束，不检查弹窗
+                        if not paused and not ended and current_time > 0 and duration > 0:
+                            self.logger.info(f"检测到视频正在播放 (时间: {current_time:.1f}s/{duration:.1f}s)，跳过弹窗检查")
+                            self.driver.switch_to.default_content()
+                            return False
                     
                     # 切回主文档
                     self.driver.switch_to.default_content()
@@ -1007,21 +1732,10 @@ class ChaoxingAutoLearner:
             
             # 如果没有找到可见的弹窗元素，再检查页面文本（作为辅助验证）
             try:
-                page_source = self.driver.page_source
-                if any(text in page_source for text in ["人脸信息采集", "请使用手机APP采集人脸信息", "请扫描下方二维码"]):
-                    self.logger.info("⚠️ 页面源码中包含人脸识别相关文本，但未找到可见的弹窗元素")
-                    # 进一步检查：文本是否在隐藏的元素中
-                    hidden_elements = self.driver.find_elements(By.CSS_SELECTOR, "div[style*='display: none'], div[style*='display:none']")
-                    for element in hidden_elements:
-                        try:
-                            element_text = element.text
-                            if any(text in element_text for text in ["人脸信息采集", "请使用手机APP采集人脸信息"]):
-                                self.logger.info("✅ 在隐藏元素中找到人脸识别文本，可能是隐藏的弹窗")
-                                return True
-                        except:
-                            continue
-                    
-                    # 如果文本不在隐藏元素中，可能是残留，不认为是弹窗
+                if self.driver.execute_script(self.FACE_TEXT_JS, FACE_TEXTS):
+                    self.logger.info("⚠️ 页面中包含人脸识别相关文本，但未找到可见的弹窗元素")
+                    # 文本在哪些元素中、是否可见交给后台诊断，不在这里逐个读取隐藏元素
+                    self.diagnose("face_text", None, FACE_POPUP_SELECTORS, FACE_TEXTS)
                     self.logger.info("❌ 页面文本可能是残留，不认为是弹窗")
                     return False
             except:
@@ -1057,6 +1771,7 @@ class ChaoxingAutoLearner:
                 self.logger.warning(f"方法1失败: {e}")
             
             # 方法2: 尝试查找其他关闭按钮选择器
+            self.note_fallback("popup_close:selector")
             try:
                 self.logger.info("尝试其他关闭按钮选择器...")
                 alternative_selectors = [
@@ -1073,7 +1788,9 @@ class ChaoxingAutoLearner:
                         for element in elements:
                             if element.is_displayed():
                                 self.logger.info(f"找到可见的关闭按钮: {selector}")
-                                element.click()
+                                self.retry.call(element.click, "点击弹窗关闭按钮",
+                                                exceptions=(ElementClickInterceptedException,
+                                                            ElementNotInteractableException))
                                 self.logger.info(f"✅ 方法2: 使用选择器 {selector} 点击成功")
                                 time.sleep(3)
                                 self.wait_for_page_load()
@@ -1092,6 +1809,7 @@ class ChaoxingAutoLearner:
                 self.logger.warning(f"方法2失败: {e}")
             
             # 方法3: 尝试隐藏弹窗
+            self.note_fallback("popup_close:hide")
             try:
                 self.logger.info("尝试隐藏弹窗...")
                 self.driver.execute_script("""
@@ -1113,6 +1831,7 @@ class ChaoxingAutoLearner:
                 self.logger.warning(f"方法3失败: {e}")
             
             # 方法4: 尝试导航到课程目录作为最后手段
+            self.note_fallback("popup_close:catalog")
             try:
                 self.logger.info("尝试方法4: 导航到课程目录...")
                 if self.navigate_to_catalog():
@@ -1160,8 +1879,7 @@ class ChaoxingAutoLearner:
             
             # 检查页面文本是否还包含人脸识别相关内容
             try:
-                page_source = self.driver.page_source
-                if any(text in page_source for text in ["人脸信息采集", "请使用手机APP采集人脸信息", "请扫描下方二维码"]):
+                if self.driver.execute_script(self.FACE_TEXT_JS, FACE_TEXTS):
                     self.logger.info("❌ 验证失败：页面仍包含人脸识别相关文本")
                     return False
             except:
@@ -1178,76 +1896,121 @@ class ChaoxingAutoLearner:
         """等待页面加载完成"""
         try:
             # 等待页面加载状态
+            started = time.time()
             WebDriverWait(self.driver, 10).until(
                 lambda driver: driver.execute_script("return document.readyState") == "complete"
             )
+            self.latency.record("page_load", time.time() - started)
             time.sleep(2)
             self.logger.info("页面加载完成")
         except Exception as e:
             self.logger.warning(f"等待页面加载时出错: {e}")
     
-    def run(self):
-        """运行自动化学习程序"""
+    def wait_time(self, name):
+        """返回等待时间配置项的校准值（样本不足时为Config中的默认值）"""
+        return self.latency.timeout(name)
+    
+    def poll_until(self, probe, timeout, metric=None, interval=0.5):
+        """轮询probe直到返回真值或超时，metric不为空时记录实际等待时长"""
+        started = time.time()
+        ready = False
+        while True:
+            try:
+                if probe():
+                    ready = True
+                    break
+            except Exception:
+                pass
+            if time.time() - started >= timeout:
+                break
+            time.sleep(interval)
+        
+        if metric:
+            # 超时也记录（按超时时长），慢网络的样本会把校准值推高
+            self.latency.record(metric, time.time() - started)
+        return ready
+    
+    def wait_for_player(self):
+        """点击课程后等待视频iframe中出现播放按钮"""
+        if not self.poll_until(lambda: self.driver.execute_script(self.PLAYER_READY_JS),
+                               self.wait_time("VIDEO_WAIT_TIME"), metric="player_ready"):
+            self.logger.warning(f"等待播放器超时 ({self.wait_time('VIDEO_WAIT_TIME')}秒)，继续尝试")
+    
+    def profile_section(self, name):
+        """开启性能分析时把代码块单独统计为一个片段"""
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.section(name)
+    
+    def run(self, course_urls=None):
+        """运行自动化学习程序
+        
+        course_urls: 同一账号的多个课程主页，在同一个浏览器会话中按顺序学习；
+        默认为Config.COURSE_URLS，未配置时为Config.COURSE_URL
+        """
+        course_urls = list(course_urls or Config.COURSE_URLS or [Config.COURSE_URL])
         try:
             self.logger.info("开始运行超星自动化学习程序...")
+            self.timeline.start()
+            if Config.STATUS_SERVER_ENABLED:
+                self.status_server = StatusServer(self)
+                self.status_server.start()
+            self.logger.info(f"⏲️ 当前等待时间: " + ", ".join(f"{name}={value}s" for name, value in self.latency.timeouts().items()))
             
             # 设置浏览器驱动
             if not self.setup_driver():
                 return False
             
-            # 登录
-            if not self.login():
+            # 登录（只登录一次，之后的课程主页在同一会话中打开）
+            if not self.login(course_urls[0]):
                 return False
             
-            # 导航到目录
-            if not self.navigate_to_catalog():
-                return False
+            results = []
+            for number, course_url in enumerate(course_urls, 1):
+                if len(course_urls) > 1:
+                    self.logger.info(f"📚 课程主页 {number}/{len(course_urls)}: {course_url}")
+                results.append(self.learn_course_url(course_url, opened=(number == 1)))
             
-            # 获取未完成课程
-            uncompleted_courses = self.get_uncompleted_courses()
-            
-            if not uncompleted_courses:
-                self.logger.info("所有课程已完成！")
-                return True
-            
-            # 依次学习未完成课程
-            for i, course_info in enumerate(uncompleted_courses, 1):
-                self.logger.info(f"🎯 学习进度: {i}/{len(uncompleted_courses)} - {course_info['title']}")
-                
-                # 学习当前课程
-                study_result = self.study_course(course_info)
-                
-                if study_result:
-                    self.logger.info(f"✅ 课程 {course_info['title']} 学习完成")
-                else:
-                    self.logger.warning(f"⚠️ 课程 {course_info['title']} 学习失败，继续下一个")
-                    continue
-                
-                # 学习完成后短暂等待，然后重新获取课程列表
-                self.logger.info("⏳ 等待页面稳定，准备获取最新课程列表...")
-                time.sleep(5)
-                
-                # 重新导航到目录并获取最新的未完成课程
-                if not self.navigate_to_catalog():
-                    self.logger.warning("⚠️ 重新导航到目录失败")
-                    continue
-                
-                # 重新获取未完成课程列表
-                remaining_courses = self.get_uncompleted_courses()
-                if not remaining_courses:
-                    self.logger.info("🎉 所有课程已完成！")
-                    break
-                else:
-                    self.logger.info(f"📋 还有 {len(remaining_courses)} 个课程未完成")
-            
-            self.logger.info("所有课程学习完成！")
-            return True
+            if len(course_urls) > 1:
+                self.logger.info(f"📚 课程主页处理完成: 成功 {sum(results)}/{len(results)}")
+            return all(results)
             
         except Exception as e:
             self.logger.error(f"程序运行出错: {e}")
+            if self.screenshots is not None:
+                self.screenshots.flush("run", "error")
             return False
         
         finally:
+            if self.status_server is not None:
+                self.status_server.stop()
+            
+            if self.screenshots is not None:
+                self.screenshots.close()
+            
+            if self.diagnostics is not None:
+                self.diagnostics.close()
+            
+            if self.course_state_metrics:
+                self.logger.info(f"⏱️ 本次运行各状态耗时（{len(self.course_state_metrics)} 个课程）:")
+                for line in self.run_state_metrics.histogram():
+                    self.logger.info(f"    {line}")
+            
+            if self.elements is not None and self.elements.hits:
+                self.logger.info(f"🗂️ 元素句柄缓存: {self.elements.summary()}")
+            
+            if self.retry.total_retries:
+                self.logger.info(f"🔁 本次运行重试 {self.retry.total_retries} 次，等待 {self.retry.total_wait:.1f} 秒: {self.retry.summary()}")
+            
+            if Config.AUTO_CALIBRATE:
+                self.latency.save()
+            
+            if Config.WRITE_TIMELINE_REPORT and self.timeline.courses:
+                try:
+                    self.timeline.write()
+                except Exception as e:
+                    self.logger.warning(f"保存课程时间线报告失败: {e}")
+            
             if self.driver:
                 self.driver.quit()
                 self.logger.info("浏览器已关闭")
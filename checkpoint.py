@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+课程主页检查点 - 一次运行处理多个课程主页时，每个主页单独记录进度
+
+checkpoints/<主页URL的哈希>.json 中记录主页URL、状态（in_progress / done / failed）、
+已完成和失败的小节以及更新时间。每学完一个小节写一次，程序中断后重新运行时，
+CHECKPOINT_MAX_AGE秒内已全部完成的主页直接跳过，不再打开和扫描目录。
+CHECKPOINT_ENABLED为False时（模拟和回放运行）不读写文件。
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+from config import Config
+
+
+class CourseCheckpoint:
+    """单个课程主页的检查点"""
+
+    def __init__(self, url, directory=None):
+        self.url = url
+        self.path = os.path.join(directory or Config.CHECKPOINT_DIR,
+                                 hashlib.sha1(url.encode("utf-8")).hexdigest()[:16] + ".json")
+        self.logger = logging.getLogger(__name__)
+        self.status = "in_progress"
+        self.started = time.time()
+        self.updated = None
+        self.completed = []
+        self.failed = []
+        self.remaining = None
+        self.enabled = Config.CHECKPOINT_ENABLED
+
+    @classmethod
+    def load(cls, url, directory=None):
+        """读取已有的检查点，不存在或无法解析时返回新的检查点"""
+        checkpoint = cls(url, directory)
+        if not checkpoint.enabled:
+            return checkpoint
+        try:
+            with open(checkpoint.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return checkpoint
+        if data.get("url") != url:
+            return checkpoint
+        checkpoint.status = data.get("status", "in_progress")
+        checkpoint.started = data.get("started", checkpoint.started)
+        checkpoint.updated = data.get("updated")
+        checkpoint.completed = data.get("completed", [])
+        checkpoint.failed = data.get("failed", [])
+        checkpoint.remaining = data.get("remaining")
+        return checkpoint
+
+    def is_recently_done(self, max_age=None):
+        """在max_age秒内已全部完成"""
+        max_age = Config.CHECKPOINT_MAX_AGE if max_age is None else max_age
+        return self.status == "done" and self.updated is not None and time.time() - self.updated <= max_age
+
+    def restart(self):
+        """开始新一轮学习（保留以前完成的小节记录）"""
+        self.status = "in_progress"
+        self.started = time.time()
+        self.failed = []
+        self.save()
+
+    def record(self, title, result, remaining=None):
+        """记录一个小节的结果"""
+        if result:
+            if title not in self.completed:
+                self.completed.append(title)
+        elif title not in self.failed:
+            self.failed.append(title)
+        if remaining is not None:
+            self.remaining = remaining
+        self.save()
+
+    def finish(self, status):
+        self.status = status
+        self.save()
+
+    def to_dict(self):
+        return {
+            "url": self.url,
+            "status": self.status,
+            "started": self.started,
+            "updated": self.updated,
+            "completed": self.completed,
+            "failed": self.failed,
+            "remaining": self.remaining,
+        }
+
+    def save(self):
+        self.updated = time.time()
+        if not self.enabled:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            self.logger.warning(f"保存检查点失败: {e}")
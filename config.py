@@ -6,6 +6,16 @@ class Config:
     
     # 课程主页URL
     COURSE_URL = "https://"   #填入自己的课程主页URL
+    # 同一账号要依次学习的多个课程主页URL（在同一个浏览器会话中处理），为空时只学习COURSE_URL
+    COURSE_URLS = []
+    CHECKPOINT_ENABLED = True
+    CHECKPOINT_DIR = "checkpoints"  # 每个课程主页的进度检查点
+    CHECKPOINT_MAX_AGE = 12 * 3600  # 检查点显示已全部完成且在该时间（秒）内的课程主页，重新运行时跳过
+    
+    # 启动前检查（preflight.py），在启动浏览器之前并行检查依赖、配置、ChromeDriver和课程站点
+    PREFLIGHT_ENABLED = True
+    PREFLIGHT_TIMEOUT = 5  # 所有检查的总时长上限（秒），超时未完成的检查记为失败
+    PREFLIGHT_NETWORK_TIMEOUT = 3  # 连接课程站点的超时（秒）
     
     # 浏览器配置
     BROWSER_HEADLESS = False  # 设置为True可以无头模式运行
@@ -21,6 +31,104 @@ class Config:
     PAGE_LOAD_WAIT = 5  # 页面加载等待时间（秒）
     PLAY_BUTTON_WAIT = 15  # 播放按钮等待时间（秒）
     PLAYBACK_SPEED_WAIT = 20  # 播放速度设置前等待时间（秒）
+    PLAYER_HELPER_ENABLED = True  # 通过注入的控制脚本播放、设置倍速和读取状态（失败时退回点击按钮和倍速菜单）
+    VIDEO_LOWEST_QUALITY = False  # 播放器加载后切换到最低清晰度，节省流量和解码开销
+    STATUS_CHECK_INTERVAL = 30  # 播放中检查视频状态的间隔（秒）
+    CATALOG_WATCH_ENABLED = True  # 用MutationObserver监听目录状态变化，学完课程后不再回到目录重新扫描
+    NETWORK_OBSERVER_ENABLED = True  # 从Chrome性能日志读取播放器的进度上报响应（只读），服务器确认完成即结束当前视频
+    PROGRESS_URL_PATTERNS = ["/multimedia/log/"]  # 进度上报请求的URL特征，响应中isPassed为true表示任务点完成
+    
+    # 课程时间预算：剩余视频时长 / 播放倍速 × 系数 + 余量，超出后先重新打开课程，仍超出则跳过
+    COURSE_BUDGET_FACTOR = 1.2
+    COURSE_BUDGET_MARGIN = 180  # 余量（秒）
+    COURSE_BUDGET_NO_DURATION = 900  # 拿不到视频时长时的预算（秒）
+    COURSE_BUDGET_RECOVERIES = 1  # 超出预算后重新打开课程的次数
+    
+    # 卡顿检测：播放进度超过STALL_DETECT_SECONDS秒不前进即判定卡住，
+    # 依次尝试重新播放、跳到当前位置（每步最多等待STALL_STEP_WAIT秒），最后重新打开课程
+    STALL_DETECT_SECONDS = 10
+    STALL_STEP_WAIT = 5
+    STALL_MAX_RELOADS = 1
+    
+    # 重试策略（retry_policy.py）：只重试元素过期、被遮挡等暂时性错误，等待按指数退避并加随机抖动
+    RETRY_ATTEMPTS = 3  # 每个操作最多尝试的次数（含第一次）
+    RETRY_BASE_DELAY = 1.0  # 第一次重试前的等待（秒），之后每次翻倍
+    RETRY_MAX_DELAY = 8.0  # 单次等待上限（秒）
+    RETRY_JITTER = 0.5  # 等待时间在 [1 - RETRY_JITTER, 1] 倍之间随机
+    RETRY_OPERATION_TIMEOUT = 30  # 单个操作（含重试）的时间上限（秒）
+    RETRY_COURSE_BUDGET = 60  # 单个课程中所有重试等待的总上限（秒）
+    
+    # 页面结构指纹（dom_fingerprint.py）：目录和播放器的标签/class骨架与上次正常时不同时报警并保存一份快照
+    FINGERPRINT_ENABLED = True
+    FINGERPRINT_FILE = "dom_fingerprints.json"  # 上次正常运行时的骨架
+    FINGERPRINT_SNAPSHOT_DIR = "snapshots"  # 结构变化时的快照目录，为空时不保存
+    # 计算骨架时忽略的状态class（播放中、选中、小节完成状态等），class中的数字已替换为#
+    FINGERPRINT_IGNORE_CLASSES = r"^(vjs-(playing|paused|has-started|user-(in)?active|waiting|seeking|ended|fullscreen|scrubbing|error|workinghover|controls-disabled|hidden|lock-showing|selected)|catalog_points_yi|prevTips|icon_Completed|active|current|cur|selected|on|hover|focus|show|hide|hidden)$"
+    FINGERPRINT_MAX_DEPTH = 12
+    FINGERPRINT_MAX_NODES = 1500
+    
+    # 超时自动校准：根据实测延迟的滚动百分位推算上面各等待时间
+    AUTO_CALIBRATE = True
+    LATENCY_PROFILE_FILE = "latency_profile.json"  # 本地延迟记录
+    LATENCY_WINDOW = 100  # 每个指标保留的最近样本数
+    CALIBRATION_MIN_SAMPLES = 5  # 样本数达到后才使用校准值
+    CALIBRATION_PERCENTILE = 99  # 使用的百分位
+    CALIBRATION_MARGIN = 1.5  # 百分位之上的余量倍数
+    CALIBRATION_MIN_TIMEOUT = 1  # 校准值下限（秒）
+    CALIBRATION_MAX_FACTOR = 2  # 校准值上限为默认值的倍数
+    
+    # 课程状态机各状态的超时时间（秒，按单个课程内累计时间计算）
+    STATE_TIMEOUTS = {
+        "navigate": 120,
+        "click": 120,
+        "player_ready": 180,
+        "playing": FACE_RECOGNITION_TIMEOUT,  # 课程时间预算的上限
+        "ended": 300,
+        "cleanup": 60,
+    }
+    
+    # 课程时间线报告
+    WRITE_TIMELINE_REPORT = True  # 每次运行结束后输出时间线报告
+    REPORT_DIR = "reports"  # 报告输出目录（timeline.json / timeline.csv / report.html）
+    
+    # 性能分析配置（run.py --profile）
+    PROFILE_DIR = "profiles"  # 分析结果输出目录
+    PROFILE_SAMPLE_INTERVAL = 0.01  # 调用栈采样间隔（秒）
+    
+    # 本地状态接口（/status 为JSON，/metrics 为Prometheus格式），只监听本机
+    STATUS_SERVER_ENABLED = False
+    STATUS_SERVER_HOST = "127.0.0.1"
+    STATUS_SERVER_PORT = 8765
+    
+    # 后台截图缓冲：关键节点通过CDP抓取缩小的JPEG，只保留最近SCREENSHOT_BUFFER_SIZE帧，
+    # 课程失败或超时时写入SCREENSHOT_DIR
+    SCREENSHOT_BUFFER_ENABLED = False
+    SCREENSHOT_BUFFER_SIZE = 30
+    SCREENSHOT_INTERVAL = 10  # 两帧之间的最短间隔（秒），超时和卡顿时不受限制
+    SCREENSHOT_QUALITY = 40  # JPEG质量
+    SCREENSHOT_SCALE = 0.5  # 缩放比例
+    SCREENSHOT_DIR = "screenshots"
+    
+    # 失败诊断：找不到播放按钮等失败时一次抓取整棵frame树的快照，选择器分析在后台线程中完成
+    DIAGNOSTICS_ENABLED = True
+    DIAGNOSTICS_DIR = "diagnostics"  # 快照和分析结果的输出目录，为空时只写日志
+    DIAGNOSTICS_MAX_NODES = 5000  # 快照中最多序列化的元素数
+    DIAGNOSTICS_QUEUE_SIZE = 4  # 等待分析的快照上限，队列满时丢弃新的快照
+    
+    # 运行追踪配置（run.py --trace），输出Chrome trace-event格式
+    TRACE_DIR = "traces"
+    
+    # WebDriver会话录制（run.py --record），回放: python recording.py <文件>
+    RECORD_DIR = "recordings"
+    
+    # ChromeDriver下载（download_chromedriver.py），使用Chrome for Testing发布的版本
+    # 镜像根地址下按 <版本>/<平台>/chromedriver-<平台>.zip 存放，可以是HTTP(S)地址或本地目录
+    CHROMEDRIVER_MIRROR = "https://storage.googleapis.com/chrome-for-testing-public"
+    CHROMEDRIVER_MANIFEST_URL = "https://googlechromelabs.github.io/chrome-for-testing/known-good-versions-with-downloads.json"
+    CHROMEDRIVER_MANIFEST_MAX_AGE = 24 * 3600  # 版本清单缓存时间（秒）
+    # 按版本缓存下载的压缩包，多台机器可指向同一个共享目录；为空时使用 ~/.cache/chaoxing-chromedriver
+    CHROMEDRIVER_CACHE_DIR = ""
+    CHROMEDRIVER_DOWNLOAD_RETRIES = 3  # 下载中断后断点续传的次数
     
     # 选择器配置
     SELECTORS = {
@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+"""
+后台失败诊断 - 失败时只在主线程抓取一次frame树快照，选择器分析和日志输出都在工作线程中离线完成
+
+debug_play_button 会逐个选择器 find_elements、逐个元素读取属性，几十次往返期间学习流程一直在等。这里改为：
+1. 主线程调用capture()，一次脚本调用从最外层页面开始序列化整棵frame树
+   （标签、常用属性、是否可见/禁用、自身文本，同源iframe递归展开），然后立即返回继续恢复流程
+2. 工作线程用简单的CSS选择器匹配在快照上统计每个选择器的匹配情况，输出与原来相同的调试信息
+3. DIAGNOSTICS_DIR不为空时，快照和分析结果写到 diagnostics/<时间>_<课程>_<原因>/ 下
+
+队列最多保留DIAGNOSTICS_QUEUE_SIZE个待分析的快照，满了就丢弃新的快照，不会让失败拖慢学习流程。
+选择器只支持 标签、#id、.class、[属性]、[属性=值]（还有 *= ^= $=）和后代组合，足够覆盖调试用的选择器。
+"""
+
+import os
+import re
+import json
+import queue
+import logging
+import threading
+from datetime import datetime
+from config import Config
+from screenshots import _safe_name
+
+SNAPSHOT_JS = """
+return (function (maxNodes, attrNames) {
+    var count = 0, frameTree = null, top = window;
+    try { while (top.parent !== top && top.parent.document) top = top.parent; } catch (e) {}
+    function ownText(el) {
+        var text = '';
+        for (var i = 0; i < el.childNodes.length; i++) {
+            if (el.childNodes[i].nodeType === 3) text += el.childNodes[i].nodeValue;
+        }
+        return text.replace(/\\s+/g, ' ').trim().slice(0, 80);
+    }
+    function node(el, win, path) {
+        if (count >= maxNodes) return null;
+        count++;
+        var style = win.getComputedStyle(el);
+        var out = {t: el.tagName.toLowerCase(), a: {}, c: [],
+                   v: !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length) &&
+                      style.visibility !== 'hidden' && style.display !== 'none'};
+        for (var i = 0; i < attrNames.length; i++) {
+            var value = el.getAttribute(attrNames[i]);
+            if (value !== null) out.a[attrNames[i]] = value.slice(0, 200);
+        }
+        var text = ownText(el);
+        if (text) out.x = text;
+        if (el.disabled) out.d = true;
+        if (out.t === 'iframe') {
+            var index = Array.prototype.indexOf.call(el.ownerDocument.getElementsByTagName('iframe'), el);
+            try { out.f = frame(el.contentWindow, path.concat([el.id || el.name || '#' + index])); }
+            catch (e) { out.f = {error: 'cross-origin'}; }
+        }
+        for (var k = 0; k < el.children.length; k++) {
+            var child = node(el.children[k], win, path);
+            if (child) out.c.push(child);
+        }
+        return out;
+    }
+    function frame(win, path) {
+        var doc = win.document;
+        return {path: path, url: doc.URL, current: win === window,
+                tree: doc.documentElement ? node(doc.documentElement, win, path) : null};
+    }
+    frameTree = frame(top, []);
+    frameTree.truncated = count >= maxNodes;
+    return frameTree;
+})(arguments[0], arguments[1]);
+"""
+
+SNAPSHOT_ATTRIBUTES = ["id", "class", "name", "title", "aria-label", "type", "style", "src"]
+
+# 找不到播放按钮时检查的选择器（与debug_play_button相同）
+PLAY_BUTTON_SELECTORS = [
+    ".fullScreenContainer",
+    ".fullScreenContainer button.vjs-big-play-button",
+    ".fullScreenContainer .vjs-big-play-button",
+    ".fullScreenContainer button[title*='播放']",
+    ".fullScreenContainer button[class*='play']",
+    ".fullScreenContainer .vjs-play-button",
+    "button.vjs-big-play-button",
+    ".vjs-big-play-button",
+    "button[title*='播放']",
+    "button[class*='play']",
+    ".vjs-play-button",
+    "button[aria-label*='播放']",
+    ".video-js, .vjs-tech, video",
+]
+
+# 页面中有人脸识别文本却找不到可见弹窗时检查的选择器和文本
+FACE_POPUP_SELECTORS = [
+    "div.maskDiv1.chapterVideoFaceQrMaskDiv",
+    "div.maskDiv1",
+    "[class*='chapterVideoFaceQrMaskDiv']",
+    "[class*='maskDiv1']",
+    "div[class*='FaceQrMaskDiv']",
+    "div.popDiv1",
+    "[class*='faceCollectQrPopVideo']",
+    "[class*='faceRecognition_0']",
+]
+FACE_TEXTS = ["人脸信息采集", "请使用手机APP采集人脸信息", "请扫描下方二维码"]
+
+_COMPOUND_PATTERN = re.compile(
+    r"([a-zA-Z][\w-]*|\*)|#([\w-]+)|\.([\w-]+)|\[\s*([\w-]+)\s*(?:([*^$]?=)\s*(?:'([^']*)'|\"([^\"]*)\"|([^\]\s]*)))?\s*\]")
+
+
+def _split_descendants(selector):
+    """按空白拆分后代组合（方括号中的空白不拆）"""
+    parts, current, depth = [], "", 0
+    for char in selector.strip():
+        depth += char == "["
+        depth -= char == "]"
+        if char.isspace() and depth == 0:
+            if current:
+                parts.append(current)
+            current = ""
+        else:
+            current += char
+    if current:
+        parts.append(current)
+    return parts
+
+
+def parse_selector(selector):
+    """把选择器解析为 [[复合选择器, ...], ...]（逗号分隔的每一项一个列表），不支持的写法抛出ValueError"""
+    alternatives = []
+    for alternative in selector.split(","):
+        compounds = []
+        for part in _split_descendants(alternative):
+            conditions, position = [], 0
+            while position < len(part):
+                match = _COMPOUND_PATTERN.match(part, position)
+                if match is None or match.end() == position:
+                    raise ValueError(f"不支持的选择器: {selector}")
+                tag, id_, class_, attr, op, quoted1, quoted2, bare = match.groups()
+                if tag and tag != "*":
+                    conditions.append(("tag", tag.lower(), None))
+                elif id_:
+                    conditions.append(("attr", "id", ("=", id_)))
+                elif class_:
+                    conditions.append(("class", class_, None))
+                elif attr:
+                    value = next((v for v in (quoted1, quoted2, bare) if v is not None), None)
+                    conditions.append(("attr", attr, (op, value) if op else None))
+                position = match.end()
+            compounds.append(conditions)
+        if not compounds:
+            raise ValueError(f"不支持的选择器: {selector}")
+        alternatives.append(compounds)
+    return alternatives
+
+
+def _matches(node, conditions):
+    attrs = node.get("a", {})
+    for kind, name, test in conditions:
+        if kind == "tag":
+            if node.get("t") != name:
+                return False
+        elif kind == "class":
+            if name not in (attrs.get("class") or "").split():
+                return False
+        else:
+            value = attrs.get(name)
+            if value is None:
+                return False
+            if test is None:
+                continue
+            op, expected = test
+            if op == "=" and value != expected or op == "*=" and expected not in value \
+                    or op == "^=" and not value.startswith(expected) or op == "$=" and not value.endswith(expected):
+                return False
+    return True
+
+
+def _matches_chain(node, ancestors, compounds):
+    """最后一个复合选择器匹配node，其余的按顺序匹配某个祖先"""
+    if not _matches(node, compounds[-1]):
+        return False
+    remaining = len(compounds) - 2
+    for ancestor in reversed(ancestors):
+        if remaining < 0:
+            break
+        if _matches(ancestor, compounds[remaining]):
+            remaining -= 1
+    return remaining < 0
+
+
+def iter_frames(snapshot):
+    """遍历快照中的所有frame（包括嵌套的iframe）"""
+    stack = [snapshot]
+    while stack:
+        frame = stack.pop()
+        if not frame or frame.get("tree") is None:
+            continue
+        yield frame
+        nodes = [frame["tree"]]
+        nested = []
+        while nodes:
+            node = nodes.pop()
+            if node.get("f"):
+                nested.append(node["f"])
+            nodes.extend(reversed(node.get("c", [])))
+        stack.extend(reversed(nested))
+
+
+def select(tree, selector):
+    """在单个frame的快照树中查找匹配的节点（不进入iframe）"""
+    alternatives = parse_selector(selector)
+    found = []
+    stack = [(tree, ())]
+    while stack:
+        node, ancestors = stack.pop()
+        if any(_matches_chain(node, ancestors, compounds) for compounds in alternatives):
+            found.append(node)
+        children = node.get("c", [])
+        for child in reversed(children):
+            stack.append((child, ancestors + (node,)))
+    return found
+
+
+def _text(node):
+    parts = [node.get("x", "")]
+    for child in node.get("c", []):
+        parts.append(_text(child))
+    return " ".join(p for p in parts if p)
+
+
+def frame_name(frame):
+    path = frame.get("path") or []
+    name = "主文档" if not path else "iframe " + " > ".join(str(p) for p in path)
+    return name + ("（当前）" if frame.get("current") else "")
+
+
+def analyze(snapshot, selectors, texts=()):
+    """在快照上统计每个选择器和文本的匹配情况，返回日志行列表"""
+    lines = []
+    frames = list(iter_frames(snapshot))
+    lines.append(f"快照包含 {len(frames)} 个frame" + ("（元素数达到上限，已截断）" if snapshot.get("truncated") else ""))
+    for selector in selectors:
+        try:
+            matches = [(frame, node) for frame in frames for node in select(frame["tree"], selector)]
+        except ValueError as e:
+            lines.append(str(e))
+            continue
+        counts = {}
+        for frame, _ in matches:
+            counts[frame_name(frame)] = counts.get(frame_name(frame), 0) + 1
+        where = "，".join(f"{name} {count}" for name, count in counts.items())
+        lines.append(f"选择器 '{selector}' 找到 {len(matches)} 个元素" + (f"（{where}）" if where else ""))
+        for j, (frame, node) in enumerate(matches[:3]):  # 只显示前3个
+            attrs = node.get("a", {})
+            lines.append(f"  元素 {j+1}: 类名={attrs.get('class')}, 标题={attrs.get('title')}, "
+                         f"文本={_text(node)[:40]!r}, 可见={node.get('v')}, 启用={not node.get('d')}")
+    for text in texts:
+        holders = [(frame, node) for frame in frames for node in select(frame["tree"], "*") if text in node.get("x", "")]
+        lines.append(f"文本 '{text}' 出现在 {len(holders)} 个元素中")
+        for frame, node in holders[:3]:
+            attrs = node.get("a", {})
+            lines.append(f"  {frame_name(frame)}: <{node.get('t')} class='{attrs.get('class')}'> 可见={node.get('v')}")
+    return lines
+
+
+class FailureDiagnostics:
+    """失败时的frame树快照和后台选择器分析"""
+
+    def __init__(self, driver, output_dir=None, queue_size=None, max_nodes=None):
+        self.driver = driver
+        self.output_dir = Config.DIAGNOSTICS_DIR if output_dir is None else output_dir  # 为空时只写日志
+        self.max_nodes = max_nodes or Config.DIAGNOSTICS_MAX_NODES
+        self.logger = logging.getLogger(__name__)
+        self.captured = 0
+        self.dropped = 0
+        self.analyzed = []  # [(原因, 课程, 日志行)]
+        self.written = []
+        self._queue = queue.Queue(maxsize=queue_size or Config.DIAGNOSTICS_QUEUE_SIZE)
+        self._worker = threading.Thread(target=self._work, name="failure-diagnostics", daemon=True)
+        self._worker.start()
+
+    def capture(self, reason, course=None, selectors=(), texts=()):
+        """一次脚本调用抓取frame树快照并交给工作线程分析，失败或队列已满时返回False"""
+        # 队列已满时快照也会被丢弃，不再执行抓取脚本
+        if self._queue.full():
+            self.dropped += 1
+            self.logger.warning(f"诊断队列已满，跳过本次快照（{reason}）")
+            return False
+        try:
+            snapshot = self.driver.execute_script(SNAPSHOT_JS, self.max_nodes, SNAPSHOT_ATTRIBUTES)
+        except Exception as e:
+            self.logger.warning(f"抓取诊断快照失败: {e}")
+            return False
+        if not isinstance(snapshot, dict):
+            return False
+        try:
+            self._queue.put_nowait((reason, course, list(selectors), list(texts), snapshot))
+        except queue.Full:
+            self.dropped += 1
+            self.logger.warning(f"诊断队列已满，丢弃本次快照（{reason}）")
+            return False
+        self.captured += 1
+        return True
+
+    def close(self, timeout=10):
+        """等待已提交的快照分析完成（最多timeout秒）后退出"""
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._worker.join(timeout=timeout)
+
+    # 工作线程
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            reason, course, selectors, texts, snapshot = item
+            try:
+                lines = analyze(snapshot, selectors, texts)
+                self.analyzed.append((reason, course, lines))
+                self.logger.info(f"🔬 诊断（{reason}{f'，{course}' if course else ''}）:")
+                for line in lines:
+                    self.logger.info(f"    {line}")
+                if self.output_dir:
+                    self._write(reason, course, snapshot, lines)
+            except Exception as e:
+                self.logger.warning(f"分析诊断快照失败: {e}")
+
+    def _write(self, reason, course, snapshot, lines):
+        directory = os.path.join(
+            self.output_dir, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{_safe_name(course)}_{_safe_name(reason)}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "snapshot.json"), "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        with open(os.path.join(directory, "analysis.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        self.written.append(directory)
+        self.logger.info(f"🔬 诊断快照已保存: {directory}")
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+页面结构指纹 - 在运行时计算目录和播放器的标签/class骨架的哈希，与上次正常运行时的记录比较
+
+超星改版后，catalog_points_yi prevTips、ans-insertvideo-online 等选择器会悄无声息地失效，
+学习程序只会退到最慢的备用方案（逐个扫描iframe、debug_play_button），而且每个课程都重复一遍。
+
+    check(name, healthy)  在当前frame中计算name（catalog / player）的骨架，一次脚本调用：
+        与记录一致                -> "ok"
+        不一致但流程正常(healthy)  -> "updated"，把当前骨架记为新的正常结构
+        不一致且流程走了备用方案    -> "drift"，输出缺少/新增的骨架并保存一份快照（每次运行每项只保存一次）
+        已经报告过的不一致         -> "known_drift"，调用方据此跳过重复的调试
+    本次运行中已确认正常的项，流程继续正常时不再计算。
+
+骨架是根元素下每个元素 "父元素标签.class > 标签.class" 的去重集合，忽略播放、选中、小节完成等状态class，
+class中的数字替换为#；记录保存在FINGERPRINT_FILE，快照保存在FINGERPRINT_SNAPSHOT_DIR。
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+from datetime import datetime
+from config import Config
+
+FINGERPRINT_JS = """
+return (function (rootSelectors, ignore, maxDepth, maxNodes) {
+    var root = null;
+    for (var i = 0; i < rootSelectors.length && !root; i++) root = document.querySelector(rootSelectors[i]);
+    root = root || document.body;
+    if (!root) return null;
+    var ignored = new RegExp(ignore);
+    function token(el) {
+        var classes = [];
+        for (var k = 0; k < el.classList.length; k++) {
+            var name = el.classList[k].replace(/\\d+/g, '#');
+            if (!ignored.test(name) && classes.indexOf(name) < 0) classes.push(name);
+        }
+        classes.sort();
+        return el.tagName.toLowerCase() + (classes.length ? '.' + classes.join('.') : '');
+    }
+    var seen = {}, count = 0, stack = [[root, 0, '']];
+    while (stack.length && count < maxNodes) {
+        var item = stack.pop(), el = item[0], own = token(el);
+        count++;
+        seen[item[2] + '>' + own] = true;
+        if (item[1] >= maxDepth) continue;
+        for (var c = el.children.length - 1; c >= 0; c--) stack.push([el.children[c], item[1] + 1, own]);
+    }
+    return Object.keys(seen).sort();
+})(arguments[0], arguments[1], arguments[2], arguments[3]);
+"""
+
+# 各项骨架的根元素（依次尝试，都没有时用body）
+FINGERPRINT_ROOTS = {
+    "catalog": [".posCatalog", "#coursetree"],
+    "player": [".fullScreenContainer", ".video-js"],
+}
+
+FINGERPRINT_LABELS = {
+    "catalog": "课程目录",
+    "player": "视频播放器",
+}
+
+
+def fingerprint_hash(skeleton):
+    return hashlib.sha1("\n".join(skeleton).encode("utf-8")).hexdigest()[:16]
+
+
+class DomFingerprints:
+    """目录和播放器结构指纹的记录与比较"""
+
+    def __init__(self, driver, path=None, snapshot_dir=None):
+        self.driver = driver
+        self.path = Config.FINGERPRINT_FILE if path is None else path  # 为空时只在内存中比较（模拟和回放运行）
+        self.snapshot_dir = Config.FINGERPRINT_SNAPSHOT_DIR if snapshot_dir is None else snapshot_dir  # 为空时不保存快照
+        self.logger = logging.getLogger(__name__)
+        self.known = self._load()  # {name: {"hash", "skeleton", "updated"}}
+        self.verified = set()  # 本次运行中已确认正常的项
+        self.drifted = {}  # 本次运行中已报告过的不一致 {name: hash}
+        self.snapshots = []
+
+    def _load(self):
+        if not self.path:
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self.known, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            self.logger.warning(f"保存页面结构指纹失败: {e}")
+
+    def compute(self, name):
+        """在当前frame中计算骨架，失败时返回None"""
+        try:
+            skeleton = self.driver.execute_script(FINGERPRINT_JS, FINGERPRINT_ROOTS.get(name, []),
+                                                  Config.FINGERPRINT_IGNORE_CLASSES,
+                                                  Config.FINGERPRINT_MAX_DEPTH, Config.FINGERPRINT_MAX_NODES)
+        except Exception as e:
+            self.logger.debug(f"计算页面结构指纹失败（{name}）: {e}")
+            return None
+        return skeleton if isinstance(skeleton, list) else None
+
+    def check(self, name, healthy, hint=""):
+        """比较当前结构与记录，返回 ok / updated / drift / known_drift / unknown（无法计算）；
+        healthy为False时不把当前结构记为正常，hint附加在报警信息后"""
+        if healthy and name in self.verified:
+            return "ok"
+        skeleton = self.compute(name)
+        if skeleton is None:
+            return "unknown"
+        digest = fingerprint_hash(skeleton)
+        known = self.known.get(name)
+
+        if known is not None and known.get("hash") == digest:
+            if healthy:
+                self.verified.add(name)
+            return "ok"
+        if healthy:
+            if known is not None:
+                self.logger.info(f"🧬 {FINGERPRINT_LABELS.get(name, name)}结构有变化，流程正常，已更新记录")
+            self.known[name] = {"hash": digest, "skeleton": skeleton, "updated": time.time()}
+            self.verified.add(name)
+            self._save()
+            return "updated"
+        if known is None:
+            # 还没有正常时的记录，无从比较
+            return "unknown"
+        if self.drifted.get(name) == digest:
+            return "known_drift"
+
+        self.drifted[name] = digest
+        missing = sorted(set(known.get("skeleton", [])) - set(skeleton))
+        added = sorted(set(skeleton) - set(known.get("skeleton", [])))
+        self.logger.warning(f"⚠️ {FINGERPRINT_LABELS.get(name, name)}结构与上次正常运行时不同，超星可能已改版，"
+                            f"相关选择器可能已失效（缺少 {len(missing)} 项，新增 {len(added)} 项）" + (f"，{hint}" if hint else ""))
+        for line in missing[:10]:
+            self.logger.warning(f"    缺少: {line}")
+        for line in added[:10]:
+            self.logger.warning(f"    新增: {line}")
+        self.save_snapshot(name, skeleton, known, missing, added)
+        return "drift"
+
+    def save_snapshot(self, name, skeleton, known, missing, added):
+        """保存当前frame的页面源码和骨架对比（snapshot_dir为空时不保存）"""
+        if not self.snapshot_dir:
+            return None
+        directory = os.path.join(self.snapshot_dir, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{name}")
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, "skeleton.json"), "w", encoding="utf-8") as f:
+                json.dump({"name": name, "hash": fingerprint_hash(skeleton), "known_hash": known.get("hash"),
+                           "missing": missing, "added": added, "skeleton": skeleton},
+                          f, ensure_ascii=False, indent=2)
+            with open(os.path.join(directory, "page.html"), "w", encoding="utf-8") as f:
+                f.write(self.driver.page_source)
+        except Exception as e:
+            self.logger.warning(f"保存页面结构快照失败: {e}")
+            return None
+        self.snapshots.append(directory)
+        self.logger.warning(f"📸 页面结构快照已保存: {directory}")
+        return directory
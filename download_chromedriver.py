@@ -2,15 +2,43 @@
 # -*- coding: utf-8 -*-
 """
 ChromeDriver下载和安装脚本
+
+版本来自Chrome for Testing发布的版本清单（CHROMEDRIVER_MANIFEST_URL），按本机Chrome版本选择
+同一构建号（其次同一主版本）中最新的ChromeDriver。下载的压缩包按版本缓存在CHROMEDRIVER_CACHE_DIR：
+    <缓存目录>/manifest.json                              版本清单（CHROMEDRIVER_MANIFEST_MAX_AGE内复用）
+    <缓存目录>/<版本>/<平台>/chromedriver-<平台>.zip       校验通过的压缩包
+    <缓存目录>/<版本>/<平台>/chromedriver-<平台>.zip.sha256
+    <缓存目录>/<版本>/<平台>/chromedriver-<平台>.zip.part  未下载完的部分，下次用HTTP Range续传
+
+校验：镜像中有 <压缩包>.sha256 时按它校验，官方地址按响应头 x-goog-hash 中的MD5校验，
+此外都会检查压缩包完整性；校验通过后记下SHA-256，复用缓存时再校验一次。
+
+镜像（CHROMEDRIVER_MIRROR 或 --mirror）可以是HTTP(S)地址，也可以是本地目录（例如机房共享目录），
+目录结构与官方相同。无法获取版本清单时，从缓存和本地镜像中已有的版本里选择。
+
+    python download_chromedriver.py
+    python download_chromedriver.py --mirror http://192.168.1.10:8000 --yes
+    python download_chromedriver.py --chrome-version 120.0.6099.109 --download-only   # 只预先填充缓存
 """
 
 import os
+import re
 import sys
-import requests
+import json
+import time
+import base64
+import shutil
+import hashlib
 import zipfile
+import argparse
 import subprocess
 import platform
-from pathlib import Path
+import requests
+from config import Config
+from retry_policy import RetryPolicy
+
+CHUNK_SIZE = 1024 * 1024
+
 
 def get_chrome_version():
     """获取Chrome浏览器版本"""
@@ -35,126 +63,381 @@ def get_chrome_version():
         print(f"获取Chrome版本失败: {e}")
         return None
 
-def get_chromedriver_version(chrome_version):
+
+def get_platform_name():
+    """Chrome for Testing中的平台名称"""
+    system = platform.system().lower()
+    machine = platform.machine().lower()
+    if system == "windows":
+        return "win64" if "64" in machine else "win32"
+    if system == "darwin":
+        return "mac-arm64" if "arm" in machine else "mac-x64"
+    return "linux64"
+
+
+def driver_filename(platform_name):
+    return "chromedriver.exe" if platform_name.startswith("win") else "chromedriver"
+
+
+def get_cache_dir():
+    return Config.CHROMEDRIVER_CACHE_DIR or os.path.join(os.path.expanduser("~"), ".cache", "chaoxing-chromedriver")
+
+
+def _is_url(location):
+    return location.startswith(("http://", "https://"))
+
+
+def _local_path(location):
+    return location[len("file://"):] if location.startswith("file://") else location
+
+
+def _version_key(version):
+    return tuple(int(part) for part in version.split(".") if part.isdigit())
+
+
+def match_version(chrome_version, versions):
+    """选择与Chrome版本对应的ChromeDriver版本：完全相同 > 同一构建号中最新 > 同一主版本中最新"""
+    versions = set(versions)
+    if chrome_version in versions:
+        return chrome_version
+    parts = chrome_version.split(".")
+    for prefix in (parts[:3], parts[:1]):
+        candidates = [v for v in versions if v.split(".")[:len(prefix)] == prefix]
+        if candidates:
+            return max(candidates, key=_version_key)
+    return None
+
+
+# ---------------------------------------------------------------- 版本清单
+
+def load_manifest(cache_dir=None, max_age=None):
+    """读取版本清单，缓存未过期时不联网；获取失败时退回过期的缓存，都没有时返回None"""
+    cache_dir = cache_dir or get_cache_dir()
+    max_age = Config.CHROMEDRIVER_MANIFEST_MAX_AGE if max_age is None else max_age
+    path = os.path.join(cache_dir, "manifest.json")
+    cached = os.path.exists(path)
+    if cached and time.time() - os.path.getmtime(path) <= max_age:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            cached = False
+
+    source = Config.CHROMEDRIVER_MANIFEST_URL
+    try:
+        if _is_url(source):
+            response = requests.get(source, timeout=30)
+            response.raise_for_status()
+            manifest = response.json()
+        else:
+            with open(_local_path(source), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(path + ".tmp", path)
+        return manifest
+    except (requests.RequestException, OSError, ValueError) as e:
+        print(f"获取版本清单失败: {e}")
+    if cached:
+        print("使用已过期的本地版本清单")
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return None
+
+
+def manifest_versions(manifest, platform_name):
+    """清单中提供该平台ChromeDriver的版本"""
+    versions = []
+    for entry in (manifest or {}).get("versions", []):
+        downloads = entry.get("downloads", {}).get("chromedriver", [])
+        if any(item.get("platform") == platform_name for item in downloads):
+            versions.append(entry["version"])
+    return versions
+
+
+def offline_versions(platform_name, cache_dir=None, mirror=None):
+    """缓存和本地镜像目录中已有的版本"""
+    archive = f"chromedriver-{platform_name}.zip"
+    roots = [cache_dir or get_cache_dir()]
+    mirror = mirror or Config.CHROMEDRIVER_MIRROR
+    if not _is_url(mirror):
+        roots.append(_local_path(mirror))
+    versions = []
+    for root in roots:
+        if not os.path.isdir(root):
+            continue
+        for version in os.listdir(root):
+            if re.match(r"^\d+(\.\d+)+$", version) and os.path.exists(os.path.join(root, version, platform_name, archive)):
+                versions.append(version)
+    return versions
+
+
+def get_chromedriver_version(chrome_version, platform_name=None, mirror=None):
     """根据Chrome版本获取对应的ChromeDriver版本"""
+    platform_name = platform_name or get_platform_name()
+    version = match_version(chrome_version, manifest_versions(load_manifest(), platform_name))
+    if version is None:
+        version = match_version(chrome_version, offline_versions(platform_name, mirror=mirror))
+        if version is not None:
+            print(f"版本清单中没有找到，使用缓存或本地镜像中的版本: {version}")
+    return version
+
+
+# ---------------------------------------------------------------- 下载与校验
+
+def _file_digest(path, algorithm):
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _goog_md5(headers):
+    """Google Cloud Storage在x-goog-hash响应头中给出整个文件的MD5（base64）"""
+    for item in headers.get("x-goog-hash", "").split(","):
+        name, _, value = item.strip().partition("=")
+        if name == "md5" and value:
+            return "md5", base64.b64decode(value).hex()
+    return None
+
+
+def _read_sidecar_checksum(source):
+    """读取镜像中 <压缩包>.sha256 的内容，没有时返回None"""
     try:
-        # 提取主版本号
-        major_version = chrome_version.split('.')[0]
-        
-        # 获取ChromeDriver版本信息
-        url = f"https://chromedriver.storage.googleapis.com/LATEST_RELEASE_{major_version}"
-        response = requests.get(url, timeout=10)
-        
-        if response.status_code == 200:
-            return response.text.strip()
+        if _is_url(source):
+            response = requests.get(source + ".sha256", timeout=10)
+            if response.status_code != 200:
+                return None
+            text = response.text
         else:
-            print(f"无法获取ChromeDriver版本，HTTP状态码: {response.status_code}")
-            return None
-            
-    except Exception as e:
-        print(f"获取ChromeDriver版本失败: {e}")
+            with open(source + ".sha256", "r", encoding="utf-8") as f:
+                text = f.read()
+    except (requests.RequestException, OSError):
         return None
+    match = re.match(r"^\s*([0-9a-fA-F]{64})\b", text)
+    return ("sha256", match.group(1).lower()) if match else None
 
-def download_chromedriver(version):
-    """下载ChromeDriver"""
+
+def _download(url, part_path, retries=None):
+    """下载到part_path，已有部分时用Range续传；返回响应头中的校验值（可能为None）"""
+    found = {}
+
+    def attempt():
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        with requests.get(url, headers=headers, stream=True, timeout=30) as response:
+            if offset and response.status_code == 416:
+                # 已经下载完整
+                return found.get("checksum")
+            response.raise_for_status()
+            if offset and response.status_code != 206:
+                print("服务器不支持断点续传，重新下载")
+                offset = 0
+            elif offset:
+                print(f"从 {offset / 1024 / 1024:.1f}MB 处继续下载")
+            found["checksum"] = found.get("checksum") or _goog_md5(response.headers)
+            length = int(response.headers.get("Content-Length") or 0)
+            total = offset + length if length else None
+            with open(part_path, "ab" if offset else "wb") as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    f.write(chunk)
+            size = os.path.getsize(part_path)
+            if total and size < total:
+                raise IOError(f"下载不完整（{size}/{total}字节）")
+            return found.get("checksum")
+
+    # 中断后按重试策略等待，再从断点继续
+    policy = RetryPolicy(exceptions=(requests.RequestException, OSError),
+                         attempts=retries or Config.CHROMEDRIVER_DOWNLOAD_RETRIES,
+                         base_delay=2, max_delay=10, operation_timeout=600, course_budget=float("inf"))
+    return policy.call(attempt, "下载ChromeDriver")
+
+
+def verify_archive(path, expected=None):
+    """按expected=(算法, 十六进制值)校验，并检查压缩包完整性"""
+    if expected is not None:
+        algorithm, value = expected
+        actual = _file_digest(path, algorithm)
+        if actual != value:
+            print(f"❌ 校验失败: {algorithm} 应为 {value}，实际为 {actual}")
+            return False
     try:
-        # 确定系统架构
-        system = platform.system().lower()
-        machine = platform.machine().lower()
-        
-        if system == "windows":
-            if "64" in machine or "x86_64" in machine:
-                platform_name = "win64"
-            else:
-                platform_name = "win32"
-        elif system == "darwin":
-            if "arm" in machine:
-                platform_name = "mac_arm64"
-            else:
-                platform_name = "mac64"
-        else:  # Linux
-            if "64" in machine or "x86_64" in machine:
-                platform_name = "linux64"
-            else:
-                platform_name = "linux32"
-        
-        # 构建下载URL
-        url = f"https://chromedriver.storage.googleapis.com/{version}/chromedriver_{platform_name}.zip"
-        
-        print(f"正在下载ChromeDriver {version} for {platform_name}...")
-        print(f"下载地址: {url}")
-        
-        # 下载文件
-        response = requests.get(url, stream=True, timeout=30)
-        response.raise_for_status()
-        
-        # 保存文件
-        zip_path = "chromedriver.zip"
-        with open(zip_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        
-        print("下载完成，正在解压...")
-        
-        # 解压文件
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(".")
-        
-        # 删除zip文件
-        os.remove(zip_path)
-        
-        # 设置执行权限（Linux/macOS）
-        if system != "windows":
-            os.chmod("chromedriver", 0o755)
-        
-        print("ChromeDriver安装完成！")
+        with zipfile.ZipFile(path, "r") as archive:
+            if archive.testzip() is not None:
+                print("❌ 压缩包已损坏")
+                return False
+    except zipfile.BadZipFile:
+        print("❌ 不是有效的压缩包")
+        return False
+    return True
+
+
+def _cached_archive(zip_path):
+    """缓存中的压缩包仍然有效时返回True"""
+    if not os.path.exists(zip_path):
+        return False
+    recorded = None
+    try:
+        with open(zip_path + ".sha256", "r", encoding="utf-8") as f:
+            recorded = ("sha256", f.read().split()[0])
+    except (OSError, IndexError):
+        pass
+    if verify_archive(zip_path, recorded):
         return True
-        
+    print("缓存中的压缩包校验失败，重新下载")
+    os.remove(zip_path)
+    return False
+
+
+def fetch_archive(version, platform_name=None, mirror=None, cache_dir=None):
+    """返回缓存中校验通过的压缩包路径，缓存中没有时从镜像下载（或从本地镜像复制）"""
+    platform_name = platform_name or get_platform_name()
+    mirror = (mirror or Config.CHROMEDRIVER_MIRROR).rstrip("/")
+    archive = f"chromedriver-{platform_name}.zip"
+    directory = os.path.join(cache_dir or get_cache_dir(), version, platform_name)
+    zip_path = os.path.join(directory, archive)
+    if _cached_archive(zip_path):
+        print(f"使用缓存: {zip_path}")
+        return zip_path
+
+    os.makedirs(directory, exist_ok=True)
+    part_path = zip_path + ".part"
+    if _is_url(mirror):
+        source = f"{mirror}/{version}/{platform_name}/{archive}"
+        print(f"下载地址: {source}")
+        expected = _read_sidecar_checksum(source)
+        header_checksum = _download(source, part_path)
+        expected = expected or header_checksum
+    else:
+        source = os.path.join(_local_path(mirror), version, platform_name, archive)
+        print(f"从本地镜像复制: {source}")
+        expected = _read_sidecar_checksum(source)
+        shutil.copyfile(source, part_path)
+
+    if expected is None:
+        print("⚠️  镜像没有提供校验值，只检查压缩包完整性")
+    if not verify_archive(part_path, expected):
+        os.remove(part_path)
+        return None
+    os.replace(part_path, zip_path)
+    with open(zip_path + ".sha256", "w", encoding="utf-8") as f:
+        f.write(f"{_file_digest(zip_path, 'sha256')}  {archive}\n")
+    return zip_path
+
+
+def install_chromedriver(zip_path, platform_name=None, target_dir=None):
+    """从压缩包中取出chromedriver放到target_dir（默认为项目目录），返回安装路径"""
+    platform_name = platform_name or get_platform_name()
+    name = driver_filename(platform_name)
+    target_dir = target_dir or os.path.dirname(os.path.abspath(__file__))
+    target = os.path.join(target_dir, name)
+    with zipfile.ZipFile(zip_path, "r") as archive:
+        # Chrome for Testing的压缩包中文件位于 chromedriver-<平台>/ 目录下
+        member = next(m for m in archive.namelist() if os.path.basename(m) == name)
+        with archive.open(member) as src, open(target + ".tmp", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+    os.replace(target + ".tmp", target)
+    if not platform_name.startswith("win"):
+        os.chmod(target, 0o755)
+    return target
+
+
+def installed_version(path):
+    """已安装的chromedriver版本，无法获取时返回None"""
+    try:
+        output = subprocess.run([path, "--version"], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = re.search(r"ChromeDriver\s+([\d.]+)", output)
+    return match.group(1) if match else None
+
+
+def download_chromedriver(version, mirror=None, install=True):
+    """下载（或从缓存取出）ChromeDriver并安装到项目目录"""
+    try:
+        platform_name = get_platform_name()
+        print(f"正在获取ChromeDriver {version} for {platform_name}...")
+        zip_path = fetch_archive(version, platform_name, mirror=mirror)
+        if zip_path is None:
+            return False
+        if not install:
+            print(f"已缓存: {zip_path}")
+            return True
+        target = install_chromedriver(zip_path, platform_name)
+        print(f"ChromeDriver安装完成: {target}")
+        return True
+
     except Exception as e:
         print(f"下载ChromeDriver失败: {e}")
         return False
 
-def main():
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="ChromeDriver下载和安装工具")
+    parser.add_argument("--chrome-version", help="按指定的Chrome版本选择（默认检测本机Chrome）")
+    parser.add_argument("--driver-version", help="直接指定ChromeDriver版本")
+    parser.add_argument("--mirror", help="镜像根地址（HTTP地址或本地目录），默认使用配置文件")
+    parser.add_argument("--cache-dir", help="缓存目录，默认使用配置文件")
+    parser.add_argument("--download-only", action="store_true", help="只下载到缓存，不安装")
+    parser.add_argument("-y", "--yes", action="store_true", help="不询问，已安装其他版本时直接替换")
+    return parser.parse_args(argv)
+
+
+def main(args=None):
     """主函数"""
+    args = args or parse_args()
+    if args.cache_dir:
+        Config.CHROMEDRIVER_CACHE_DIR = args.cache_dir
     print("=" * 50)
     print("🔧 ChromeDriver下载和安装工具")
     print("=" * 50)
-    
-    # 获取Chrome版本
-    print("\n🔍 检测Chrome浏览器版本...")
-    chrome_version = get_chrome_version()
-    
-    if not chrome_version:
-        print("❌ 无法检测到Chrome浏览器版本")
-        print("请确保已安装Chrome浏览器")
-        return False
-    
-    print(f"✅ 检测到Chrome版本: {chrome_version}")
-    
-    # 获取ChromeDriver版本
-    print("\n🔍 获取对应的ChromeDriver版本...")
-    driver_version = get_chromedriver_version(chrome_version)
-    
+
+    driver_version = args.driver_version
     if not driver_version:
-        print("❌ 无法获取对应的ChromeDriver版本")
-        print("请手动下载ChromeDriver: https://chromedriver.chromium.org/")
-        return False
-    
+        # 获取Chrome版本
+        print("\n🔍 检测Chrome浏览器版本...")
+        chrome_version = args.chrome_version or get_chrome_version()
+
+        if not chrome_version:
+            print("❌ 无法检测到Chrome浏览器版本")
+            print("请确保已安装Chrome浏览器")
+            return False
+
+        print(f"✅ 检测到Chrome版本: {chrome_version}")
+
+        # 获取ChromeDriver版本
+        print("\n🔍 获取对应的ChromeDriver版本...")
+        driver_version = get_chromedriver_version(chrome_version, mirror=args.mirror)
+
+        if not driver_version:
+            print("❌ 无法获取对应的ChromeDriver版本")
+            print("请手动下载ChromeDriver: https://googlechromelabs.github.io/chrome-for-testing/")
+            return False
+
     print(f"✅ 对应的ChromeDriver版本: {driver_version}")
-    
+
     # 检查是否已存在ChromeDriver
-    if os.path.exists("chromedriver") or os.path.exists("chromedriver.exe"):
-        print("\n⚠️  检测到已存在的ChromeDriver")
-        choice = input("是否重新下载? (y/N): ").strip().lower()
-        if choice not in ['y', 'yes', '是']:
-            print("跳过下载")
+    existing = os.path.join(os.path.dirname(os.path.abspath(__file__)), driver_filename(get_platform_name()))
+    if not args.download_only and os.path.exists(existing):
+        current = installed_version(existing)
+        if current == driver_version:
+            print(f"\n✅ 已安装相同版本的ChromeDriver（{current}），无需下载")
             return True
-    
+        print(f"\n⚠️  检测到已存在的ChromeDriver（{current or '版本未知'}）")
+        if not args.yes:
+            choice = input("是否替换为新版本? (y/N): ").strip().lower()
+            if choice not in ['y', 'yes', '是']:
+                print("跳过下载")
+                return True
+
     # 下载ChromeDriver
     print("\n📥 开始下载ChromeDriver...")
-    if download_chromedriver(driver_version):
-        print("\n🎉 ChromeDriver安装成功！")
-        print("现在可以运行超星自动化学习程序了")
+    if download_chromedriver(driver_version, mirror=args.mirror, install=not args.download_only):
+        print("\n🎉 ChromeDriver安装成功！" if not args.download_only else "\n🎉 ChromeDriver已下载到缓存")
+        if not args.download_only:
+            print("现在可以运行超星自动化学习程序了")
         return True
     else:
         print("\n❌ ChromeDriver安装失败")
@@ -162,9 +445,11 @@ def main():
 
 if __name__ == "__main__":
     try:
-        success = main()
-        input("\n按回车键退出...")
+        args = parse_args()
+        success = main(args)
+        if not args.yes:
+            input("\n按回车键退出...")
         sys.exit(0 if success else 1)
     except KeyboardInterrupt:
         print("\n\n⏹️  操作被用户中断")
-        sys.exit(1) 
\ No newline at end of file
+        sys.exit(1)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+元素句柄缓存 - 按 (frame路径, 定位方式, 选择器) 缓存WebElement，再次使用前只做一次isConnected探测，
+元素已从页面移除（探测返回False或抛出StaleElementReferenceException）时才重新查找
+
+    cache = ElementCache(driver)
+    cache.put((), "main", iframe)                      # 手动放入（例如按自定义规则挑出的iframe）
+    cache.switch_to(("main", "video:0"))               # 从主文档依次切换到缓存的iframe，任一已失效时返回False
+    video = cache.find(("main", "video:0"), "video")   # 当前已在该frame中：命中时1次往返，失效时重新查找
+    cache.clear()                                      # 页面切换（新课程）后清空
+
+frame路径是从主文档开始、各级iframe在缓存中的键组成的元组，主文档为 ()。
+调用find/get时驱动必须已经位于对应的frame中，否则句柄会被当作失效。
+"""
+
+import logging
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import WebDriverException
+
+
+class ElementCache:
+    """按frame路径和选择器缓存的元素句柄"""
+
+    def __init__(self, driver, logger=None):
+        self.driver = driver
+        self.logger = logger or logging.getLogger(__name__)
+        self.elements = {}  # {(frame路径, 键): WebElement}
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def is_alive(self, element):
+        """一次往返确认元素仍在页面中"""
+        try:
+            return element.get_property("isConnected") is True
+        except WebDriverException:
+            return False
+
+    def get(self, path, key):
+        """取出仍然有效的缓存句柄，没有或已失效时返回None"""
+        element = self.elements.get((path, key))
+        if element is None:
+            return None
+        if self.is_alive(element):
+            self.hits += 1
+            return element
+        self.stale += 1
+        self.invalidate(path + (key,))
+        del self.elements[(path, key)]
+        return None
+
+    def put(self, path, key, element):
+        self.elements[(path, key)] = element
+        return element
+
+    def find(self, path, selector, by=By.CSS_SELECTOR):
+        """在当前frame（路径为path）中查找第一个匹配的元素，优先使用缓存，找不到时返回None"""
+        key = (by, selector)
+        element = self.get(path, key)
+        if element is not None:
+            return element
+        self.misses += 1
+        elements = self.driver.find_elements(by, selector)
+        return self.put(path, key, elements[0]) if elements else None
+
+    def switch_to(self, path):
+        """从主文档依次切换到path对应的frame，路径上任一iframe句柄失效时切回主文档并返回False"""
+        self.driver.switch_to.default_content()
+        for depth, key in enumerate(path):
+            frame = self.get(path[:depth], key)
+            if frame is None:
+                self.driver.switch_to.default_content()
+                return False
+            try:
+                self.driver.switch_to.frame(frame)
+            except WebDriverException:
+                self.invalidate(path[:depth + 1])
+                self.elements.pop((path[:depth], key), None)
+                self.driver.switch_to.default_content()
+                return False
+        return True
+
+    def invalidate(self, path=()):
+        """清除path及其下层frame中的缓存"""
+        for cached_path, key in list(self.elements):
+            if cached_path[:len(path)] == path:
+                del self.elements[(cached_path, key)]
+
+    def clear(self):
+        self.elements.clear()
+
+    def summary(self):
+        return f"命中 {self.hits} 次，重新查找 {self.misses} 次，失效 {self.stale} 次"
@@ -0,0 +1,1321 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内存假浏览器驱动 - 不启动Chrome，在毫秒级跑完学习流程
+
+只实现学习程序实际用到的WebDriver子集（find_elements、get_attribute、
+get_property、execute_script、switch_to、page_source等），并用虚拟时钟
+接管time.sleep，40分钟的视频在几毫秒内就能"播放"完。
+"""
+
+import re
+import sys
+import json
+import base64
+import random
+import time as _real_time
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from selenium.webdriver.common.by import By
+from tracing import span
+from timeline import format_bytes
+from selenium.common.exceptions import (
+    NoSuchElementException, StaleElementReferenceException, NoSuchFrameException,
+    ElementNotInteractableException, InvalidSelectorException
+)
+
+# 需要替换time模块的模块（学习程序和WebDriverWait）
+PATCHED_MODULES = [
+    "chaoxing_auto_learner",
+    "state_machine",
+    "timeline",
+    "tracing",
+    "status_server",
+    "screenshots",
+    "player_helper",
+    "catalog_watch",
+    "network_observer",
+    "retry_policy",
+    "dom_fingerprint",
+    "diagnostics",
+    "selenium.webdriver.support.wait",
+]
+
+
+class FakeClock:
+    """虚拟时钟：sleep只推进时间，不真正等待"""
+
+    def __init__(self, start=1700000000.0):
+        self.now = start
+        self.start = start
+        self.slept = 0.0
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self.now += seconds
+            self.slept += seconds
+
+    def advance(self, seconds):
+        if seconds > 0:
+            self.now += seconds
+
+    @property
+    def elapsed(self):
+        return self.now - self.start
+
+    @contextmanager
+    def patched(self, modules=None):
+        """在上下文中把各模块的time替换为虚拟时钟"""
+        proxy = _TimeProxy(self)
+        replaced = []
+        for name in modules or PATCHED_MODULES:
+            module = sys.modules.get(name)
+            if module is None:
+                __import__(name)
+                module = sys.modules[name]
+            if getattr(module, "time", None) is not None:
+                replaced.append((module, module.time))
+                module.time = proxy
+        try:
+            yield self
+        finally:
+            for module, original in replaced:
+                module.time = original
+
+
+class _TimeProxy:
+    """替代time模块：计时函数走虚拟时钟，其余属性转给真实time"""
+
+    def __init__(self, clock):
+        self._clock = clock
+        self.time = clock.time
+        self.sleep = clock.sleep
+        self.monotonic = clock.monotonic
+        self.perf_counter = clock.perf_counter
+
+    def __getattr__(self, name):
+        return getattr(_real_time, name)
+
+
+class FakeNode:
+    """假DOM节点"""
+
+    def __init__(self, tag, id=None, classes="", text="", attrs=None, children=(), style=""):
+        self.tag = tag
+        self.classes = classes.split() if isinstance(classes, str) else list(classes)
+        self.text = text
+        self.attrs = dict(attrs or {})
+        if id:
+            self.attrs["id"] = id
+        if style:
+            self.attrs["style"] = style
+        self.children = []
+        self.parent = None
+        self.alive = True
+        self.content = None  # iframe的内容文档
+        self.video = None  # video元素对应的FakeVideo
+        self.on_click = None
+        self.enabled = True
+        for child in children:
+            self.append(child)
+
+    def append(self, child):
+        child.parent = self
+        self.children.append(child)
+        return child
+
+    def remove(self):
+        """从文档中移除，整棵子树失效"""
+        if self.parent is not None:
+            self.parent.children.remove(self)
+            self.parent = None
+        self.kill()
+
+    def kill(self):
+        self.alive = False
+        if self.content is not None:
+            self.content.kill()
+        for child in self.children:
+            child.kill()
+
+    def replace_with(self, node):
+        parent = self.parent
+        index = parent.children.index(self)
+        parent.children[index] = node
+        node.parent = parent
+        self.parent = None
+        self.kill()
+        return node
+
+    def walk(self):
+        """深度优先遍历子孙节点（不进入iframe内容）"""
+        for child in self.children:
+            yield child
+            yield from child.walk()
+
+    def ancestors(self):
+        node = self.parent
+        while node is not None:
+            yield node
+            node = node.parent
+
+    def get(self, name):
+        if name == "class":
+            return " ".join(self.classes) if self.classes else None
+        return self.attrs.get(name)
+
+    def is_shown(self):
+        for node in [self] + list(self.ancestors()):
+            style = (node.attrs.get("style") or "").replace(" ", "")
+            if "display:none" in style or "visibility:hidden" in style:
+                return False
+        return True
+
+    def visible_text(self):
+        if not self.is_shown():
+            return ""
+        parts = [self.text] if self.text else []
+        for child in self.children:
+            child_text = child.visible_text()
+            if child_text:
+                parts.append(child_text)
+        return " ".join(parts).strip()
+
+    def all_text(self):
+        parts = [self.text] if self.text else []
+        parts.extend(child.all_text() for child in self.children)
+        return " ".join(p for p in parts if p).strip()
+
+    def set_style_display(self, value):
+        style = re.sub(r"display:\s*[^;]*;?", "", self.attrs.get("style") or "").strip()
+        self.attrs["style"] = f"display: {value}; {style}".strip()
+
+    def to_html(self):
+        attrs = ""
+        if self.classes:
+            attrs += f' class="{" ".join(self.classes)}"'
+        for key, value in self.attrs.items():
+            attrs += f' {key}="{value}"'
+        inner = self.text + "".join(child.to_html() for child in self.children)
+        return f"<{self.tag}{attrs}>{inner}</{self.tag}>"
+
+
+# ---------------------------------------------------------------- 选择器匹配
+
+_COMPOUND_RE = re.compile(
+    r"(?P<tag>[a-zA-Z][\w-]*|\*)|#(?P<id>[\w-]+)|\.(?P<cls>[\w-]+)"
+    r"|\[(?P<attr>[\w-]+)(?:(?P<op>[*^$]?=)['\"]?(?P<val>[^'\"\]]*)['\"]?)?\]"
+)
+
+_XPATH_SIBLING_RE = re.compile(
+    r"^//(\w+)\[@class='([^']*)'\]/preceding-sibling::(\w+)\[@class='([^']*)'\]\[1\]$"
+)
+_XPATH_INDEX_RE = re.compile(r"^\((.*)\)\[(\d+)\]$")
+
+
+def _parse_compound(text):
+    parts = []
+    pos = 0
+    while pos < len(text):
+        match = _COMPOUND_RE.match(text, pos)
+        if not match or match.end() == pos:
+            raise InvalidSelectorException(f"假驱动不支持的选择器: {text}")
+        parts.append(match)
+        pos = match.end()
+    return parts
+
+
+def _match_compound(node, parts):
+    for part in parts:
+        if part.group("tag") and part.group("tag") != "*" and node.tag != part.group("tag").lower():
+            return False
+        if part.group("id") and node.attrs.get("id") != part.group("id"):
+            return False
+        if part.group("cls") and part.group("cls") not in node.classes:
+            return False
+        if part.group("attr"):
+            value = node.get(part.group("attr"))
+            if value is None:
+                return False
+            op, expected = part.group("op"), part.group("val")
+            if op == "=" and value != expected:
+                return False
+            if op == "*=" and expected not in value:
+                return False
+            if op == "^=" and not value.startswith(expected):
+                return False
+            if op == "$=" and not value.endswith(expected):
+                return False
+    return True
+
+
+def _match_selector(node, chain):
+    """后代选择器链匹配（'>'按后代处理）"""
+    if not _match_compound(node, chain[-1]):
+        return False
+    remaining = chain[:-1]
+    ancestor = node.parent
+    while remaining and ancestor is not None:
+        if _match_compound(ancestor, remaining[-1]):
+            remaining = remaining[:-1]
+        ancestor = ancestor.parent
+    return not remaining
+
+
+def _split_outside_brackets(text, separators):
+    parts, current, depth = [], "", 0
+    for char in text:
+        if char == "[":
+            depth += 1
+        elif char == "]":
+            depth -= 1
+        if depth == 0 and char in separators:
+            parts.append(current)
+            current = ""
+        else:
+            current += char
+    parts.append(current)
+    return [p.strip() for p in parts if p.strip()]
+
+
+def css_select(root, selector):
+    chains = []
+    for group in _split_outside_brackets(selector, ","):
+        compounds = _split_outside_brackets(group, " >")
+        if compounds:
+            chains.append([_parse_compound(c) for c in compounds])
+    return [node for node in root.walk() if any(_match_selector(node, chain) for chain in chains)]
+
+
+def xpath_select(root, xpath):
+    """只支持学习程序用到的几种XPath写法"""
+    index = None
+    indexed = _XPATH_INDEX_RE.match(xpath)
+    if indexed:
+        xpath, index = indexed.group(1), int(indexed.group(2))
+    match = _XPATH_SIBLING_RE.match(xpath)
+    if not match:
+        raise InvalidSelectorException(f"假驱动不支持的XPath: {xpath}")
+    tag, cls, sibling_tag, sibling_cls = match.groups()
+    results = []
+    seen = set()
+    for node in root.walk():
+        if node.tag == tag and node.get("class") == cls and node.parent is not None:
+            siblings = node.parent.children[:node.parent.children.index(node)]
+            for sibling in reversed(siblings):
+                if sibling.tag == sibling_tag and sibling.get("class") == sibling_cls:
+                    if id(sibling) not in seen:
+                        seen.add(id(sibling))
+                        results.append(sibling)
+                    break
+    if index is not None:
+        return results[index - 1:index]
+    return results
+
+
+# ---------------------------------------------------------------- 视频播放器
+
+# 清晰度菜单中的选项（从高到低）及对应的码率（字节/秒）
+QUALITY_BITRATES = {"超清": 250000, "高清": 125000, "标清": 60000}
+
+
+class FakeVideo:
+    """按虚拟时钟推进的视频，支持卡顿和出错"""
+
+    def __init__(self, clock, duration, stall_at=None, stall_recovers_on=("reload",)):
+        self.clock = clock
+        self.duration = float(duration)
+        self.position = 0.0
+        self.paused = True
+        self.ended = False
+        self.rate = 1.0
+        self.stall_at = stall_at
+        self.stall_recovers_on = set(stall_recovers_on)
+        self.stalled = False
+        self.error = None
+        self.on_ended = None
+        self.bitrate = QUALITY_BITRATES["超清"]  # 每秒视频内容的字节数，随清晰度变化
+        self.streamed = 0.0  # 已下载的字节数
+        self.reported = 0  # 已写入性能日志的字节数
+        self._since = clock.now
+
+    def update(self):
+        now = self.clock.now
+        if not self.paused and not self.ended:
+            target = self.position + (now - self._since) * self.rate
+            if self.stall_at is not None and target >= self.stall_at:
+                target = max(self.position, self.stall_at)
+                self.stalled = True
+            if target >= self.duration:
+                target = self.duration
+                self.ended = True
+                self.paused = True
+            self.streamed += (target - self.position) * self.bitrate
+            self.position = target
+            if self.ended and self.on_ended:
+                callback, self.on_ended = self.on_ended, None
+                callback(self)
+        self._since = now
+
+    def play(self):
+        self.update()
+        self._recover("play")
+        if not self.ended:
+            self.paused = False
+
+    def pause(self):
+        self.update()
+        self.paused = True
+
+    def seek(self, position):
+        self.update()
+        self._recover("seek")
+        self.position = min(max(0.0, float(position)), self.duration)
+
+    def _recover(self, action):
+        if self.stalled and action in self.stall_recovers_on:
+            self.stalled = False
+            self.stall_at = None
+
+    def prop(self, name):
+        self.update()
+        values = {
+            "currentTime": self.position,
+            "duration": self.duration,
+            "paused": self.paused,
+            "ended": self.ended,
+            "playbackRate": self.rate,
+            "readyState": 2 if self.stalled else 4,
+            "networkState": 2 if self.stalled else 1,
+            "error": self.error,
+        }
+        return values.get(name)
+
+
+# ---------------------------------------------------------------- 模拟站点
+
+class FakeSection:
+    """目录中的一个小节，可包含多个视频任务点"""
+
+    def __init__(self, title, chapter_number, durations, completed=False):
+        self.title = title
+        self.chapter_number = chapter_number
+        self.durations = list(durations)
+        self.completed = completed
+        self.videos_done = set(range(len(self.durations))) if completed else set()
+        self.positions = {}
+        self.chapter_id = None
+        self.marker = None
+
+
+class FakeChaoxingSite:
+    """模拟超星课程页面：目录、嵌套iframe中的video.js播放器和人脸识别弹窗"""
+
+    def __init__(self, clock, sections, player_ready_delay=3.0, face_popup=True,
+                 require_login=False, stall_at=None, stall_recovers_on=("reload",)):
+        self.clock = clock
+        self.sections = sections
+        self.player_ready_delay = player_ready_delay
+        self.face_popup = face_popup
+        self.require_login = require_login
+        self.logged_in = not require_login
+        self.stall_at = stall_at
+        self.stall_recovers_on = stall_recovers_on
+        self.current = None
+        self.popup_visible = False
+        self.reloads = 0
+        self.catalog_renders = 0
+        self.on_catalog_scan = None
+        self.videos = []
+        self.network_log = []  # 性能日志中的Network事件（driver.get_log("performance")取走）
+        self.response_bodies = {}
+        self._events = []
+        for i, section in enumerate(sections):
+            section.chapter_id = str(100000 + i)
+        self.document = None
+        self.load()
+
+    # 事件调度
+    def schedule(self, delay, callback):
+        self._events.append((self.clock.now + delay, callback))
+        self._events.sort(key=lambda e: e[0])
+
+    def tick(self):
+        while self._events and self._events[0][0] <= self.clock.now:
+            _, callback = self._events.pop(0)
+            callback()
+        for index, video in enumerate(self.videos):
+            video.update()
+            streamed = int(video.streamed)
+            if streamed > video.reported:
+                self.network_event("Network.dataReceived", {"requestId": f"media.{id(video)}",
+                                                            "encodedDataLength": streamed - video.reported})
+                video.reported = streamed
+
+    # 页面构建
+    def load(self):
+        """加载（或刷新）主页面，旧的元素全部失效"""
+        if self.document is not None:
+            self.document.kill()
+        self._retire_videos()
+        self._events = []
+        self.document = FakeNode("html")
+        body = self.document.append(FakeNode("body"))
+        if not self.logged_in:
+            body.append(FakeNode("input", id="phone"))
+            body.append(FakeNode("input", id="pwd"))
+            button = body.append(FakeNode("button", id="loginBtn", text="登录"))
+            button.on_click = lambda node: self.login()
+            return
+        body.append(FakeNode("li", id="tit1", text="目录"))
+        self.catalog = body.append(FakeNode("div", classes="posCatalog"))
+        self.render_catalog()
+        if self.current is not None:
+            self.iframe = body.append(self._build_section_frame(self.current))
+        self.popup_visible = False
+
+    def login(self):
+        self.logged_in = True
+        self.load()
+
+    def reload(self):
+        self.reloads += 1
+        self.load()
+
+    def render_catalog(self):
+        """重新渲染目录（旧的目录元素失效）"""
+        self.catalog_renders += 1
+        for child in list(self.catalog.children):
+            child.remove()
+        current_chapter = None
+        for section in self.sections:
+            chapter = section.chapter_number.split(".")[0]
+            if chapter != current_chapter:
+                current_chapter = chapter
+                header = FakeNode("div", classes="posCatalog_select firstLayer", children=[
+                    FakeNode("span", classes="posCatalog_name", text=f"第{chapter}章",
+                             children=[FakeNode("em", classes="posCatalog_sbar", text=chapter)])
+                ])
+                self.catalog.append(header)
+            onclick = f"getTeacherAjax('200000','300000','{section.chapter_id}');"
+            name = FakeNode("span", classes="posCatalog_name", text=section.title,
+                            attrs={"title": section.title, "onclick": onclick},
+                            children=[FakeNode("em", classes="posCatalog_sbar", text=section.chapter_number)])
+            name.on_click = lambda node, s=section: self.open_section(s)
+            section.marker = self._marker(section)
+            self.catalog.append(FakeNode("div", classes="posCatalog_select secondLayer",
+                                         children=[name, section.marker]))
+
+    def _marker(self, section):
+        if section.completed:
+            return FakeNode("span", classes="icon_Completed prevTips", text="")
+        pending = len(section.durations) - len(section.videos_done)
+        return FakeNode("span", classes="catalog_points_yi prevTips", text=str(pending))
+
+    def open_section(self, section):
+        if getattr(self, "iframe", None) is not None and self.iframe.alive:
+            self.iframe.remove()
+        self._retire_videos()
+        self.current = section
+        self.iframe = self.document.children[0].append(self._build_section_frame(section))
+
+    def _retire_videos(self):
+        """页面刷新或切换小节前保存播放进度（超星会从上次位置继续）；
+        卡住的视频若可通过刷新恢复，故障随之消失"""
+        for index, video in enumerate(self.videos):
+            video.update()
+            if self.current is not None and not video.ended:
+                self.current.positions[index] = video.position
+            if video.stalled and "reload" in self.stall_recovers_on:
+                self.stall_at = None
+        self.videos = []
+
+    def open_by_chapter_id(self, chapter_id):
+        for section in self.sections:
+            if section.chapter_id == chapter_id:
+                self.open_section(section)
+                return True
+        return False
+
+    def _build_section_frame(self, section):
+        """主iframe -> 每个视频任务点一个ans-insertvideo-online iframe"""
+        frame = FakeNode("iframe", id="iframe", attrs={"src": f"/knowledge/cards?chapterId={section.chapter_id}"})
+        frame.content = FakeNode("html")
+        cards = frame.content.append(FakeNode("div", classes="ans-cc"))
+        for index in range(len(section.durations)):
+            card = cards.append(FakeNode(
+                "div", classes="ans-attach-ct ans-job-finished" if index in section.videos_done else "ans-attach-ct"))
+            video_frame = card.append(FakeNode(
+                "iframe", classes="ans-attach-online ans-insertvideo-online",
+                attrs={"src": f"/ananas/modules/video/index.html?v={section.chapter_id}-{index}"}
+            ))
+            video_frame.content = FakeNode("html")
+            self.schedule(self.player_ready_delay,
+                          lambda f=video_frame, i=index: self._attach_player(section, i, f))
+        return frame
+
+    def _attach_player(self, section, index, video_frame):
+        if not video_frame.alive:
+            return
+        video = FakeVideo(self.clock, section.durations[index], stall_at=self.stall_at,
+                          stall_recovers_on=self.stall_recovers_on)
+        video.position = section.positions.get(index, 0.0)
+        if index in section.videos_done:
+            video.position = video.duration
+            video.ended = True
+        video.on_ended = lambda v: self._video_ended(section, index)
+        self.videos.append(video)
+
+        rate_value = FakeNode("div", classes="vjs-playback-rate-value", text="1x")
+        menu = FakeNode("div", classes="vjs-menu", style="display: none;")
+        menu_content = menu.append(FakeNode("ul", classes="vjs-menu-content"))
+        for label in ["2x", "1.5x", "1.25x", "1x", "0.5x"]:
+            item = menu_content.append(FakeNode("li", classes="vjs-menu-item", text=label))
+            item.on_click = lambda node, l=label: self._set_rate(video, rate_value, menu, l)
+        rate_value.on_click = lambda node: menu.set_style_display("block")
+        quality_items = FakeNode("ul", classes="vjs-menu-content")
+        for label in QUALITY_BITRATES:
+            item = quality_items.append(FakeNode("li", classes="vjs-menu-item" + (" vjs-selected" if label == "超清" else ""),
+                                                 text=label))
+            item.on_click = lambda node, l=label: self._set_quality(video, quality_items, node, l)
+        play_button = FakeNode("button", classes="vjs-big-play-button", attrs={"title": "播放视频", "type": "button"})
+        tech = FakeNode("video", classes="vjs-tech", id="video_html5_api")
+        tech.video = video
+        player = FakeNode("div", classes="video-js vjs-paused", id="video", children=[
+            tech,
+            play_button,
+            FakeNode("div", classes="vjs-control-bar", children=[
+                FakeNode("div", classes="vjs-playback-rate vjs-menu-button", children=[rate_value, menu]),
+                FakeNode("div", classes="vjs-resolution-button vjs-menu-button", children=[
+                    FakeNode("div", classes="vjs-menu", style="display: none;", children=[quality_items])
+                ]),
+            ]),
+        ])
+        play_button.on_click = lambda node: self._play(video, player, play_button)
+        video_frame.content.append(FakeNode("div", classes="fullScreenContainer", children=[player]))
+
+    def _play(self, video, player, play_button):
+        video.play()
+        player.classes = ["video-js", "vjs-has-started", "vjs-playing"]
+        play_button.set_style_display("none")
+
+    def _set_rate(self, video, rate_value, menu, label):
+        video.update()
+        video.rate = float(label.rstrip("x"))
+        rate_value.text = label
+        menu.set_style_display("none")
+
+    def report_progress(self, section, index, passed, isdrag):
+        """模拟播放器上报进度：在性能日志中记下响应，正文可通过Network.getResponseBody读取"""
+        request_id = f"{1000 + len(self.response_bodies)}.1"
+        url = (f"https://mooc1.chaoxing.com/multimedia/log/a/1/token?clazzId=1"
+               f"&jobid={section.chapter_id}_{index}&isdrag={isdrag}")
+        self.response_bodies[request_id] = json.dumps({"isPassed": passed})
+        self.network_event("Network.responseReceived", {"requestId": request_id, "type": "XHR", "response": {
+            "url": url, "status": 200, "mimeType": "application/json"}})
+        self.network_event("Network.loadingFinished", {"requestId": request_id, "encodedDataLength": 180})
+
+    def network_event(self, method, params):
+        self.network_log.append({"level": "INFO", "timestamp": int(self.clock.now * 1000),
+                                 "message": json.dumps({"message": {"method": method, "params": params},
+                                                        "webview": "fake"})})
+
+    def _set_quality(self, video, items, selected, label):
+        video.update()
+        video.bitrate = QUALITY_BITRATES[label]
+        for item in items.children:
+            item.classes = ["vjs-menu-item"] + (["vjs-selected"] if item is selected else [])
+
+    def _video_ended(self, section, index):
+        self.report_progress(section, index, passed=True, isdrag=4)
+        section.videos_done.add(index)
+        section.positions[index] = section.durations[index]
+        if section is self.current and self.iframe.alive:
+            cards = css_select(self.iframe.content, "div.ans-attach-ct")
+            if index < len(cards) and "ans-job-finished" not in cards[index].classes:
+                cards[index].classes.append("ans-job-finished")
+        if len(section.videos_done) == len(section.durations) and not section.completed:
+            section.completed = True
+            if section.marker is not None and section.marker.alive:
+                section.marker = section.marker.replace_with(self._marker(section))
+            if self.face_popup:
+                self.show_face_popup()
+
+    def show_face_popup(self):
+        if self.popup_visible:
+            return
+        self.popup_visible = True
+        close = FakeNode("a", classes="popClose fr", attrs={"onclick": "window.location.reload()"}, text="关闭")
+        close.on_click = lambda node: self.reload()
+        self.document.children[0].append(FakeNode(
+            "div", classes="maskDiv1 chapterVideoFaceQrMaskDiv", style="display: block;", children=[
+                FakeNode("div", classes="popDiv1 faceCollectQrPopVideo faceRecognition_0", children=[
+                    FakeNode("p", text="人脸信息采集"),
+                    FakeNode("p", text="请使用手机APP采集人脸信息"),
+                    close,
+                ])
+            ]))
+
+    def hide_popups(self):
+        for node in css_select(self.document, "div[class*='maskDiv1'], div[class*='popDiv1']"):
+            node.set_style_display("none")
+
+
+# ---------------------------------------------------------------- 假驱动
+
+class FakeElement:
+    """WebElement的替身，节点失效后访问抛出StaleElementReferenceException"""
+
+    def __init__(self, driver, node):
+        self._driver = driver
+        self._node = node
+
+    def __eq__(self, other):
+        return isinstance(other, FakeElement) and other._node is self._node
+
+    def __hash__(self):
+        return id(self._node)
+
+    def _live(self, command):
+        self._driver._command(command)
+        if not self._node.alive:
+            raise StaleElementReferenceException("stale element reference: element is not attached to the page document")
+        return self._node
+
+    @property
+    def id(self):
+        return str(id(self._node))
+
+    @property
+    def tag_name(self):
+        return self._live("getElementTagName").tag
+
+    @property
+    def text(self):
+        return self._live("getElementText").visible_text()
+
+    def get_attribute(self, name):
+        node = self._live("getElementAttribute")
+        if node.video is not None and name in ("currentTime", "duration", "paused", "ended"):
+            return node.video.prop(name)
+        return node.get(name)
+
+    def get_property(self, name):
+        node = self._live("getElementProperty")
+        if node.video is not None:
+            value = node.video.prop(name)
+            if value is not None or name == "error":
+                return value
+        if name == "className":
+            return node.get("class") or ""
+        if name == "isConnected":
+            return node.alive
+        return node.get(name)
+
+    def get_dom_attribute(self, name):
+        return self._live("getElementAttribute").get(name)
+
+    def is_displayed(self):
+        return self._live("isElementDisplayed").is_shown()
+
+    def is_enabled(self):
+        return self._live("isElementEnabled").enabled
+
+    def click(self):
+        node = self._live("clickElement")
+        if not node.is_shown():
+            raise ElementNotInteractableException("element not interactable")
+        self._driver._click(node)
+
+    def clear(self):
+        self._live("clearElement").attrs["value"] = ""
+
+    def send_keys(self, *values):
+        node = self._live("sendKeysToElement")
+        node.attrs["value"] = (node.attrs.get("value") or "") + "".join(str(v) for v in values)
+
+    def find_element(self, by=By.ID, value=None):
+        elements = self.find_elements(by, value)
+        if not elements:
+            raise NoSuchElementException(f"no such element: {by}={value}")
+        return elements[0]
+
+    def find_elements(self, by=By.ID, value=None):
+        node = self._live("findChildElements")
+        return self._driver._select(node, by, value)
+
+
+class FakeSwitchTo:
+    def __init__(self, driver):
+        self._driver = driver
+
+    def frame(self, frame_reference):
+        self._driver._command("switchToFrame")
+        doc = self._driver._current_document()
+        if isinstance(frame_reference, FakeElement):
+            node = frame_reference._node
+        else:
+            frames = [n for n in doc.walk() if n.tag == "iframe"]
+            if isinstance(frame_reference, int):
+                node = frames[frame_reference] if frame_reference < len(frames) else None
+            else:
+                node = next((n for n in frames if frame_reference in (n.get("id"), n.get("name"))), None)
+        if node is None or node.tag != "iframe":
+            raise NoSuchFrameException(f"no such frame: {frame_reference}")
+        if not node.alive:
+            raise StaleElementReferenceException("stale element reference: frame is not attached to the page document")
+        self._driver._frames.append(node)
+
+    def parent_frame(self):
+        self._driver._command("switchToParentFrame")
+        if self._driver._frames:
+            self._driver._frames.pop()
+
+    def default_content(self):
+        self._driver._command("switchToFrame")
+        self._driver._frames = []
+
+
+class FakeDriver:
+    """假WebDriver：DOM查询、脚本钩子、iframe切换都在内存中完成"""
+
+    def __init__(self, site, latency=0.0):
+        self.site = site
+        self.clock = site.clock
+        self.latency = latency
+        self.implicit_wait = 0
+        self.page_load_timeout = None
+        self.current_url = ""
+        self.command_counts = Counter()
+        self.unhandled_scripts = []
+        self.screenshots = []
+        self.new_document_scripts = []
+        self.quit_called = False
+        self._frames = []
+        self._script_hooks = []
+        self.switch_to = FakeSwitchTo(self)
+        self._register_default_hooks()
+
+    # 基础设施
+    def _command(self, name):
+        self.command_counts[name] += 1
+        with span(f"webdriver:{name}"):
+            self.clock.advance(self.latency)
+        self.site.tick()
+
+    def _current_document(self):
+        if self._frames and not self._frames[-1].alive:
+            # 所在的iframe已被移除，真实浏览器同样会报错
+            raise NoSuchFrameException("current frame has been detached")
+        return self._frames[-1].content if self._frames else self.site.document
+
+    def _select(self, root, by, value):
+        if by == By.CSS_SELECTOR:
+            nodes = css_select(root, value)
+        elif by == By.TAG_NAME:
+            nodes = [n for n in root.walk() if n.tag == value.lower()]
+        elif by == By.ID:
+            nodes = [n for n in root.walk() if n.get("id") == value]
+        elif by == By.CLASS_NAME:
+            nodes = [n for n in root.walk() if value in n.classes]
+        elif by == By.NAME:
+            nodes = [n for n in root.walk() if n.get("name") == value]
+        elif by == By.XPATH:
+            nodes = xpath_select(root, value)
+        else:
+            raise InvalidSelectorException(f"假驱动不支持的定位方式: {by}")
+        return [FakeElement(self, n) for n in nodes]
+
+    def _click(self, node):
+        if node.on_click is not None:
+            node.on_click(node)
+        elif node.get("onclick"):
+            self._run_script(node.get("onclick"), ())
+
+    # 脚本钩子
+    def add_script_hook(self, pattern, handler):
+        """注册脚本钩子：脚本中包含pattern时调用handler(driver, script, args)"""
+        self._script_hooks.insert(0, (pattern, handler))
+
+    def _register_default_hooks(self):
+        def frame_element(driver, script, args):
+            return FakeElement(driver, driver._frames[-1]) if driver._frames else None
+
+        def click(driver, script, args):
+            node = args[0]._live("executeScript")
+            driver._click(node)
+
+        def next_sibling_pending(driver, script, args):
+            node = args[0]._live("executeScript")
+            siblings = node.parent.children
+            index = siblings.index(node)
+            return index + 1 < len(siblings) and "catalog_points_yi prevTips" in (siblings[index + 1].get("class") or "")
+
+        def query_selector(driver, script, args):
+            # 只支持 document.querySelector('...') !== null 和 querySelectorAll('...').length > 0 两种写法
+            match = re.search(r"document\.querySelector(All)?\('([^']*)'\)", script)
+            return bool(css_select(driver._current_document(), match.group(2))) if match else None
+
+        def nested_player_ready(driver, script, args):
+            main = next((n for n in driver._current_document().walk() if n.get("id") == "iframe"), None)
+            if main is None or main.content is None:
+                return False
+            for frame in css_select(main.content, "iframe.ans-insertvideo-online"):
+                if frame.content is not None and css_select(frame.content, ".vjs-big-play-button"):
+                    return True
+            return False
+
+        def video_play(driver, script, args):
+            video = args[0]._live("executeScript").video
+            if "currentTime = arguments[1]" in script:
+                video.seek(args[1])
+            video.play()
+
+        def video_task_points(driver, script, args):
+            frames = css_select(driver._current_document(), "iframe.ans-insertvideo-online")
+            return [any("ans-job-finished" in a.classes for a in f.ancestors()) for f in frames]
+
+        def player_helper_call(driver, script, args):
+            # 注册过新文档脚本或在当前文档中注入过时才有window.__cxPlayer
+            doc = driver._current_document()
+            if not (driver.new_document_scripts or getattr(doc, "player_helper", False)):
+                return None
+            tech = next((n for n in doc.walk() if n.tag == "video" and hasattr(n, "video")), None)
+            if tech is None:
+                return {"ready": False}
+            video = tech.video
+            if args[0] == "play" and video.paused and not video.ended:
+                button = next((n for n in css_select(doc, ".vjs-big-play-button") if n.is_shown()), None)
+                if button is not None:
+                    driver._click(button)
+                else:
+                    video.play()
+            elif args[0] == "lowestQuality":
+                items = css_select(doc, ".vjs-resolution-button .vjs-menu-item")
+                ranks = list(QUALITY_BITRATES)
+                best = max(items, key=lambda n: ranks.index(n.text), default=None)
+                if best is not None and "vjs-selected" not in best.classes:
+                    driver._click(best)
+                quality = best.text if best is not None else None
+                names = ("currentTime", "duration", "paused", "ended", "playbackRate", "readyState", "networkState", "error")
+                return {"ready": True, "quality": quality, **{name: video.prop(name) for name in names}}
+            elif args[0] == "setRate":
+                video.update()
+                video.rate = float(args[1])
+                for node in css_select(doc, "div.vjs-playback-rate-value"):
+                    node.text = f"{video.rate:g}x"
+            names = ("currentTime", "duration", "paused", "ended", "playbackRate", "readyState", "networkState", "error")
+            return {"ready": True, **{name: video.prop(name) for name in names}}
+
+        def player_helper_inject(driver, script, args):
+            driver._current_document().player_helper = True
+
+        def catalog_statuses(driver):
+            return {(sec.chapter_number, sec.title): "catalog_points_yi" in sec.marker.classes
+                    for sec in driver.site.sections if sec.marker is not None and sec.marker.alive}
+
+        def catalog_watch(driver, script, args):
+            # 模拟MutationObserver：记下挂载时的状态，take()时与当前目录比较（文档刷新后监听消失）
+            doc = driver._current_document()
+            if not css_select(doc, ".posCatalog_select"):
+                return False
+            doc.catalog_known = catalog_statuses(driver)
+            return True
+
+        def catalog_take(driver, script, args):
+            doc = driver._current_document()
+            known = getattr(doc, "catalog_known", None)
+            if known is None or not doc.alive:
+                return None
+            changes = []
+            for (chapter_number, title), pending in catalog_statuses(driver).items():
+                if known.get((chapter_number, title)) != pending:
+                    known[(chapter_number, title)] = pending
+                    changes.append({"title": title, "chapter_number": chapter_number, "pending": pending})
+            return changes
+
+        def dom_fingerprint(driver, script, args):
+            # 与FINGERPRINT_JS相同的骨架：去重的 "父元素标签.class > 标签.class"（根元素选择器只有 .class 和 #id 两种）
+            root_selectors, ignore, max_depth, max_nodes = args
+            doc = driver._current_document()
+            root = None
+            for selector in root_selectors:
+                kind, name = selector[0], selector[1:]
+                root = next((node for node in doc.walk()
+                             if (name in node.classes if kind == "." else node.attrs.get("id") == name)), None)
+                if root is not None:
+                    break
+            root = root or next((node for node in doc.walk() if node.tag == "body"), doc)
+            ignored = re.compile(ignore)
+            tokens = {}
+            seen, stack, count = set(), [(root, 0, "")], 0
+            while stack and count < max_nodes:
+                node, depth, parent = stack.pop()
+                key = (node.tag, *node.classes)
+                own = tokens.get(key)
+                if own is None:
+                    classes = sorted({c for c in (re.sub(r"\d+", "#", c) for c in node.classes) if not ignored.search(c)})
+                    own = tokens[key] = node.tag + ("." + ".".join(classes) if classes else "")
+                count += 1
+                seen.add(parent + ">" + own)
+                if depth < max_depth:
+                    stack.extend([(child, depth + 1, own) for child in reversed(node.children)])
+            return sorted(seen)
+
+        def frame_tree_snapshot(driver, script, args):
+            # 与SNAPSHOT_JS相同的结构：从最外层页面开始，iframe的内容放在f中
+            max_nodes, attr_names = args
+            current = driver._current_document()
+            count = [0]
+
+            def node(n, path, doc):
+                if count[0] >= max_nodes:
+                    return None
+                count[0] += 1
+                out = {"t": n.tag, "a": {name: n.get(name) for name in attr_names if n.get(name) is not None},
+                       "v": n.is_shown(), "c": []}
+                if n.text:
+                    out["x"] = n.text
+                if not n.enabled:
+                    out["d"] = True
+                if n.tag == "iframe" and n.content is not None:
+                    index = [f for f in doc.walk() if f.tag == "iframe"].index(n)
+                    out["f"] = frame(n.content, path + [n.get("id") or n.get("name") or f"#{index}"])
+                out["c"] = [c for c in (node(child, path, doc) for child in n.children) if c is not None]
+                return out
+
+            def frame(doc, path):
+                return {"path": path, "url": "", "current": doc is current, "tree": node(doc, path, doc)}
+
+            snapshot = frame(driver.site.document, [])
+            snapshot["truncated"] = count[0] >= max_nodes
+            return snapshot
+
+        def open_chapter(driver, script, args):
+            match = re.search(r"getTeacherAjax\('[^']*','[^']*','([^']*)'\)", script)
+            if match:
+                driver.site.open_by_chapter_id(match.group(1))
+
+        self._script_hooks.extend([
+            ("frameTree", frame_tree_snapshot),
+            ("documentElement.textContent", lambda d, s, a: any(t in d._current_document().all_text() for t in a[0])),
+            ("rootSelectors", dom_fingerprint),
+            ("window.__cxPlayer[", player_helper_call),
+            ("window.__cxCatalog = {", catalog_watch),
+            ("window.__cxCatalog.take()", catalog_take),
+            ("window.__cxPlayer = {", player_helper_inject),
+            ("window.frameElement", frame_element),
+            ("document.readyState", lambda d, s, a: "complete"),
+            ("navigator, 'webdriver'", lambda d, s, a: None),
+            ("scrollIntoView", lambda d, s, a: None),
+            ("arguments[0].click()", click),
+            ("arguments[0].play()", video_play),
+            ("window.location.reload", lambda d, s, a: d._reload()),
+            ("nextElementSibling", next_sibling_pending),
+            ("style.display = 'none'", lambda d, s, a: d.site.hide_popups()),
+            ("getTeacherAjax(", open_chapter),
+            ("closest('.ans-job-finished')", video_task_points),
+            ("iframe.ans-insertvideo-online", nested_player_ready),
+            ("document.querySelector", query_selector),
+        ])
+
+    def _run_script(self, script, args):
+        for pattern, handler in self._script_hooks:
+            if pattern in script:
+                return handler(self, script, args)
+        self.unhandled_scripts.append(script)
+        return None
+
+    def _reload(self):
+        self._frames = []
+        self.site.reload()
+
+    # WebDriver接口
+    def get(self, url):
+        self._command("get")
+        self.current_url = url
+        self._frames = []
+        self.site.load()
+
+    def implicitly_wait(self, seconds):
+        self.implicit_wait = seconds
+
+    def set_page_load_timeout(self, seconds):
+        self.page_load_timeout = seconds
+
+    def find_elements(self, by=By.ID, value=None):
+        self._command("findElements")
+        elements = self._select(self._current_document(), by, value)
+        if not elements and self.implicit_wait:
+            # 与真实驱动一致：找不到元素时隐式等待会耗满
+            self.clock.advance(self.implicit_wait)
+            self.site.tick()
+            elements = self._select(self._current_document(), by, value)
+        return elements
+
+    def find_element(self, by=By.ID, value=None):
+        elements = self.find_elements(by, value)
+        if not elements:
+            raise NoSuchElementException(f"no such element: {by}={value}")
+        return elements[0]
+
+    def execute_script(self, script, *args):
+        self._command("executeScript")
+        return self._run_script(script, args)
+
+    def execute_cdp_cmd(self, cmd, cmd_args):
+        self._command("executeCdpCommand")
+        if cmd == "Page.captureScreenshot":
+            # 不是真正的图片，只用来验证截图缓冲的流程
+            frame = f"{cmd_args.get('format')}:{self.clock.elapsed:.1f}".encode()
+            return {"data": base64.b64encode(frame).decode()}
+        if cmd == "Network.getResponseBody":
+            return {"body": self.site.response_bodies[cmd_args["requestId"]], "base64Encoded": False}
+        if cmd == "Page.addScriptToEvaluateOnNewDocument":
+            self.new_document_scripts.append(cmd_args["source"])
+            return {"identifier": str(len(self.new_document_scripts))}
+        return {}
+
+    def get_log(self, log_type):
+        self._command("getLog")
+        if log_type != "performance":
+            return []
+        entries, self.site.network_log = self.site.network_log, []
+        return entries
+
+    @property
+    def page_source(self):
+        self._command("getPageSource")
+        return self._current_document().to_html()
+
+    @property
+    def title(self):
+        return "学生学习页面"
+
+    def save_screenshot(self, filename):
+        self._command("screenshot")
+        self.screenshots.append(filename)
+        return True
+
+    def quit(self):
+        self._command("quit")
+        self.quit_called = True
+
+    @property
+    def command_total(self):
+        return sum(self.command_counts.values())
+
+
+# ---------------------------------------------------------------- 场景
+
+def _sections(durations, completed=0):
+    sections = []
+    for i, duration in enumerate(durations):
+        durations_list = duration if isinstance(duration, (list, tuple)) else [duration]
+        sections.append(FakeSection(f"测试课程{i + 1}", f"{i // 5 + 1}.{i % 5 + 1}",
+                                    durations_list, completed=i < completed))
+    return sections
+
+
+def generate_catalog(size, completed_ratio=0.5, videos_per_section=1, sections_per_chapter=10,
+                     duration=300, seed=0):
+    """生成size个小节的合成目录，按completed_ratio随机标记已完成（同一seed结果相同）"""
+    rng = random.Random(seed)
+    completed = set(rng.sample(range(size), int(round(size * completed_ratio))))
+    return [
+        FakeSection(f"合成课程{i + 1}", f"{i // sections_per_chapter + 1}.{i % sections_per_chapter + 1}",
+                    [duration] * videos_per_section, completed=i in completed)
+        for i in range(size)
+    ]
+
+
+def catalog_page_html(sections):
+    """把合成目录渲染成静态HTML（可用真实浏览器离线打开对照）"""
+    return FakeChaoxingSite(FakeClock(), sections).document.to_html()
+
+
+def long_video_scenario(minutes=40, **options):
+    """单个40分钟视频"""
+    clock = FakeClock()
+    site = FakeChaoxingSite(clock, _sections([minutes * 60]), **options)
+    return FakeDriver(site)
+
+
+def multi_course_scenario(durations=(300, 600, 240), completed=1, **options):
+    """多个课程，前completed个已完成"""
+    clock = FakeClock()
+    site = FakeChaoxingSite(clock, _sections([60] * completed + list(durations), completed=completed), **options)
+    return FakeDriver(site)
+
+
+def multi_video_scenario(durations=(180, 240, 120), **options):
+    """一个小节中有多个视频任务点"""
+    clock = FakeClock()
+    site = FakeChaoxingSite(clock, _sections([list(durations)]), **options)
+    return FakeDriver(site)
+
+
+def stalled_player_scenario(duration=600, stall_at=120, stall_recovers_on=("reload",), **options):
+    """播放到stall_at秒后卡住：paused为false，但currentTime不再前进"""
+    clock = FakeClock()
+    site = FakeChaoxingSite(clock, _sections([duration]), stall_at=stall_at,
+                            stall_recovers_on=stall_recovers_on, **options)
+    return FakeDriver(site)
+
+
+def stale_element_scenario(durations=(300, 300), **options):
+    """第一次扫描目录后目录立即重新渲染，拿到的元素全部过期"""
+    clock = FakeClock()
+    site = FakeChaoxingSite(clock, _sections(list(durations)), **options)
+    driver = FakeDriver(site)
+    scans = {"count": 0}
+    original_select = driver._select
+
+    def select(root, by, value):
+        elements = original_select(root, by, value)
+        if by == By.XPATH and "catalog_points_yi" in value and not value.startswith("("):
+            scans["count"] += 1
+            if scans["count"] == 1:
+                site.render_catalog()
+        return elements
+
+    driver._select = select
+    return driver
+
+
+def reload_scenario(duration=900, reload_after=300, **options):
+    """视频播放中途页面自行刷新一次"""
+    clock = FakeClock()
+    site = FakeChaoxingSite(clock, _sections([duration]), **options)
+    driver = FakeDriver(site)
+    original_open = site.open_section
+
+    def open_section(section):
+        original_open(section)
+        if site.reloads == 0:
+            def reload():
+                driver._frames = []
+                site.reload()
+            site.schedule(reload_after, reload)
+
+    site.open_section = open_section
+    return driver
+
+
+SCENARIOS = {
+    "long_video": long_video_scenario,
+    "multi_course": multi_course_scenario,
+    "multi_video": multi_video_scenario,
+    "stalled_player": stalled_player_scenario,
+    "stale_element": stale_element_scenario,
+    "reload": reload_scenario,
+}
+
+# 各场景的预期：(learner.run()的结果, 完成的小节数)
+EXPECTED = {
+    "long_video": (True, 1),
+    "multi_course": (True, 4),
+    "multi_video": (True, 1),
+    "stalled_player": (True, 1),
+    "stale_element": (True, 2),
+    "reload": (True, 1),
+}
+
+
+def build_scenario(name, **options):
+    """按名称构建场景，返回FakeDriver（driver.site为模拟站点，driver.clock为虚拟时钟）"""
+    if name not in SCENARIOS:
+        raise ValueError(f"未知场景: {name}，可选: {', '.join(SCENARIOS)}")
+    return SCENARIOS[name](**options)
+
+
+def run_learner(driver, quiet=True, write_report=False, calibrate=False):
+    """用假驱动跑一次完整的learner.run()，返回(结果, learner)"""
+    from chaoxing_auto_learner import ChaoxingAutoLearner
+
+    with simulated_config(write_report, calibrate), quiet_logs(quiet):
+        learner = ChaoxingAutoLearner(driver=driver)
+        with driver.clock.patched():
+            result = learner.run()
+    return result, learner
+
+
+@contextmanager
+def simulated_config(write_report=False, calibrate=False):
+    """模拟运行（假驱动、基准、回放）期间临时修改的配置，退出时恢复
+
+    模拟的延迟不代表真实网络，默认不写报告也不参与超时校准；模拟的进度、页面结构和诊断快照也不写文件。
+    """
+    from config import Config
+
+    overrides = {
+        "WRITE_TIMELINE_REPORT": write_report,
+        "AUTO_CALIBRATE": calibrate,
+        "CHECKPOINT_ENABLED": False,
+        "FINGERPRINT_FILE": "",
+        "FINGERPRINT_SNAPSHOT_DIR": "",
+        "DIAGNOSTICS_DIR": "",
+    }
+    previous = {name: getattr(Config, name) for name in overrides}
+    for name, value in overrides.items():
+        setattr(Config, name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(Config, name, value)
+
+
+@contextmanager
+def quiet_logs(quiet=True):
+    """临时关闭学习程序相关模块的日志输出"""
+    loggers = [logging.getLogger(name) for name in PATCHED_MODULES]
+    previous_levels = [logger.level for logger in loggers]
+    if quiet:
+        for logger in loggers:
+            logger.setLevel(logging.CRITICAL)
+    try:
+        yield
+    finally:
+        for logger, level in zip(loggers, previous_levels):
+            logger.setLevel(level)
+
+
+def main():
+    """依次运行所有场景并输出耗时，有场景与EXPECTED不一致时返回1"""
+    print("=" * 100)
+    print(f"{'场景':<16}{'结果':<8}{'完成课程':<10}{'虚拟耗时':<12}{'实际耗时':<12}{'驱动命令数':<10}{'流量':>10}  预期")
+    print("-" * 100)
+    mismatches = []
+    for name in SCENARIOS:
+        driver = build_scenario(name)
+        started = _real_time.perf_counter()
+        result, learner = run_learner(driver)
+        real_ms = (_real_time.perf_counter() - started) * 1000
+        completed = sum(1 for s in driver.site.sections if s.completed)
+        expected = EXPECTED.get(name)
+        matched = expected is None or (bool(result), completed) == expected
+        if not matched:
+            mismatches.append(f"{name}: 预期 {expected[0]} {expected[1]}/{len(driver.site.sections)}，"
+                              f"实际 {result} {completed}/{len(driver.site.sections)}")
+        print(f"{name:<16}{str(result):<8}{completed}/{len(driver.site.sections):<8}"
+              f"{driver.clock.elapsed / 60:>8.1f}分钟  {real_ms:>8.1f}ms   {driver.command_total:>8}"
+              f"{format_bytes(learner.timeline.summary()['bytes_received']):>12}  {'✅' if matched else '❌'}")
+    print("=" * 100)
+    for line in mismatches:
+        print(f"❌ {line}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+网络响应观察 - 从Chrome性能日志中读出播放器自己上报进度的响应，作为任务点完成信号
+
+播放器播放时会定期向服务器上报进度（/multimedia/log/...），任务点完成时响应中带 "isPassed": true。
+这里只读取浏览器已经收到的响应（性能日志中的Network事件 + Network.getResponseBody），
+从不修改、拦截或构造任何请求。同一份日志中的数据量也被累加到bytes_received，用于统计每个课程的流量。
+
+    poll()   取回上次以来的日志，返回新收到的进度上报 [ProgressReport]
+    reset()  处理已有日志但丢弃其中的进度上报（开始播放新的视频前调用，避免上一个视频的响应被误认）
+
+需要在启动Chrome时开启性能日志（goog:loggingPrefs performance=ALL），见 enable_performance_log()。
+"""
+
+import json
+import logging
+from config import Config
+
+
+def enable_performance_log(chrome_options):
+    """在ChromeOptions中开启性能日志（包含Network事件）"""
+    chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+
+class ProgressReport:
+    """一次进度上报的响应"""
+
+    def __init__(self, url, passed, body=None):
+        self.url = url
+        self.passed = passed
+        self.body = body
+
+    def __repr__(self):
+        return f"ProgressReport(passed={self.passed}, url={self.url[:80]!r})"
+
+
+class NetworkObserver:
+    """读取性能日志中的进度上报响应"""
+
+    def __init__(self, driver, patterns=None):
+        self.driver = driver
+        self.patterns = patterns or Config.PROGRESS_URL_PATTERNS
+        self.logger = logging.getLogger(__name__)
+        self.available = True
+        self.reports = 0
+        self.bytes_received = 0  # 累计从网络收到的字节数（编码后，即实际传输量）
+        self._pending = {}  # requestId -> url，响应头已到、正文还没加载完的进度上报
+        self._received = {}  # requestId -> 已通过Network.dataReceived计入的字节数
+
+    def poll(self):
+        """返回上次以来新收到的进度上报；浏览器不支持性能日志时返回空列表并停用"""
+        reports = self._process(read_reports=True)
+        self.reports += len(reports)
+        return reports
+
+    def reset(self):
+        """处理尚未读取的日志（计入流量），丢弃其中的进度上报"""
+        self._process(read_reports=False)
+        self._pending.clear()
+
+    def _process(self, read_reports):
+        reports = []
+        for method, params in self._events():
+            request_id = params.get("requestId")
+            if method == "Network.responseReceived":
+                url = params.get("response", {}).get("url", "")
+                if any(pattern in url for pattern in self.patterns):
+                    self._pending[request_id] = url
+            elif method == "Network.dataReceived":
+                length = params.get("encodedDataLength") or 0
+                self._received[request_id] = self._received.get(request_id, 0) + length
+                self.bytes_received += length
+            elif method == "Network.loadingFailed":
+                self._received.pop(request_id, None)
+                self._pending.pop(request_id, None)
+            elif method == "Network.loadingFinished":
+                # loadingFinished给出整个请求的传输量，补上dataReceived中没有计入的部分
+                counted = self._received.pop(request_id, 0)
+                self.bytes_received += max(0, (params.get("encodedDataLength") or 0) - counted)
+                url = self._pending.pop(request_id, None)
+                if url is not None and read_reports:
+                    report = self._read_report(request_id, url)
+                    if report is not None:
+                        reports.append(report)
+        return reports
+
+    def _events(self):
+        if not self.available:
+            return
+        try:
+            entries = self.driver.get_log("performance")
+        except Exception as e:
+            self.available = False
+            self.logger.info(f"浏览器未开启性能日志，不使用网络响应判断完成: {e}")
+            return
+        for entry in entries:
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, TypeError, ValueError):
+                continue
+            yield message.get("method"), message.get("params", {})
+
+    def _read_report(self, request_id, url):
+        try:
+            result = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+            data = json.loads(result.get("body") or "{}")
+        except Exception as e:
+            # 正文已被浏览器丢弃或不是JSON
+            self.logger.debug(f"读取进度上报响应失败: {e}")
+            return None
+        passed = bool(data.get("isPassed")) if isinstance(data, dict) else False
+        return ProgressReport(url, passed, data)
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+播放器控制脚本 - 在每个页面和iframe中预先定义 window.__cxPlayer，播放、设置倍速、读取状态都只需一次调用
+
+原来的做法：点击播放按钮后固定等待倍速控件出现（PLAYBACK_SPEED_WAIT），再点开倍速菜单、
+列出选项、点击2x，读取视频状态还要对<video>逐个属性get_property，每一步都是一次或多次往返。
+
+这里通过 Page.addScriptToEvaluateOnNewDocument 注册一次脚本，之后新建的每个文档（包括刷新后的页面
+和嵌套的视频iframe）都会自动带上 window.__cxPlayer：
+    play()         播放器就绪后点击播放按钮（没有按钮时直接play()），返回状态；paused为false才说明已开始播放
+    setRate(rate)  通过video.js设置倍速（不可用时直接设置<video>.playbackRate），返回状态
+    state()        一次返回当前时间、时长、暂停、结束、倍速、readyState、networkState、错误
+    lowestQuality() 切换到最低清晰度（HLS清晰度列表或清晰度菜单），返回状态及quality（没有可选清晰度时为null）
+
+播放器未就绪时各方法返回 {ready: false}，调用方轮询即可，就绪后立即返回。
+注册前已存在的文档或不支持CDP的浏览器中，第一次调用时在当前frame中补注入一次。
+"""
+
+import logging
+
+PLAYER_HELPER_JS = """
+(function () {
+    if (window.__cxPlayer) return;
+    function video() { return document.querySelector('video'); }
+    // 清晰度菜单中的选项，以及清晰度标签的高低（数字越小越低，无法识别的不参与选择）
+    var QUALITY_ITEMS = '.vjs-resolution-button .vjs-menu-item, .vjs-quality-selector .vjs-menu-item, ' +
+                        '.vjs-quality-menu-button .vjs-menu-item';
+    var QUALITY_RANKS = {'流畅': 240, '标清': 360, '低清': 360, 'SD': 480, '高清': 720, 'HD': 720,
+                         '超清': 1080, '蓝光': 1440, '原画': 2160};
+    function qualityRank(label) {
+        var match = /(\d{3,4})\s*[pP]/.exec(label);
+        if (match) return parseInt(match[1], 10);
+        for (var name in QUALITY_RANKS) {
+            if (label.indexOf(name) >= 0) return QUALITY_RANKS[name];
+        }
+        return Infinity;
+    }
+    function lowestQuality() {
+        var v = video();
+        var result = state();
+        result.quality = null;
+        if (!v) return result;
+        // HLS流：只保留码率最低的一档
+        try {
+            var box = v.closest('.video-js');
+            var player = window.videojs && box ? window.videojs(box) : null;
+            var levels = player && player.qualityLevels ? player.qualityLevels() : null;
+            if (levels && levels.length > 1) {
+                var lowest = 0;
+                for (var i = 1; i < levels.length; i++) {
+                    if ((levels[i].bitrate || levels[i].height) < (levels[lowest].bitrate || levels[lowest].height)) lowest = i;
+                }
+                for (var j = 0; j < levels.length; j++) levels[j].enabled = (j === lowest);
+                result.quality = levels[lowest].height ? levels[lowest].height + 'p' : String(levels[lowest].bitrate);
+                return result;
+            }
+        } catch (e) {}
+        // 清晰度菜单：点击标签最低的一项
+        var items = document.querySelectorAll(QUALITY_ITEMS), best = null, bestRank = Infinity;
+        for (var k = 0; k < items.length; k++) {
+            var rank = qualityRank(items[k].textContent.trim());
+            if (rank < bestRank) { best = items[k]; bestRank = rank; }
+        }
+        if (!best) return result;
+        if (best.className.indexOf('vjs-selected') < 0) best.click();
+        result.quality = best.textContent.trim();
+        return result;
+    }
+    function state() {
+        var v = video();
+        if (!v) return {ready: false};
+        return {
+            ready: true,
+            currentTime: v.currentTime,
+            duration: v.duration || 0,
+            paused: v.paused,
+            ended: v.ended,
+            playbackRate: v.playbackRate,
+            readyState: v.readyState,
+            networkState: v.networkState,
+            error: v.error ? v.error.code : null
+        };
+    }
+    window.__cxPlayer = {
+        state: state,
+        play: function () {
+            var v = video();
+            if (!v) return state();
+            if (v.paused && !v.ended) {
+                var button = document.querySelector('.vjs-big-play-button');
+                if (button && button.offsetParent !== null) {
+                    button.click();
+                } else {
+                    var promise = v.play();
+                    if (promise && promise.catch) promise.catch(function () {});
+                }
+            }
+            return state();
+        },
+        setRate: function (rate) {
+            var v = video();
+            if (!v) return state();
+            var box = v.closest('.video-js');
+            try {
+                if (window.videojs && box) window.videojs(box).playbackRate(rate);
+                else v.playbackRate = rate;
+            } catch (e) {
+                v.playbackRate = rate;
+            }
+            return state();
+        },
+        lowestQuality: lowestQuality
+    };
+})();
+"""
+
+# 调用 window.__cxPlayer[方法](参数)，当前文档中没有控制脚本时返回null
+PLAYER_CALL_JS = "return window.__cxPlayer ? window.__cxPlayer[arguments[0]](arguments[1]) : null;"
+
+
+class PlayerHelper:
+    """注册并调用播放器控制脚本"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.logger = logging.getLogger(__name__)
+        self.registered = False
+        self.injections = 0
+
+    def register(self):
+        """注册到之后新建的所有文档，失败时（非Chromium浏览器）只靠调用时补注入"""
+        try:
+            self.driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": PLAYER_HELPER_JS})
+            self.registered = True
+            self.logger.info("🎛️ 播放器控制脚本已注册")
+        except Exception as e:
+            self.logger.debug(f"注册播放器控制脚本失败，改为按需注入: {e}")
+        return self.registered
+
+    def call(self, method, *args):
+        """在当前frame中调用控制脚本，返回状态字典；脚本无法执行时返回None"""
+        try:
+            result = self.driver.execute_script(PLAYER_CALL_JS, method, *args)
+            if result is None:
+                # 当前文档在注册前就已创建，补注入一次
+                self.driver.execute_script(PLAYER_HELPER_JS)
+                self.injections += 1
+                result = self.driver.execute_script(PLAYER_CALL_JS, method, *args)
+            return result if isinstance(result, dict) else None
+        except Exception as e:
+            self.logger.debug(f"调用播放器控制脚本失败（{method}）: {e}")
+            return None
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+启动前检查 - 在启动浏览器之前并行检查依赖、配置、ChromeDriver、版本匹配和课程站点连通性
+
+    results = run_preflight(course_urls)   # 各项检查在线程池中同时进行，总时长不超过PREFLIGHT_TIMEOUT
+    print_preflight(results)               # 输出通过/警告/失败表格
+    preflight_passed(results)              # 没有失败项时为True
+
+每项检查返回 (状态, 说明)，状态为 pass / warn / fail；检查本身抛出异常或超时未完成都记为失败。
+只有失败项会阻止启动，警告项（例如找不到本地ChromeDriver，启动时仍可由webdriver-manager下载）只提示。
+"""
+
+import os
+import re
+import sys
+import time
+import threading
+import unicodedata
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, wait
+from config import Config
+
+PASS = "pass"
+WARN = "warn"
+FAIL = "fail"
+
+STATUS_LABELS = {
+    PASS: "✅ 通过",
+    WARN: "⚠️ 警告",
+    FAIL: "❌ 失败",
+}
+
+PLAYBACK_SPEED_PATTERN = re.compile(r"^\d+(\.\d+)?x$")
+
+
+class PreflightResult:
+    """单项检查的结果"""
+
+    def __init__(self, name, status, detail="", seconds=0.0):
+        self.name = name
+        self.status = status
+        self.detail = detail
+        self.seconds = seconds
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "status": self.status,
+            "detail": self.detail,
+            "seconds": round(self.seconds, 3),
+        }
+
+
+def _course_urls(course_urls=None):
+    return list(course_urls or Config.COURSE_URLS or [Config.COURSE_URL])
+
+
+# config.py中账号和密码的示例值，真实密码可能含有星号，所以只与示例值原样比较
+PLACEHOLDER_VALUES = ("18********", "**********")
+
+
+def _is_placeholder(value):
+    """config.py中的示例值或空值"""
+    return not value or str(value) in PLACEHOLDER_VALUES
+
+
+def check_dependencies(course_urls=None):
+    """检查selenium、webdriver-manager和requests是否已安装"""
+    missing = []
+    for module in ("selenium", "webdriver_manager", "requests"):
+        try:
+            __import__(module)
+        except ImportError:
+            missing.append(module)
+    if sys.version_info < (3, 7):
+        return FAIL, f"需要Python 3.7或更高版本（当前 {sys.version.split()[0]}）"
+    if missing:
+        return FAIL, f"缺少依赖: {', '.join(missing)}，请运行 pip install -r requirements.txt"
+    return PASS, f"Python {sys.version.split()[0]}"
+
+
+def check_config(course_urls=None):
+    """检查账号、课程URL和常用数值配置"""
+    problems = []
+    if _is_placeholder(Config.USERNAME):
+        problems.append("USERNAME 仍是示例值")
+    if _is_placeholder(Config.PASSWORD):
+        problems.append("PASSWORD 仍是示例值")
+    urls = _course_urls(course_urls)
+    for url in urls:
+        parsed = urlparse(url or "")
+        if parsed.scheme not in ("http", "https") or not parsed.netloc:
+            problems.append(f"课程URL无效: {url!r}")
+    if len(set(urls)) != len(urls):
+        problems.append("课程URL有重复")
+    if not PLAYBACK_SPEED_PATTERN.match(str(Config.PLAYBACK_SPEED)):
+        problems.append(f"PLAYBACK_SPEED 应为 \"2x\" 这样的格式: {Config.PLAYBACK_SPEED!r}")
+    for name in ("IMPLICIT_WAIT", "PAGE_LOAD_TIMEOUT", "VIDEO_WAIT_TIME", "STATUS_CHECK_INTERVAL"):
+        value = getattr(Config, name, None)
+        if not isinstance(value, (int, float)) or value <= 0:
+            problems.append(f"{name} 应为正数: {value!r}")
+    if problems:
+        return FAIL, "；".join(problems)
+    return PASS, f"{len(urls)} 个课程主页"
+
+
+def resolve_driver_path():
+    """启动时使用的本地ChromeDriver（setup_driver也调用这里）：只有项目目录中的chromedriver.exe；
+    没有时返回None，启动时由webdriver-manager按Chrome版本下载，失败时再用系统PATH中的chromedriver"""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chromedriver.exe")
+    return path if os.path.isfile(path) else None
+
+
+_driver_versions = {}
+_driver_versions_lock = threading.Lock()
+
+
+def driver_version(path):
+    """chromedriver --version 的结果，同一次检查中只执行一次（ChromeDriver和版本匹配两项并行调用）"""
+    from download_chromedriver import installed_version
+
+    with _driver_versions_lock:
+        if path not in _driver_versions:
+            _driver_versions[path] = installed_version(path)
+        return _driver_versions[path]
+
+
+def check_driver(course_urls=None):
+    """检查启动时使用的ChromeDriver是否存在且可以执行"""
+    path = resolve_driver_path()
+    if path is None:
+        return WARN, "项目目录中没有chromedriver.exe，启动时由webdriver-manager下载（可运行 python download_chromedriver.py）"
+    version = driver_version(path)
+    if version is None:
+        return FAIL, f"{path} 无法执行"
+    return PASS, f"{version}（{path}）"
+
+
+def check_versions(course_urls=None):
+    """检查Chrome和启动时使用的ChromeDriver的主版本是否一致"""
+    from download_chromedriver import get_chrome_version
+
+    chrome_version = get_chrome_version()
+    if not chrome_version:
+        return WARN, "无法获取Chrome版本"
+    path = resolve_driver_path()
+    if path is None:
+        return PASS, f"Chrome {chrome_version}，ChromeDriver由webdriver-manager按此版本下载"
+    version = driver_version(path)
+    if version is None:
+        return WARN, f"Chrome {chrome_version}，没有可比较的ChromeDriver"
+    if chrome_version.split(".")[0] != version.split(".")[0]:
+        return FAIL, (f"Chrome {chrome_version} 与 ChromeDriver {version} 主版本不一致，"
+                      f"请运行 python download_chromedriver.py")
+    return PASS, f"Chrome {chrome_version} / ChromeDriver {version}"
+
+
+def check_site(course_urls=None):
+    """检查课程站点能否连通（未登录时会跳转到登录页，只要有HTTP响应即可）"""
+    import requests
+
+    hosts = []
+    for url in _course_urls(course_urls):
+        parsed = urlparse(url or "")
+        if parsed.scheme in ("http", "https") and parsed.netloc and parsed.netloc not in hosts:
+            hosts.append(parsed.netloc)
+    if not hosts:
+        return WARN, "没有有效的课程URL，跳过"
+    failures = []
+    for host in hosts:
+        try:
+            requests.head(f"https://{host}/", timeout=Config.PREFLIGHT_NETWORK_TIMEOUT, allow_redirects=False)
+        except requests.RequestException as e:
+            failures.append(f"{host}: {type(e).__name__}")
+    if failures:
+        return FAIL, "无法连接 " + "，".join(failures)
+    return PASS, "，".join(hosts)
+
+
+PREFLIGHT_CHECKS = [
+    ("依赖", check_dependencies),
+    ("配置", check_config),
+    ("ChromeDriver", check_driver),
+    ("版本匹配", check_versions),
+    ("课程站点", check_site),
+]
+
+
+def _timed(name, check, course_urls):
+    started = time.time()
+    try:
+        status, detail = check(course_urls)
+    except Exception as e:
+        status, detail = FAIL, f"检查出错: {e}"
+    return PreflightResult(name, status, detail, time.time() - started)
+
+
+def run_preflight(course_urls=None, checks=None, timeout=None):
+    """在线程池中同时运行各项检查，按PREFLIGHT_CHECKS的顺序返回结果；超时未完成的记为失败"""
+    checks = PREFLIGHT_CHECKS if checks is None else checks
+    timeout = Config.PREFLIGHT_TIMEOUT if timeout is None else timeout
+    with _driver_versions_lock:
+        _driver_versions.clear()
+    executor = ThreadPoolExecutor(max_workers=len(checks) or 1)
+    futures = [executor.submit(_timed, name, check, course_urls) for name, check in checks]
+    wait(futures, timeout=timeout)
+    results = []
+    for (name, _), future in zip(checks, futures):
+        if future.done():
+            results.append(future.result())
+        else:
+            results.append(PreflightResult(name, FAIL, f"{timeout:g}秒内未完成", timeout))
+    # 不等待超时的检查，它们结束后线程自行退出
+    executor.shutdown(wait=False)
+    return results
+
+
+def preflight_passed(results):
+    return all(result.status != FAIL for result in results)
+
+
+def _pad(text, width):
+    """按终端显示宽度（中文占两格）补齐"""
+    shown = sum(2 if unicodedata.east_asian_width(char) in ("W", "F") else 1 for char in text)
+    return text + " " * max(0, width - shown)
+
+
+def print_preflight(results):
+    """输出检查结果表格"""
+    print("\n🔍 启动前检查:")
+    for result in results:
+        print(f"   {_pad(result.name, 14)}{_pad(STATUS_LABELS.get(result.status, result.status), 10)}"
+              f"{result.seconds * 1000:>6.0f}ms  {result.detail}")
+    failed = [result.name for result in results if result.status == FAIL]
+    if failed:
+        print(f"❌ 启动前检查未通过: {', '.join(failed)}")
+    else:
+        print("✅ 启动前检查通过")
+    return not failed
+
+
+if __name__ == "__main__":
+    sys.exit(0 if print_preflight(run_preflight()) else 1)
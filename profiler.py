@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""
+运行性能分析 - 区分Python逻辑、WebDriver往返和time.sleep各占多少时间
+
+开启后会同时做三件事：
+1. cProfile统计Python侧CPU耗时（每个课程一个.prof，可用snakeviz等查看）
+2. 采样主线程调用栈，输出折叠栈文件（.folded，可直接拖进speedscope或用flamegraph.pl生成火焰图）
+3. 统计每条WebDriver命令和time.sleep阻塞的墙钟时间（summary.json）
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import cProfile
+import pstats
+import logging
+import threading
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from selenium.webdriver.remote.webdriver import WebDriver
+from config import Config
+
+_real_sleep = time.sleep
+
+
+def _safe_name(name):
+    """把课程标题转成可用作文件名的字符串"""
+    return re.sub(r'[\\/:*?"<>|\s]+', "_", str(name)).strip("_")[:40] or "unnamed"
+
+
+class _Segment:
+    """一个分析片段（整体运行中的启动阶段或某个课程）"""
+
+    def __init__(self, index, name):
+        self.index = index
+        self.name = name
+        self.profile = cProfile.Profile()
+        self.stacks = {}
+        self.wall = 0.0
+        self.webdriver_seconds = 0.0
+        self.webdriver_calls = {}
+        self.sleep_seconds = 0.0
+        self.sleep_calls = 0
+
+    @property
+    def file_stem(self):
+        return f"{self.index:02d}_{_safe_name(self.name)}"
+
+    def summary(self):
+        python_seconds = max(0.0, self.wall - self.webdriver_seconds - self.sleep_seconds)
+        return {
+            "name": self.name,
+            "wall_seconds": round(self.wall, 3),
+            "webdriver_seconds": round(self.webdriver_seconds, 3),
+            "webdriver_calls": sum(c for c, _ in self.webdriver_calls.values()),
+            "sleep_seconds": round(self.sleep_seconds, 3),
+            "sleep_calls": self.sleep_calls,
+            "python_seconds": round(python_seconds, 3),
+            "webdriver_commands": {
+                command: {"calls": count, "seconds": round(seconds, 3)}
+                for command, (count, seconds) in sorted(self.webdriver_calls.items(), key=lambda i: -i[1][1])
+            },
+        }
+
+
+class RunProfiler:
+    """整次运行的性能分析器，按课程分段输出文件"""
+
+    def __init__(self, run_name="run", output_dir=None, sample_interval=None):
+        self.run_name = f"{_safe_name(run_name)}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self.output_dir = os.path.join(output_dir or Config.PROFILE_DIR, self.run_name)
+        self.sample_interval = sample_interval or Config.PROFILE_SAMPLE_INTERVAL
+        self.logger = logging.getLogger(__name__)
+        self.segments = []
+        self._current = None
+        self._main = None
+        self._segment_started = None
+        self._thread_id = None
+        self._sampler = None
+        self._stop_event = threading.Event()
+        self._original_execute = None
+        self._original_sleep = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def start(self):
+        """安装WebDriver/sleep计时钩子并启动采样线程"""
+        self._thread_id = threading.get_ident()
+        self._install_hooks()
+        self._main = self._new_segment("main")
+        self._activate(self._main)
+        self._stop_event.clear()
+        self._sampler = threading.Thread(target=self._sample_loop, name="profiler-sampler", daemon=True)
+        self._sampler.start()
+        self.logger.info(f"性能分析已开启，结果目录: {self.output_dir}")
+
+    def stop(self):
+        """停止分析并写出所有文件"""
+        if self._thread_id is None:
+            return
+        self._deactivate()
+        self._stop_event.set()
+        if self._sampler:
+            self._sampler.join(timeout=1)
+        self._remove_hooks()
+        self._thread_id = None
+        self.write()
+
+    @contextmanager
+    def section(self, name):
+        """把代码块单独作为一个片段统计（通常是一个课程）"""
+        if self._thread_id is None:
+            yield
+            return
+        segment = self._new_segment(name)
+        self._deactivate()
+        self._activate(segment)
+        try:
+            yield segment
+        finally:
+            self._deactivate()
+            self._activate(self._main)
+
+    def _new_segment(self, name):
+        segment = _Segment(len(self.segments), name)
+        self.segments.append(segment)
+        return segment
+
+    def _activate(self, segment):
+        self._current = segment
+        self._segment_started = time.perf_counter()
+        segment.profile.enable()
+
+    def _deactivate(self):
+        if self._current is None:
+            return
+        self._current.profile.disable()
+        self._current.wall += time.perf_counter() - self._segment_started
+        self._current = None
+
+    # 计时钩子
+    def _install_hooks(self):
+        profiler = self
+        self._original_execute = WebDriver.execute
+        original_execute = self._original_execute
+
+        def execute(driver, driver_command, params=None):
+            started = time.perf_counter()
+            try:
+                return original_execute(driver, driver_command, params)
+            finally:
+                profiler._record_webdriver(driver_command, time.perf_counter() - started)
+
+        WebDriver.execute = execute
+
+        self._original_sleep = time.sleep
+        original_sleep = self._original_sleep
+
+        def sleep(seconds):
+            started = time.perf_counter()
+            try:
+                return original_sleep(seconds)
+            finally:
+                if threading.get_ident() == profiler._thread_id:
+                    profiler._record_sleep(time.perf_counter() - started)
+
+        time.sleep = sleep
+
+    def _remove_hooks(self):
+        if self._original_execute is not None:
+            WebDriver.execute = self._original_execute
+        if self._original_sleep is not None:
+            time.sleep = self._original_sleep
+
+    def _record_webdriver(self, command, seconds):
+        segment = self._current
+        if segment is None:
+            return
+        segment.webdriver_seconds += seconds
+        count, total = segment.webdriver_calls.get(command, (0, 0.0))
+        segment.webdriver_calls[command] = (count + 1, total + seconds)
+
+    def _record_sleep(self, seconds):
+        segment = self._current
+        if segment is None:
+            return
+        segment.sleep_seconds += seconds
+        segment.sleep_calls += 1
+
+    # 调用栈采样
+    def _sample_loop(self):
+        while not self._stop_event.is_set():
+            frame = sys._current_frames().get(self._thread_id)
+            segment = self._current
+            if frame is not None and segment is not None:
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                key = ";".join(reversed(stack))
+                segment.stacks[key] = segment.stacks.get(key, 0) + 1
+            _real_sleep(self.sample_interval)
+
+    # 输出
+    def write(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        merged_stats = None
+        merged_stacks = {}
+        summaries = []
+        for segment in self.segments:
+            if segment.wall <= 0:
+                continue
+            prof_path = os.path.join(self.output_dir, f"{segment.file_stem}.prof")
+            segment.profile.dump_stats(prof_path)
+            if merged_stats is None:
+                merged_stats = pstats.Stats(prof_path)
+            else:
+                merged_stats.add(prof_path)
+            self._write_folded(os.path.join(self.output_dir, f"{segment.file_stem}.folded"), segment.stacks)
+            for key, count in segment.stacks.items():
+                merged_stacks[key] = merged_stacks.get(key, 0) + count
+            summaries.append(segment.summary())
+
+        if merged_stats is not None:
+            merged_stats.dump_stats(os.path.join(self.output_dir, "run.prof"))
+        self._write_folded(os.path.join(self.output_dir, "run.folded"), merged_stacks)
+
+        with open(os.path.join(self.output_dir, "summary.json"), "w", encoding="utf-8") as f:
+            json.dump({"run": self.run_name, "sample_interval": self.sample_interval, "segments": summaries},
+                      f, ensure_ascii=False, indent=2)
+
+        self.logger.info(f"性能分析结果已保存: {self.output_dir}")
+        self.logger.info(f"{'片段':<24}{'总耗时':>10}{'WebDriver':>12}{'sleep':>10}{'Python':>10}")
+        for summary in summaries:
+            self.logger.info(
+                f"{summary['name'][:22]:<24}{summary['wall_seconds']:>9.1f}s"
+                f"{summary['webdriver_seconds']:>11.1f}s{summary['sleep_seconds']:>9.1f}s"
+                f"{summary['python_seconds']:>9.1f}s"
+            )
+
+    @staticmethod
+    def _write_folded(path, stacks):
+        with open(path, "w", encoding="utf-8") as f:
+            for key, count in sorted(stacks.items()):
+                f.write(f"{key} {count}\n")
+
+
+def profile_from_argv(run_name, argv=None):
+    """命令行带--profile时返回RunProfiler，否则返回空上下文"""
+    argv = sys.argv[1:] if argv is None else argv
+    if "--profile" in argv:
+        return RunProfiler(run_name)
+    return nullcontext()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WebDriver会话录制与回放 - 把真实运行中的每条WebDriver命令和响应录下来，之后不启动浏览器原样回放
+
+录制：在协议层（RemoteConnection.execute）记录命令、参数、原始响应和耗时，
+写入 recordings/<运行名>_<时间>.jsonl.gz（每行一条命令）。账号、密码及输入框内容会被替换为***。
+
+回放：ReplayDriver是一个真正的selenium WebDriver，只是把命令执行器换成录制文件，
+学习程序的WebElement、WebDriverWait、异常处理等代码都照常运行。
+    fast      虚拟时钟按录制时的时间推进，几秒内回放完整个会话（默认）
+    realtime  按录制时的节奏实际等待
+
+    python run.py --record                               # 录制一次真实运行
+    python recording.py recordings/run_20250101_120000.jsonl.gz
+    python recording.py recordings/run_20250101_120000.jsonl.gz --realtime
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+import logging
+import argparse
+from contextlib import nullcontext
+from datetime import datetime
+from selenium.webdriver.remote.webdriver import WebDriver
+from selenium.webdriver.remote.remote_connection import RemoteConnection
+from selenium.webdriver.chrome.options import Options
+from config import Config
+from preflight import PLACEHOLDER_VALUES
+
+FORMAT_VERSION = 1
+REDACTED = "***"
+
+# 参数中需要整体替换的字段（send_keys的输入内容）
+REDACTED_PARAMS = {"text", "value"}
+REDACTED_PARAM_COMMANDS = {"sendKeysToElement", "sendKeysToActiveElement"}
+
+# 回放时遇到不一致的命令，最多向后查找多少条
+LOOKAHEAD = 50
+
+
+def _secrets():
+    """需要在录制文件中抹掉的字符串（未填写的占位值除外）"""
+    values = [Config.USERNAME, Config.PASSWORD]
+    return [v for v in values if v and v not in PLACEHOLDER_VALUES]
+
+
+def redact(value, secrets):
+    if isinstance(value, str):
+        for secret in secrets:
+            value = value.replace(secret, REDACTED)
+        return value
+    if isinstance(value, dict):
+        return {k: redact(v, secrets) for k, v in value.items()}
+    if isinstance(value, list):
+        return [redact(v, secrets) for v in value]
+    return value
+
+
+def _strip_session(params):
+    return {k: v for k, v in (params or {}).items() if k != "sessionId"}
+
+
+def _match_key(command, params):
+    return command, json.dumps(params, sort_keys=True, ensure_ascii=False)
+
+
+# ---------------------------------------------------------------- 录制
+
+class SessionRecorder:
+    """在上下文中录制所有WebDriver协议命令"""
+
+    def __init__(self, run_name="run", output_dir=None):
+        self.path = os.path.join(output_dir or Config.RECORD_DIR,
+                                 f"{run_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl.gz")
+        self.logger = logging.getLogger(__name__)
+        self.commands = 0
+        self._file = None
+        self._origin = None
+        self._secrets = _secrets()
+        self._original_execute = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def start(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._file = gzip.open(self.path, "wt", encoding="utf-8")
+        self._origin = time.time()
+        self._write({"format": FORMAT_VERSION, "created": datetime.now().isoformat(timespec="seconds"),
+                     "started": self._origin})
+
+        recorder = self
+        self._original_execute = RemoteConnection.execute
+        original_execute = self._original_execute
+
+        def execute(connection, command, params):
+            sent = dict(params or {})  # execute会把路径参数（如元素id）从params中删掉，先保留一份
+            started = time.time()
+            response = original_execute(connection, command, params)
+            recorder.record(command, sent, response, started, time.time())
+            return response
+
+        RemoteConnection.execute = execute
+        self.logger.info(f"🎙️ 正在录制WebDriver会话: {self.path}")
+
+    def stop(self):
+        if self._original_execute is not None:
+            RemoteConnection.execute = self._original_execute
+            self._original_execute = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self.logger.info(f"会话录制已保存: {self.path} ({self.commands} 条命令)")
+
+    def record(self, command, params, response, started, finished):
+        params = _strip_session(params)
+        if command in REDACTED_PARAM_COMMANDS:
+            params = {k: (REDACTED if k in REDACTED_PARAMS else v) for k, v in params.items()}
+        self._write({
+            "t": round(started - self._origin, 4),
+            "d": round(finished - started, 4),
+            "c": command,
+            "p": redact(params, self._secrets),
+            "r": redact(response, self._secrets),
+        })
+        self.commands += 1
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+
+def record_from_argv(run_name, argv=None):
+    """命令行带--record时返回SessionRecorder，否则返回空上下文"""
+    argv = sys.argv[1:] if argv is None else argv
+    if "--record" in argv:
+        return SessionRecorder(run_name)
+    return nullcontext()
+
+
+# ---------------------------------------------------------------- 回放
+
+def load_recording(path):
+    """返回(文件头, 命令列表)"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        entries = [json.loads(line) for line in f if line.strip()]
+    if header.get("format") != FORMAT_VERSION:
+        raise ValueError(f"不支持的录制文件格式: {header.get('format')}")
+    return header, entries
+
+
+class ReplayConnection:
+    """按录制顺序返回响应的命令执行器
+
+    学习程序发出的命令与下一条录制不一致时（例如轮询次数不同），向后查找最多LOOKAHEAD条
+    相同命令和参数的录制；找不到则再放宽到只比较命令名，仍找不到时返回错误响应。
+    """
+
+    def __init__(self, entries, clock=None, realtime=False):
+        self.entries = entries
+        self.position = 0
+        self.clock = clock
+        self.realtime = realtime
+        self.matched = 0
+        self.skipped = 0
+        self.mismatched = 0
+        self.logger = logging.getLogger(__name__)
+        self._started = time.time()
+
+    def execute(self, command, params):
+        key = _match_key(command, _strip_session(params))
+        index = self._find(lambda e: _match_key(e["c"], e["p"]) == key)
+        if index is None:
+            index = self._find(lambda e: e["c"] == command)
+        if index is None:
+            self.mismatched += 1
+            self.logger.debug(f"回放中没有找到命令: {command} {key[1][:200]}")
+            return {"value": {"error": "unknown error", "message": f"回放中没有对应的命令: {command}"}}
+
+        entry = self.entries[index]
+        self.skipped += index - self.position
+        self.position = index + 1
+        self.matched += 1
+        self._wait_until(entry["t"] + entry["d"])
+        return json.loads(json.dumps(entry["r"]))  # 调用方会修改响应，返回副本
+
+    @property
+    def remaining(self):
+        return len(self.entries) - self.position
+
+    def _find(self, predicate):
+        for index in range(self.position, min(self.position + LOOKAHEAD, len(self.entries))):
+            if predicate(self.entries[index]):
+                return index
+        return None
+
+    def _wait_until(self, offset):
+        if self.clock is not None:
+            target = self.clock.start + offset
+            if target > self.clock.now:
+                self.clock.advance(target - self.clock.now)
+        elif self.realtime:
+            delay = self._started + offset - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+
+class ReplayDriver(WebDriver):
+    """用录制文件代替浏览器的WebDriver"""
+
+    def __init__(self, path, clock=None, realtime=False):
+        self.recording_header, entries = load_recording(path)
+        self.replay = ReplayConnection(entries, clock=clock, realtime=realtime)
+        super().__init__(command_executor=self.replay, options=Options())
+
+    def execute_cdp_cmd(self, cmd, cmd_args):
+        return self.execute("executeCdpCommand", {"cmd": cmd, "params": cmd_args})["value"]
+
+    def quit(self):
+        try:
+            self.execute("quit")
+        except Exception:
+            pass
+
+    @property
+    def command_total(self):
+        return self.replay.matched + self.replay.mismatched
+
+
+def replay(path, realtime=False, quiet=True):
+    """回放一次完整的learner.run()，返回(结果, learner, 回放驱动)"""
+    from fake_driver import FakeClock, quiet_logs, simulated_config
+    from chaoxing_auto_learner import ChaoxingAutoLearner
+
+    # 回放的延迟不是新的测量，按模拟运行处理
+    with simulated_config(), quiet_logs(quiet):
+        if realtime:
+            driver = ReplayDriver(path, realtime=True)
+            learner = ChaoxingAutoLearner(driver=driver)
+            return learner.run(), learner, driver
+        header, _ = load_recording(path)
+        clock = FakeClock(start=header["started"])
+        with clock.patched():
+            driver = ReplayDriver(path, clock=clock)
+            learner = ChaoxingAutoLearner(driver=driver)
+            return learner.run(), learner, driver
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="回放录制的WebDriver会话")
+    parser.add_argument("recording", help="录制文件（.jsonl.gz）")
+    parser.add_argument("--realtime", action="store_true", help="按录制时的节奏回放")
+    parser.add_argument("--verbose", action="store_true", help="输出学习程序日志")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    result, learner, driver = replay(args.recording, realtime=args.realtime, quiet=not args.verbose)
+    elapsed = time.perf_counter() - started
+    stats = driver.replay
+    print(f"回放结果: {result}")
+    print(f"命令: 匹配 {stats.matched}, 跳过录制 {stats.skipped}, 未匹配 {stats.mismatched}, 剩余录制 {stats.remaining}")
+    print(f"实际耗时: {elapsed:.2f}秒")
+    return 0 if stats.mismatched == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+统一的重试策略 - 只重试指定的（暂时性）异常，等待时间按指数退避并加随机抖动，
+单个操作和单个课程的重试等待都有上限，超出后不再等待直接抛出原异常
+
+    policy = RetryPolicy()
+    policy.call(operation, "扫描目录")                          # 默认重试TRANSIENT_EXCEPTIONS
+    policy.call(operation, "下载", exceptions=(OSError,), attempts=5)
+    policy.start_course()                                       # 开始新课程，重置课程级上限
+    policy.stats                                                # {操作名: RetryStats}
+
+第n次重试前等待 min(RETRY_MAX_DELAY, RETRY_BASE_DELAY × 2^(n-1))，再乘以 [1 - RETRY_JITTER, 1] 之间的随机数，
+避免固定间隔的重试和页面的定时刷新撞在一起。
+"""
+
+import time
+import random
+import logging
+from selenium.common.exceptions import (
+    StaleElementReferenceException,
+    ElementClickInterceptedException,
+    ElementNotInteractableException,
+    NoSuchElementException,
+    NoSuchFrameException,
+)
+from config import Config
+
+# 页面重新渲染、元素被遮挡或尚未出现等，稍后重试通常就能成功的异常
+TRANSIENT_EXCEPTIONS = (
+    StaleElementReferenceException,
+    ElementClickInterceptedException,
+    ElementNotInteractableException,
+    NoSuchElementException,
+    NoSuchFrameException,
+)
+
+
+class RetryStats:
+    """单个操作的重试统计"""
+
+    def __init__(self):
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0  # 重试后仍然失败（或达到上限）的次数
+        self.wait_seconds = 0.0
+
+    def to_dict(self):
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "wait_seconds": round(self.wait_seconds, 3),
+        }
+
+
+class RetryPolicy:
+    """带指数退避、随机抖动和时间上限的重试"""
+
+    def __init__(self, exceptions=TRANSIENT_EXCEPTIONS, attempts=None, base_delay=None, max_delay=None,
+                 jitter=None, operation_timeout=None, course_budget=None, on_retry=None, logger=None):
+        self.exceptions = exceptions
+        self.attempts = attempts or Config.RETRY_ATTEMPTS
+        self.base_delay = Config.RETRY_BASE_DELAY if base_delay is None else base_delay
+        self.max_delay = Config.RETRY_MAX_DELAY if max_delay is None else max_delay
+        self.jitter = Config.RETRY_JITTER if jitter is None else jitter
+        self.operation_timeout = Config.RETRY_OPERATION_TIMEOUT if operation_timeout is None else operation_timeout
+        self.course_budget = Config.RETRY_COURSE_BUDGET if course_budget is None else course_budget
+        self.on_retry = on_retry  # on_retry(操作名, 异常, 等待秒数)
+        self.logger = logger or logging.getLogger(__name__)
+        self.stats = {}
+        self.course_wait = 0.0
+        self.course_retries = 0
+
+    def start_course(self):
+        """开始新课程，重置课程级的重试等待累计"""
+        self.course_wait = 0.0
+        self.course_retries = 0
+
+    def backoff(self, retry):
+        """第retry次重试前的等待时间"""
+        delay = min(self.max_delay, self.base_delay * 2 ** (retry - 1))
+        return delay * random.uniform(1 - self.jitter, 1)
+
+    def call(self, operation, name="操作", exceptions=None, attempts=None):
+        """执行operation，遇到可重试的异常时退避后重试；次数或时间用完后抛出最后一次的异常"""
+        exceptions = exceptions or self.exceptions
+        attempts = attempts or self.attempts
+        stats = self.stats.setdefault(name, RetryStats())
+        stats.calls += 1
+        started = time.time()
+        for attempt in range(1, attempts + 1):
+            try:
+                return operation()
+            except exceptions as e:
+                delay = self.backoff(attempt)
+                reason = None
+                if attempt == attempts:
+                    reason = f"已重试 {attempts - 1} 次"
+                elif time.time() - started + delay > self.operation_timeout:
+                    reason = f"超过单次操作的重试时间上限 {self.operation_timeout:.0f}秒"
+                elif self.course_wait + delay > self.course_budget:
+                    reason = f"本课程的重试等待已达上限 {self.course_budget:.0f}秒"
+                if reason is not None:
+                    stats.failures += 1
+                    self.logger.warning(f"{name}失败（{reason}）: {type(e).__name__}")
+                    raise
+                stats.retries += 1
+                stats.wait_seconds += delay
+                self.course_retries += 1
+                self.course_wait += delay
+                self.logger.warning(f"{name}失败（{type(e).__name__}），{delay:.1f}秒后重试 ({attempt}/{attempts - 1})")
+                if self.on_retry is not None:
+                    self.on_retry(name, e, delay)
+                time.sleep(delay)
+
+    @property
+    def total_retries(self):
+        return sum(s.retries for s in self.stats.values())
+
+    @property
+    def total_wait(self):
+        return sum(s.wait_seconds for s in self.stats.values())
+
+    def summary(self):
+        """有过重试的操作: 操作名 重试次数/等待秒数"""
+        return ", ".join(f"{name} {s.retries}次/{s.wait_seconds:.1f}秒"
+                         for name, s in self.stats.items() if s.retries or s.failures)
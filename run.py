@@ -6,38 +6,72 @@
 
 import sys
 import os
+import argparse
 from chaoxing_auto_learner import ChaoxingAutoLearner
+from profiler import profile_from_argv
+from tracing import trace_from_argv
+from recording import record_from_argv
+from preflight import run_preflight, print_preflight
 
-def main():
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="超星自动化学习程序")
+    parser.add_argument("--profile", action="store_true",
+                        help="开启性能分析，按课程输出cProfile和火焰图折叠栈文件")
+    parser.add_argument("--trace", action="store_true",
+                        help="导出Chrome trace-event格式的运行追踪（chrome://tracing 或 Perfetto 打开）")
+    parser.add_argument("--screenshots", action="store_true",
+                        help="开启后台截图缓冲，课程失败或超时时保存最近的截图")
+    parser.add_argument("--status", action="store_true",
+                        help="开启本地状态接口（/status 和 /metrics）")
+    parser.add_argument("--record", action="store_true",
+                        help="录制WebDriver会话（命令和响应），之后可用 recording.py 离线回放")
+    parser.add_argument("--course-url", action="append", dest="course_urls", metavar="URL",
+                        help="要学习的课程主页，可重复指定多个，按顺序在同一个浏览器会话中学习（默认使用配置文件）")
+    parser.add_argument("--skip-preflight", action="store_true",
+                        help="跳过启动前检查")
+    return parser.parse_args(argv)
+
+def main(args=None):
     """主函数"""
+    args = args or parse_args()
     print("=" * 50)
     print("🎓 超星自动化学习程序")
     print("=" * 50)
     print()
     
-    # 检查Python版本
-    if sys.version_info < (3, 7):
-        print("❌ 错误: 需要Python 3.7或更高版本")
-        print(f"当前版本: {sys.version}")
-        return False
-    
-    # 检查依赖
-    try:
-        import selenium
-        import webdriver_manager
-        print("✅ 依赖检查通过")
-    except ImportError as e:
-        print(f"❌ 缺少依赖: {e}")
-        print("请运行: pip install -r requirements.txt")
-        return False
-    
     # 确认用户信息
-    print("\n📋 当前配置:")
+    print("📋 当前配置:")
     from config import Config
     print(f"   用户名: {Config.USERNAME}")
-    print(f"   课程URL: {Config.COURSE_URL[:50]}...")
+    course_urls = args.course_urls or Config.COURSE_URLS or [Config.COURSE_URL]
+    if len(course_urls) == 1:
+        print(f"   课程URL: {course_urls[0][:50]}...")
+    else:
+        print(f"   课程URL: {len(course_urls)} 个（按顺序学习）")
+        for number, course_url in enumerate(course_urls, 1):
+            print(f"      {number}. {course_url[:50]}...")
     print(f"   播放速度: {Config.PLAYBACK_SPEED}")
     print(f"   无头模式: {'是' if Config.BROWSER_HEADLESS else '否'}")
+    if args.profile:
+        print(f"   性能分析: 开启（输出到 {Config.PROFILE_DIR}/）")
+    if args.trace:
+        print(f"   运行追踪: 开启（输出到 {Config.TRACE_DIR}/）")
+    if args.record:
+        print(f"   会话录制: 开启（输出到 {Config.RECORD_DIR}/，账号密码已脱敏）")
+    if args.screenshots:
+        Config.SCREENSHOT_BUFFER_ENABLED = True
+        print(f"   截图缓冲: 开启（失败时输出到 {Config.SCREENSHOT_DIR}/）")
+    if args.status:
+        Config.STATUS_SERVER_ENABLED = True
+    if Config.STATUS_SERVER_ENABLED:
+        print(f"   状态接口: http://{Config.STATUS_SERVER_HOST}:{Config.STATUS_SERVER_PORT}/status")
+    
+    # 启动前检查（依赖、配置、ChromeDriver、版本匹配、课程站点），失败时不启动浏览器
+    if Config.PREFLIGHT_ENABLED and not args.skip_preflight:
+        if not print_preflight(run_preflight(course_urls)):
+            print("请根据上表修改配置或安装驱动后重新运行（--skip-preflight 可跳过检查）")
+            return False
     
     # 用户确认
     print("\n⚠️  重要提醒:")
@@ -56,8 +90,11 @@ def main():
     
     # 运行主程序
     try:
-        learner = ChaoxingAutoLearner()
-        success = learner.run()
+        with record_from_argv("run", ["--record"] if args.record else []), \
+                trace_from_argv("run", ["--trace"] if args.trace else []), \
+                profile_from_argv("run", ["--profile"] if args.profile else []) as profiler:
+            learner = ChaoxingAutoLearner(profiler=profiler)
+            success = learner.run(course_urls)
         
         if success:
             print("\n✅ 程序运行完成！")
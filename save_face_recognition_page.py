@@ -13,6 +13,7 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 from config import Config
+from profiler import profile_from_argv
 import logging
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -211,5 +212,6 @@ class FaceRecognitionPageSaver:
                 self.driver.quit()
 
 if __name__ == "__main__":
-    saver = FaceRecognitionPageSaver()
-    saver.run() 
\ No newline at end of file
+    with profile_from_argv("save_face_recognition_page"):
+        saver = FaceRecognitionPageSaver()
+        saver.run() 
\ No newline at end of file
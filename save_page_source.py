@@ -14,6 +14,7 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
 from config import Config
+from profiler import profile_from_argv
 import os
 
 # 配置日志
@@ -242,5 +243,6 @@ class PageSourceSaver:
                 self.driver.quit()
 
 if __name__ == "__main__":
-    saver = PageSourceSaver()
-    saver.run() 
\ No newline at end of file
+    with profile_from_argv("save_page_source"):
+        saver = PageSourceSaver()
+        saver.run() 
\ No newline at end of file
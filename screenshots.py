@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+后台截图缓冲 - 通过CDP抓取缩小的JPEG，只保留最近N帧，课程失败或超时时才写盘
+
+save_screenshot每次都同步写一张全尺寸PNG，长时间运行时又慢又占磁盘。这里改为：
+1. 主线程在关键节点调用capture()，一次CDP往返拿到缩小、低质量的JPEG（base64）
+2. 解码、缓存和写文件都在工作线程中完成，固定大小的缓冲只保留最近N帧
+3. 课程失败或超时时调用flush()，把缓冲中的帧写到 screenshots/<时间>_<课程>_<原因>/ 下
+4. 每个课程开始时调用reset()清空缓冲，失败时写出的只有本课程的帧
+"""
+
+import os
+import re
+import time
+import queue
+import base64
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from config import Config
+
+
+def _safe_name(name):
+    return re.sub(r'[\\/:*?"<>|\s]+', "_", str(name)).strip("_")[:40] or "unnamed"
+
+
+class ScreenshotBuffer:
+    """最近N帧截图的环形缓冲"""
+
+    def __init__(self, driver, size=None, interval=None, quality=None, scale=None, output_dir=None):
+        self.driver = driver
+        self.size = size or Config.SCREENSHOT_BUFFER_SIZE
+        self.interval = Config.SCREENSHOT_INTERVAL if interval is None else interval
+        self.quality = quality or Config.SCREENSHOT_QUALITY
+        self.scale = scale or Config.SCREENSHOT_SCALE
+        self.output_dir = output_dir or Config.SCREENSHOT_DIR
+        self.logger = logging.getLogger(__name__)
+        self.frames = deque(maxlen=self.size)
+        self.captured = 0
+        self.flushed = []
+        self._viewport = None
+        self._last_capture = None
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._work, name="screenshot-buffer", daemon=True)
+        self._worker.start()
+
+    def capture(self, label, force=False):
+        """抓取一帧（距上一帧不足interval秒时跳过），失败时静默忽略"""
+        now = time.time()
+        if not force and self._last_capture is not None and now - self._last_capture < self.interval:
+            return False
+        try:
+            result = self.driver.execute_cdp_cmd("Page.captureScreenshot", {
+                "format": "jpeg",
+                "quality": self.quality,
+                "clip": self._clip(),
+            })
+        except Exception as e:
+            self.logger.debug(f"截图失败: {e}")
+            return False
+        data = (result or {}).get("data")
+        if not data:
+            return False
+        self._last_capture = now
+        self.captured += 1
+        self._queue.put(("frame", (now, label, data)))
+        return True
+
+    def flush(self, name, reason):
+        """把缓冲中的帧写盘（在工作线程中进行），写完后清空缓冲"""
+        self._queue.put(("flush", (name, reason)))
+
+    def reset(self):
+        """清空缓冲（在工作线程中进行，排在之前已抓取的帧之后）"""
+        self._queue.put(("reset", None))
+
+    def close(self):
+        """等待工作线程处理完队列后退出"""
+        self._queue.put(("stop", None))
+        self._worker.join(timeout=10)
+
+    def _clip(self):
+        # 视口大小只查询一次，缩放由截图区域的scale完成
+        if self._viewport is None:
+            width, height = 1280, 800
+            try:
+                metrics = self.driver.execute_cdp_cmd("Page.getLayoutMetrics", {}) or {}
+                viewport = metrics.get("cssLayoutViewport") or metrics.get("layoutViewport") or {}
+                width = viewport.get("clientWidth") or width
+                height = viewport.get("clientHeight") or height
+            except Exception:
+                pass
+            self._viewport = (width, height)
+        width, height = self._viewport
+        return {"x": 0, "y": 0, "width": width, "height": height, "scale": self.scale}
+
+    # 工作线程
+    def _work(self):
+        while True:
+            kind, payload = self._queue.get()
+            try:
+                if kind == "frame":
+                    timestamp, label, data = payload
+                    self.frames.append((timestamp, label, base64.b64decode(data)))
+                elif kind == "flush":
+                    self._write(*payload)
+                elif kind == "reset":
+                    self.frames.clear()
+                elif kind == "stop":
+                    return
+            except Exception as e:
+                self.logger.warning(f"处理截图失败: {e}")
+
+    def _write(self, name, reason):
+        if not self.frames:
+            return
+        directory = os.path.join(
+            self.output_dir, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{_safe_name(name)}_{_safe_name(reason)}")
+        os.makedirs(directory, exist_ok=True)
+        frames = list(self.frames)
+        self.frames.clear()
+        for i, (timestamp, label, image) in enumerate(frames):
+            stamp = datetime.fromtimestamp(timestamp).strftime("%H%M%S")
+            with open(os.path.join(directory, f"{i:02d}_{stamp}_{_safe_name(label)}.jpg"), "wb") as f:
+                f.write(image)
+        self.flushed.append(directory)
+        self.logger.info(f"📸 已保存最近 {len(frames)} 帧截图: {directory}")
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+课程学习状态机 - 把单个课程的学习流程拆成显式状态，并统计每个状态的耗时
+"""
+
+import time
+import logging
+
+
+class CourseState:
+    """单个课程学习流程中的状态"""
+    NAVIGATE = "navigate"          # 回到课程目录
+    CLICK = "click"                # 点击课程
+    PLAYER_READY = "player_ready"  # 等待播放器并点击播放
+    PLAYING = "playing"            # 播放中，定期检查状态
+    ENDED = "ended"                # 播放结束，处理人脸识别弹窗
+    CLEANUP = "cleanup"            # 切回主文档等收尾工作
+    NEXT = "next"                  # 终态，进入下一个课程
+
+    ORDER = [NAVIGATE, CLICK, PLAYER_READY, PLAYING, ENDED, CLEANUP, NEXT]
+
+
+class StateMetrics:
+    """各状态累计耗时、进入次数和超时次数"""
+
+    def __init__(self):
+        self.durations = {}
+        self.visits = {}
+        self.timeouts = {}
+
+    def add(self, state, seconds):
+        self.durations[state] = self.durations.get(state, 0.0) + seconds
+        self.visits[state] = self.visits.get(state, 0) + 1
+
+    def add_timeout(self, state):
+        self.timeouts[state] = self.timeouts.get(state, 0) + 1
+
+    def time_in(self, state):
+        return self.durations.get(state, 0.0)
+
+    @property
+    def total(self):
+        return sum(self.durations.values())
+
+    def merge(self, other):
+        for state, seconds in other.durations.items():
+            self.durations[state] = self.durations.get(state, 0.0) + seconds
+        for state, count in other.visits.items():
+            self.visits[state] = self.visits.get(state, 0) + count
+        for state, count in other.timeouts.items():
+            self.timeouts[state] = self.timeouts.get(state, 0) + count
+
+    def to_dict(self):
+        return {
+            state: {
+                "seconds": round(self.durations.get(state, 0.0), 3),
+                "visits": self.visits.get(state, 0),
+                "timeouts": self.timeouts.get(state, 0),
+            }
+            for state in CourseState.ORDER if state in self.visits
+        }
+
+    def histogram(self, width=30):
+        """返回各状态耗时的文本直方图（每行一个状态）"""
+        total = self.total
+        longest = max(self.durations.values(), default=0.0)
+        lines = []
+        for state in CourseState.ORDER:
+            if state not in self.visits:
+                continue
+            seconds = self.durations[state]
+            bar = "█" * (int(round(seconds / longest * width)) if longest > 0 else 0)
+            percent = seconds / total * 100 if total > 0 else 0.0
+            timeouts = f" 超时{self.timeouts[state]}次" if self.timeouts.get(state) else ""
+            lines.append(f"{state:<13}{seconds:>9.1f}s {percent:>5.1f}% {bar}{timeouts}")
+        lines.append(f"{'total':<13}{total:>9.1f}s")
+        return lines
+
+
+class CourseContext:
+    """课程在状态机中流转时携带的数据"""
+
+    def __init__(self, course_info):
+        self.course_info = course_info
+        self.title = course_info.get('title', '')
+        self.result = False
+        self.steps = 0  # 当前状态已执行的步数，进入新状态时清零
+        self.state = None
+        self.state_entered = None  # 进入当前状态的时间
+        self.timeouts = {}  # 本课程专用的状态超时，优先于状态机的默认值
+        self.timed_out = None
+        self.metrics = None
+        self.recoveries = 0  # 超出时间预算后重新打开课程的次数
+        self.stall_reloads = 0  # 视频卡住后重新打开课程的次数
+        self.stall_exhausted = False  # 重新打开的次数已用完且播放、跳转都没能恢复，之后只等待时间预算
+
+        # 本节未完成的视频任务点序号，第一个为当前正在播放的
+        self.video_points = None
+
+        # 播放监控相关
+        self.playing_started = None
+        self.last_check_time = 0
+        self.last_video_status = "unknown"
+        self.popup_detected = False
+        self.budget_known = False
+        self.server_passed = False  # 播放器的进度上报响应中服务器已确认当前视频任务点完成
+
+        # 已播完的视频数，以及其中得到服务器确认的个数
+        self.videos_ended = 0
+        self.videos_confirmed = 0
+
+    def reset_playback(self):
+        """重新打开课程前清空播放监控数据"""
+        # 状态机在调用处理函数前就按累计时间检查超时，旧的预算必须清掉，重新进入播放时再按已用时间重新设置
+        self.timeouts.pop(CourseState.PLAYING, None)
+        self.playing_started = None
+        self.last_check_time = 0
+        self.last_video_status = "unknown"
+        self.popup_detected = False
+        self.budget_known = False
+        self.server_passed = False
+
+
+class CourseStateMachine:
+    """按状态处理函数驱动课程流程
+
+    handlers: {状态: handler(ctx) -> 下一个状态}，返回当前状态表示继续轮询。
+    timeouts: {状态: 秒}，按单个课程内该状态的累计时间计算，ctx.timeouts中的值优先。
+    on_timeout: on_timeout(ctx, state) -> 下一个状态，默认进入CLEANUP。
+    """
+
+    def __init__(self, handlers, timeouts=None, on_timeout=None, logger=None):
+        self.handlers = handlers
+        self.timeouts = timeouts or {}
+        self.on_timeout = on_timeout
+        self.logger = logger or logging.getLogger(__name__)
+        self.ctx = None  # 正在流转的课程（供状态接口读取）
+
+    def run(self, ctx, start=CourseState.NAVIGATE):
+        metrics = StateMetrics()
+        ctx.metrics = metrics
+        self.ctx = ctx
+        state = start
+        entered = time.time()
+        ctx.state = state
+        ctx.state_entered = entered
+        ctx.steps = 0
+
+        while state != CourseState.NEXT:
+            timeout = ctx.timeouts.get(state, self.timeouts.get(state))
+            spent = metrics.time_in(state) + time.time() - entered
+            if timeout is not None and spent >= timeout:
+                self.logger.warning(f"⏰ 状态 {state} 超时 ({timeout}秒)")
+                metrics.add_timeout(state)
+                ctx.timed_out = state
+                if self.on_timeout:
+                    next_state = self.on_timeout(ctx, state)
+                else:
+                    next_state = CourseState.CLEANUP
+                if next_state == state:
+                    next_state = CourseState.NEXT if state == CourseState.CLEANUP else CourseState.CLEANUP
+            else:
+                try:
+                    next_state = self.handlers[state](ctx)
+                except Exception as e:
+                    self.logger.error(f"状态 {state} 执行出错: {e}")
+                    ctx.result = False
+                    next_state = CourseState.NEXT if state == CourseState.CLEANUP else CourseState.CLEANUP
+
+            if next_state != state:
+                now = time.time()
+                metrics.add(state, now - entered)
+                self.logger.debug(f"状态切换: {state} -> {next_state} ({now - entered:.1f}秒)")
+                entered = now
+                ctx.state_entered = now
+                ctx.steps = 0
+                state = next_state
+                ctx.state = state
+            else:
+                ctx.steps += 1
+
+        return ctx
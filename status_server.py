@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+本地状态接口 - 无人值守运行时在浏览器或Prometheus中查看进度
+
+    GET /status    JSON：当前课程及序号、视频位置和倍速、状态及停留时间、预计剩余时间、各项计数
+    GET /metrics   Prometheus文本格式的同一组数据
+
+只监听127.0.0.1，在后台线程中运行；请求只读取学习程序已有的字段，从不调用WebDriver，
+因此不会阻塞或干扰学习流程。
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from selenium.webdriver.remote.webdriver import WebDriver
+from config import Config
+
+
+# 始终输出的计数（没有发生过时为0），值为Prometheus说明文字
+COUNTERS = {
+    "webdriver_calls": "WebDriver命令数",
+    "retries": "重试次数",
+    "retry_wait_seconds": "重试前等待的总秒数",
+    "stalls": "视频卡住次数",
+    "stall_recoveries": "卡住后恢复播放次数",
+    "budget_recover": "超出时间预算后重新打开课程次数",
+    "budget_skip": "超出时间预算后跳过课程次数",
+    "courses_completed": "完成课程数",
+    "courses_failed": "失败课程数",
+}
+
+
+def _memory_bytes():
+    """当前进程占用的内存（Linux为常驻内存，其他系统为峰值），无法获取时返回None"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except Exception:
+        return None
+
+
+def collect_status(learner, webdriver_calls=None):
+    """从学习程序的现有字段汇总状态（只读，不访问浏览器）"""
+    now = time.time()
+    timeline = learner.timeline
+    course = timeline.current
+    ctx = learner.course_machine.ctx
+
+    # 视频位置：按最后一次探测的位置和倍速推算到当前时间
+    video = None
+    current_remaining = None
+    if learner.last_video_probe is not None:
+        position, duration, rate = learner.last_video_probe
+        rate = rate or 1.0
+        if ctx is not None and ctx.last_video_status == "playing" and learner.last_video_probe_at:
+            position = min(duration, position + (now - learner.last_video_probe_at) * rate)
+        video = {"index": learner.current_video_index, "position": round(position, 1),
+                 "duration": round(duration, 1), "rate": rate}
+        current_remaining = max(0.0, duration - position) / rate
+
+    state = None
+    if ctx is not None and ctx.state is not None:
+        state = {"name": ctx.state, "seconds": round(now - ctx.state_entered, 1) if ctx.state_entered else None}
+
+    # 预计剩余时间：当前视频剩余 + 之后的课程数 × 已完成课程的平均耗时
+    finished = [c.wall_seconds for c in list(timeline.courses) if c.result is not None and c.wall_seconds]
+    remaining_courses = max(0, learner.course_total - learner.course_position)
+    eta = None
+    if finished or remaining_courses == 0:
+        average = sum(finished) / len(finished) if finished else 0.0
+        eta = round((current_remaining or 0.0) + remaining_courses * average, 1)
+
+    if webdriver_calls is None:
+        webdriver_calls = getattr(learner.driver, "command_total", None)
+
+    return {
+        "time": now,
+        "uptime_seconds": round(now - timeline.started, 1) if timeline.started else None,
+        "course": {
+            "title": course.title if course is not None else None,
+            "chapter_number": course.chapter_number if course is not None else None,
+            "index": learner.course_position,
+            "total": learner.course_total,
+        },
+        "video": video,
+        "state": state,
+        "eta_seconds": eta,
+        "counters": {
+            **{name: learner.counters.get(name, 0) for name in COUNTERS},
+            "webdriver_calls": webdriver_calls,
+            "retries": sum(c.retries for c in list(timeline.courses)),
+            "retry_wait_seconds": round(learner.retry.total_wait, 3),
+        },
+        "memory_bytes": _memory_bytes(),
+    }
+
+
+def to_prometheus(status):
+    """把collect_status的结果转成Prometheus文本格式"""
+    lines = []
+
+    def metric(name, value, help_text, kind="gauge", labels=""):
+        if value is None:
+            return
+        lines.append(f"# HELP chaoxing_{name} {help_text}")
+        lines.append(f"# TYPE chaoxing_{name} {kind}")
+        lines.append(f"chaoxing_{name}{labels} {value}")
+
+    course = status["course"]
+    title = (course["title"] or "").replace("\\", "\\\\").replace('"', '\\"')
+    metric("course_index", course["index"], "当前课程序号", labels=f'{{title="{title}"}}')
+    metric("course_total", course["total"], "本轮未完成课程数")
+    if status["video"]:
+        metric("video_position_seconds", status["video"]["position"], "视频当前位置")
+        metric("video_duration_seconds", status["video"]["duration"], "视频总时长")
+        metric("playback_rate", status["video"]["rate"], "播放倍速")
+    if status["state"]:
+        metric("state_seconds", status["state"]["seconds"], "在当前状态停留的时间",
+               labels=f'{{state="{status["state"]["name"]}"}}')
+    metric("eta_seconds", status["eta_seconds"], "预计剩余时间")
+    metric("uptime_seconds", status["uptime_seconds"], "已运行时间")
+    for name, value in status["counters"].items():
+        metric(f"{name}_total", value, COUNTERS.get(name, name), kind="counter")
+    metric("memory_bytes", status["memory_bytes"], "学习程序进程内存")
+    return "\n".join(lines) + "\n"
+
+
+class StatusServer:
+    """后台线程中的HTTP状态接口"""
+
+    def __init__(self, learner, host=None, port=None):
+        self.learner = learner
+        self.host = host or Config.STATUS_SERVER_HOST
+        self.port = Config.STATUS_SERVER_PORT if port is None else port
+        self.logger = logging.getLogger(__name__)
+        self.webdriver_calls = 0
+        self._server = None
+        self._thread = None
+        self._original_execute = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                try:
+                    status = collect_status(server.learner, server.current_webdriver_calls())
+                    if self.path.startswith("/metrics"):
+                        body, content_type = to_prometheus(status), "text/plain; version=0.0.4; charset=utf-8"
+                    elif self.path.startswith("/status") or self.path == "/":
+                        body, content_type = json.dumps(status, ensure_ascii=False, indent=2), "application/json; charset=utf-8"
+                    else:
+                        self.send_error(404)
+                        return
+                except Exception as e:
+                    server.logger.debug(f"生成状态失败: {e}")
+                    self.send_error(500)
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                server.logger.debug("状态接口: " + format % args)
+
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            self.logger.warning(f"状态接口启动失败（{self.host}:{self.port}）: {e}")
+            return False
+        self._server.daemon_threads = True
+        self._install_hook()
+        self._thread = threading.Thread(target=self._server.serve_forever, name="status-server", daemon=True)
+        self._thread.start()
+        self.logger.info(f"📡 状态接口已启动: {self.url}/status  {self.url}/metrics")
+        return True
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._remove_hook()
+        self._server = None
+
+    def current_webdriver_calls(self):
+        # 假驱动自己计数，真实驱动按WebDriver.execute钩子计数
+        return getattr(self.learner.driver, "command_total", self.webdriver_calls)
+
+    def _install_hook(self):
+        server = self
+        self._original_execute = WebDriver.execute
+        original_execute = self._original_execute
+
+        def execute(driver, driver_command, params=None):
+            server.webdriver_calls += 1
+            return original_execute(driver, driver_command, params)
+
+        WebDriver.execute = execute
+
+    def _remove_hook(self):
+        if self._original_execute is not None:
+            WebDriver.execute = self._original_execute
+            self._original_execute = None
@@ -102,6 +102,17 @@ def test_browser_setup():
         print(f"❌ 浏览器设置测试失败: {e}")
         return False
 
+def test_preflight():
+    """启动前检查（并行检查依赖、配置、ChromeDriver、版本匹配和课程站点）"""
+    print("\n🔍 启动前检查...")
+    
+    try:
+        from preflight import run_preflight, print_preflight
+        return print_preflight(run_preflight())
+    except Exception as e:
+        print(f"❌ 启动前检查出错: {e}")
+        return False
+
 def main():
     """主测试函数"""
     print("=" * 50)
@@ -109,26 +120,39 @@ def main():
     print("=" * 50)
     
     tests = [
+        ("启动前检查", test_preflight),
         ("模块导入测试", test_imports),
         ("配置测试", test_config),
         ("浏览器设置测试", test_browser_setup),
     ]
     
+    # 需要启动浏览器的测试，启动前检查未通过时跳过
+    browser_tests = {test_browser_setup}
+    
     passed = 0
     total = len(tests)
+    preflight_ok = True
     
     for test_name, test_func in tests:
         print(f"\n📋 {test_name}")
         print("-" * 30)
         
+        if not preflight_ok and test_func in browser_tests:
+            print(f"⏭️ 启动前检查未通过，跳过{test_name}（不启动浏览器）")
+            continue
+        
         try:
-            if test_func():
-                print(f"✅ {test_name} 通过")
-                passed += 1
-            else:
-                print(f"❌ {test_name} 失败")
+            ok = test_func()
         except Exception as e:
             print(f"❌ {test_name} 出错: {e}")
+            ok = None
+        if ok:
+            print(f"✅ {test_name} 通过")
+            passed += 1
+        elif ok is not None:
+            print(f"❌ {test_name} 失败")
+        if test_func is test_preflight:
+            preflight_ok = bool(ok)
     
     print("\n" + "=" * 50)
     print(f"📊 测试结果: {passed}/{total} 通过")
@@ -14,6 +14,7 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
 from config import Config
+from profiler import profile_from_argv
 
 # 配置日志
 logging.basicConfig(
@@ -232,5 +233,6 @@ class CourseClickTester:
                 self.driver.quit()
 
 if __name__ == "__main__":
-    tester = CourseClickTester()
-    tester.run() 
\ No newline at end of file
+    with profile_from_argv("test_course_click"):
+        tester = CourseClickTester()
+        tester.run() 
\ No newline at end of file
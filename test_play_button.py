@@ -14,6 +14,7 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
 from config import Config
+from profiler import profile_from_argv
 
 # 配置日志
 logging.basicConfig(
@@ -448,5 +449,6 @@ class PlayButtonTester:
                 self.driver.quit()
 
 if __name__ == "__main__":
-    tester = PlayButtonTester()
-    tester.run() 
\ No newline at end of file
+    with profile_from_argv("test_play_button"):
+        tester = PlayButtonTester()
+        tester.run() 
\ No newline at end of file
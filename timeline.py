@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+"""
+课程时间线报告 - 记录每个课程各关键节点的时间，输出JSON/CSV和静态HTML汇总
+
+效率 = 理论最短时间（视频时长 / 播放倍速）/ 实际耗时，
+开销 = 实际耗时 - 理论最短时间。
+"""
+
+import os
+import csv
+import json
+import html
+import time
+import logging
+from datetime import datetime
+from config import Config
+
+# 课程时间线上的关键节点（按正常顺序）
+TIMELINE_EVENTS = ["click", "player_ready", "first_frame", "rate_set", "ended", "next"]
+
+
+def parse_playback_rate(speed):
+    """把"2x"之类的播放速度配置转成数字"""
+    try:
+        return float(str(speed).lower().rstrip("x"))
+    except ValueError:
+        return 1.0
+
+
+class CourseTimeline:
+    """单个课程的时间线"""
+
+    def __init__(self, title, chapter_number="", index=0, playback_rate=1.0, course_url=""):
+        self.title = title
+        self.chapter_number = chapter_number
+        self.course_url = course_url  # 所属课程主页（一次运行学习多个课程主页时区分）
+        self.index = index
+        self.playback_rate = playback_rate
+        self.started = None
+        self.events = {}
+        self.video_duration = None  # 本节所有视频任务点时长之和
+        self.video_durations = {}
+        self.retries = 0
+        self.retry_seconds = 0.0  # 重试前等待的总时间
+        self.fallbacks = {}
+        self.result = None
+        self.state_metrics = None
+        self.budget_seconds = None
+        self.budget_actions = []  # 超出时间预算后的处理: recover / skip
+        self.bytes_received = None  # 学习本课程期间浏览器从网络收到的字节数
+
+    def start(self, timestamp=None):
+        self.started = timestamp or time.time()
+
+    def mark(self, event, timestamp=None):
+        """记录节点时间，同一节点只保留第一次"""
+        if event not in self.events:
+            self.events[event] = timestamp or time.time()
+
+    def set_video_duration(self, index, duration):
+        self.video_durations[index] = duration
+        self.video_duration = sum(self.video_durations.values())
+
+    def add_fallback(self, name):
+        self.fallbacks[name] = self.fallbacks.get(name, 0) + 1
+
+    def add_retry(self, count=1, seconds=0.0):
+        self.retries += count
+        self.retry_seconds += seconds
+
+    @property
+    def studied(self):
+        return self.started is not None
+
+    @property
+    def wall_seconds(self):
+        if self.started is None:
+            return None
+        end = self.events.get("next") or time.time()
+        return end - self.started
+
+    @property
+    def ideal_seconds(self):
+        if not self.video_duration:
+            return None
+        return self.video_duration / self.playback_rate
+
+    @property
+    def overhead_seconds(self):
+        if self.wall_seconds is None or self.ideal_seconds is None:
+            return None
+        return self.wall_seconds - self.ideal_seconds
+
+    @property
+    def efficiency(self):
+        if not self.wall_seconds or self.ideal_seconds is None:
+            return None
+        return self.ideal_seconds / self.wall_seconds
+
+    def offsets(self):
+        """各节点相对课程开始的秒数"""
+        if self.started is None:
+            return {}
+        return {event: round(self.events[event] - self.started, 3) for event in TIMELINE_EVENTS if event in self.events}
+
+    def to_dict(self):
+        return {
+            "index": self.index,
+            "title": self.title,
+            "chapter_number": self.chapter_number,
+            "course_url": self.course_url,
+            "result": self.result,
+            "started": self.started,
+            "events": {event: self.events[event] for event in TIMELINE_EVENTS if event in self.events},
+            "offsets": self.offsets(),
+            "video_duration": self.video_duration,
+            "playback_rate": self.playback_rate,
+            "wall_seconds": _round(self.wall_seconds),
+            "ideal_seconds": _round(self.ideal_seconds),
+            "overhead_seconds": _round(self.overhead_seconds),
+            "efficiency": _round(self.efficiency, 4),
+            "retries": self.retries,
+            "retry_seconds": _round(self.retry_seconds),
+            "fallbacks": dict(self.fallbacks),
+            "budget_seconds": self.budget_seconds,
+            "budget_actions": list(self.budget_actions),
+            "bytes_received": self.bytes_received,
+            "states": self.state_metrics.to_dict() if self.state_metrics else {},
+        }
+
+
+def _round(value, digits=3):
+    return None if value is None else round(value, digits)
+
+
+class RunTimeline:
+    """一次运行中所有课程的时间线"""
+
+    def __init__(self, run_name="run", version="", playback_speed=None):
+        self.run_id = f"{run_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self.version = version
+        self.playback_rate = parse_playback_rate(playback_speed or Config.PLAYBACK_SPEED)
+        self.started = time.time()
+        self.finished = None
+        self.courses = []
+        self.current = None
+        self.course_url = ""  # 当前正在学习的课程主页，新登记的课程归属于它
+        self.logger = logging.getLogger(__name__)
+
+    def start(self):
+        """运行开始时调用，重置运行开始时间"""
+        self.started = time.time()
+        self.finished = None
+
+    def register_courses(self, course_infos):
+        """登记get_uncompleted_courses找到的课程，未学习的课程也会出现在报告里"""
+        for course_info in course_infos:
+            self._find_or_create(course_info)
+
+    def _find_or_create(self, course_info):
+        title = course_info.get('title', '')
+        chapter_number = course_info.get('chapter_number', '')
+        for course in self.courses:
+            if course.title == title and course.chapter_number == chapter_number and course.result is None \
+                    and course.course_url == self.course_url:
+                return course
+        course = CourseTimeline(title, chapter_number, len(self.courses), self.playback_rate, self.course_url)
+        self.courses.append(course)
+        return course
+
+    def start_course(self, course_info):
+        course = self._find_or_create(course_info)
+        if course.studied:
+            # 同一课程再次学习，单独记一行
+            course = CourseTimeline(course.title, course.chapter_number, len(self.courses), self.playback_rate,
+                                    course.course_url)
+            self.courses.append(course)
+        course.start()
+        self.current = course
+        return course
+
+    def finish_course(self, result, state_metrics=None):
+        course = self.current
+        if course is None:
+            return None
+        course.mark("next")
+        course.result = bool(result)
+        course.state_metrics = state_metrics
+        self.current = None
+        return course
+
+    def summary(self):
+        studied = [c for c in self.courses if c.studied]
+        wall = sum(c.wall_seconds for c in studied)
+        measured = [c for c in studied if c.ideal_seconds is not None]
+        ideal = sum(c.ideal_seconds for c in measured)
+        measured_wall = sum(c.wall_seconds for c in measured)
+        return {
+            "courses_found": len(self.courses),
+            "courses_studied": len(studied),
+            "courses_completed": sum(1 for c in studied if c.result),
+            "run_wall_seconds": _round((self.finished or time.time()) - self.started),
+            "course_wall_seconds": _round(wall),
+            "ideal_seconds": _round(ideal),
+            "overhead_seconds": _round(measured_wall - ideal) if measured else None,
+            "efficiency": _round(ideal / measured_wall, 4) if measured_wall else None,
+            "retries": sum(c.retries for c in studied),
+            "retry_seconds": _round(sum(c.retry_seconds for c in studied)),
+            "fallbacks": sum(sum(c.fallbacks.values()) for c in studied),
+            "bytes_received": sum(c.bytes_received for c in studied if c.bytes_received is not None)
+                              if any(c.bytes_received is not None for c in studied) else None,
+        }
+
+    def to_dict(self):
+        return {
+            "run_id": self.run_id,
+            "version": self.version,
+            "playback_speed": Config.PLAYBACK_SPEED,
+            "playback_rate": self.playback_rate,
+            "started": self.started,
+            "finished": self.finished,
+            "summary": self.summary(),
+            "courses": [c.to_dict() for c in self.courses],
+        }
+
+    # 输出
+    def write(self, output_dir=None):
+        """写出timeline.json、timeline.csv和report.html，返回输出目录"""
+        self.finished = self.finished or time.time()
+        output_dir = os.path.join(output_dir or Config.REPORT_DIR, self.run_id)
+        os.makedirs(output_dir, exist_ok=True)
+        data = self.to_dict()
+
+        with open(os.path.join(output_dir, "timeline.json"), "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        self._write_csv(os.path.join(output_dir, "timeline.csv"), data)
+        with open(os.path.join(output_dir, "report.html"), "w", encoding="utf-8") as f:
+            f.write(render_html(data))
+
+        summary = data["summary"]
+        efficiency = f"{summary['efficiency'] * 100:.1f}%" if summary["efficiency"] is not None else "未知"
+        self.logger.info(f"📈 课程时间线报告已保存: {output_dir}（效率 {efficiency}）")
+        return output_dir
+
+    @staticmethod
+    def _write_csv(path, data):
+        columns = ["index", "title", "chapter_number", "result"] + \
+                  [f"{event}_at" for event in TIMELINE_EVENTS] + \
+                  ["video_duration", "playback_rate", "wall_seconds", "ideal_seconds",
+                   "overhead_seconds", "efficiency", "retries", "retry_seconds", "fallbacks", "budget_seconds", "budget_actions",
+                   "bytes_received", "course_url"]
+        with open(path, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for course in data["courses"]:
+                row = [course["index"], course["title"], course["chapter_number"], course["result"]]
+                row += [course["offsets"].get(event, "") for event in TIMELINE_EVENTS]
+                row += [course["video_duration"], course["playback_rate"], course["wall_seconds"],
+                        course["ideal_seconds"], course["overhead_seconds"], course["efficiency"],
+                        course["retries"], course.get("retry_seconds"), _join_counts(course["fallbacks"]),
+                        course["budget_seconds"], ";".join(course["budget_actions"]), course["bytes_received"],
+                        course["course_url"]]
+                writer.writerow(["" if value is None else value for value in row])
+
+
+def _join_counts(counts, separator=";"):
+    return separator.join(f"{name}x{count}" if count > 1 else name for name, count in counts.items())
+
+
+def _fmt(value, suffix="s"):
+    return "-" if value is None else f"{value:.1f}{suffix}"
+
+
+def format_bytes(value):
+    if value is None:
+        return "-"
+    for unit in ["B", "KB", "MB"]:
+        if value < 1024:
+            return f"{value:.0f}{unit}" if unit == "B" else f"{value:.1f}{unit}"
+        value /= 1024
+    return f"{value:.2f}GB"
+
+
+def render_html(data):
+    """生成静态HTML汇总页（无外部依赖）"""
+    summary = data["summary"]
+    longest = max([c["wall_seconds"] or 0 for c in data["courses"]] + [1])
+    # 一次运行学习了多个课程主页时，在标题下注明所属主页
+    multiple_urls = len({c.get("course_url") or "" for c in data["courses"]}) > 1
+    rows = []
+    for course in data["courses"]:
+        wall = course["wall_seconds"] or 0
+        ideal = min(course["ideal_seconds"] or 0, wall)
+        ideal_width = ideal / longest * 100
+        overhead_width = (wall - ideal) / longest * 100
+        efficiency = "-" if course["efficiency"] is None else f"{course['efficiency'] * 100:.1f}%"
+        result = {True: "✅", False: "❌", None: "未学习"}[course["result"]]
+        events = " ".join(f"{event}@{offset:.0f}s" for event, offset in course["offsets"].items())
+        retry_wait = f"（{_fmt(course.get('retry_seconds'))}）" if course.get("retry_seconds") else ""
+        source = f"<br><small>{html.escape(course.get('course_url') or '')}</small>" if multiple_urls else ""
+        rows.append(
+            "<tr>"
+            f"<td>{course['index'] + 1}</td>"
+            f"<td>{html.escape(course['chapter_number'] or '')} {html.escape(course['title'])}{source}</td>"
+            f"<td>{result}</td>"
+            f"<td>{_fmt(course['video_duration'])}</td>"
+            f"<td>{_fmt(course['wall_seconds'])}</td>"
+            f"<td>{_fmt(course['ideal_seconds'])}</td>"
+            f"<td>{_fmt(course['overhead_seconds'])}</td>"
+            f"<td>{efficiency}</td>"
+            f"<td>{course['retries']}{retry_wait}</td>"
+            f"<td>{format_bytes(course['bytes_received'])}</td>"
+            f"<td>{html.escape(_join_counts(course['fallbacks'], ', ')) or '-'}"
+            f"{'<br>预算: ' + html.escape(', '.join(course['budget_actions'])) if course['budget_actions'] else ''}</td>"
+            f"<td class='bar'><span class='ideal' style='width:{ideal_width:.2f}%'></span>"
+            f"<span class='overhead' style='width:{overhead_width:.2f}%'></span>"
+            f"<div class='events'>{html.escape(events)}</div></td>"
+            "</tr>"
+        )
+    efficiency = "-" if summary["efficiency"] is None else f"{summary['efficiency'] * 100:.1f}%"
+    return f"""<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+<meta charset="utf-8">
+<title>学习时间线 {html.escape(data['run_id'])}</title>
+<style>
+body {{ font-family: sans-serif; margin: 24px; color: #222; }}
+table {{ border-collapse: collapse; width: 100%; font-size: 13px; }}
+th, td {{ border: 1px solid #ddd; padding: 4px 6px; text-align: left; vertical-align: top; }}
+th {{ background: #f4f4f4; }}
+.bar {{ min-width: 260px; }}
+.bar span {{ display: inline-block; height: 12px; }}
+.ideal {{ background: #4caf50; }}
+.overhead {{ background: #ff9800; }}
+.events {{ color: #777; font-size: 11px; }}
+.summary td {{ border: none; padding: 2px 12px 2px 0; }}
+</style>
+</head>
+<body>
+<h2>学习时间线 {html.escape(data['run_id'])}</h2>
+<table class="summary">
+<tr><td>版本</td><td>{html.escape(data['version'] or '-')}</td></tr>
+<tr><td>播放速度</td><td>{html.escape(str(data['playback_speed']))}</td></tr>
+<tr><td>课程</td><td>找到 {summary['courses_found']}，学习 {summary['courses_studied']}，完成 {summary['courses_completed']}</td></tr>
+<tr><td>总耗时</td><td>{_fmt(summary['run_wall_seconds'])}（课程内 {_fmt(summary['course_wall_seconds'])}）</td></tr>
+<tr><td>理论最短</td><td>{_fmt(summary['ideal_seconds'])}（视频时长 / 播放倍速）</td></tr>
+<tr><td>开销</td><td>{_fmt(summary['overhead_seconds'])}</td></tr>
+<tr><td>效率</td><td>{efficiency}</td></tr>
+<tr><td>重试 / 备用方案</td><td>{summary['retries']}（等待 {_fmt(summary.get('retry_seconds'))}）/ {summary['fallbacks']}</td></tr>
+<tr><td>网络流量</td><td>{format_bytes(summary['bytes_received'])}</td></tr>
+</table>
+<p><span class="bar"><span class="ideal" style="width:12px"></span></span> 理论最短时间
+<span class="bar"><span class="overhead" style="width:12px"></span></span> 开销</p>
+<table>
+<tr><th>#</th><th>课程</th><th>结果</th><th>视频时长</th><th>实际耗时</th><th>理论最短</th><th>开销</th>
+<th>效率</th><th>重试</th><th>流量</th><th>备用方案</th><th>时间线</th></tr>
+{''.join(rows)}
+</table>
+</body>
+</html>
+"""
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+运行追踪 - 把一次学习过程导出为Chrome trace-event格式（chrome://tracing 或 https://ui.perfetto.dev 可直接打开）
+
+用法：
+    with Tracer("run") as tracer:       # 开启追踪，退出时写出 traces/<运行名>_<时间>.json
+        ...
+    with span("study_course", title=...):  # 记录一个嵌套区间，未开启追踪时几乎没有开销
+        ...
+
+开启后每条WebDriver命令也会作为一个区间记录（查找元素时带上选择器）。
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import functools
+import threading
+from contextlib import nullcontext
+from datetime import datetime
+from selenium.webdriver.remote.webdriver import WebDriver
+from config import Config
+
+# 当前生效的追踪器，为None时span()直接返回空上下文
+_tracer = None
+_NULL_SPAN = nullcontext()
+
+
+def span(name, **args):
+    """记录一个区间；未开启追踪时返回共享的空上下文"""
+    if _tracer is None:
+        return _NULL_SPAN
+    return _Span(_tracer, name, args)
+
+
+def traced(name=None):
+    """把整个函数调用记录为一个区间的装饰器"""
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with _Span(_tracer, span_name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "args", "started")
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.started = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.add(self.name, self.started, time.perf_counter(), self.args)
+        return False
+
+
+class Tracer:
+    """收集区间并导出为trace-event JSON"""
+
+    def __init__(self, run_name="run", output_dir=None):
+        self.run_name = f"{run_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self.output_dir = output_dir or Config.TRACE_DIR
+        self.logger = logging.getLogger(__name__)
+        self.events = []
+        self.threads = {}
+        self.origin = None
+        self._lock = threading.Lock()
+        self._original_execute = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def start(self):
+        global _tracer
+        self.origin = time.perf_counter()
+        self._install_hook()
+        _tracer = self
+        self.logger.info(f"运行追踪已开启，结果目录: {self.output_dir}")
+
+    def stop(self):
+        global _tracer
+        if _tracer is self:
+            _tracer = None
+        self._remove_hook()
+        self.write()
+
+    def add(self, name, started, finished, args):
+        thread = threading.current_thread()
+        event = {
+            "name": name,
+            "cat": "webdriver" if name.startswith("webdriver:") else "learner",
+            "ph": "X",
+            "ts": round((started - self.origin) * 1e6, 1),
+            "dur": round((finished - started) * 1e6, 1),
+            "pid": os.getpid(),
+            "tid": thread.ident,
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self.threads.setdefault(thread.ident, thread.name)
+            self.events.append(event)
+
+    # WebDriver命令钩子
+    def _install_hook(self):
+        self._original_execute = WebDriver.execute
+        original_execute = self._original_execute
+
+        def execute(driver, driver_command, params=None):
+            if _tracer is None:
+                return original_execute(driver, driver_command, params)
+            args = {}
+            if params and "using" in params and "value" in params:
+                args["selector"] = f"{params['using']}={params['value']}"
+            with _Span(_tracer, f"webdriver:{driver_command}", args):
+                return original_execute(driver, driver_command, params)
+
+        WebDriver.execute = execute
+
+    def _remove_hook(self):
+        if self._original_execute is not None:
+            WebDriver.execute = self._original_execute
+            self._original_execute = None
+
+    def write(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"{self.run_name}.json")
+        metadata = [{"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": self.run_name}}]
+        metadata += [
+            {"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+            for tid, name in self.threads.items()
+        ]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": metadata + self.events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+        self.logger.info(f"运行追踪已保存: {path} ({len(self.events)} 个区间)")
+        return path
+
+
+def trace_from_argv(run_name, argv=None):
+    """命令行带--trace时返回Tracer，否则返回空上下文"""
+    argv = sys.argv[1:] if argv is None else argv
+    if "--trace" in argv:
+        return Tracer(run_name)
+    return nullcontext()
@@ -2,6 +2,7 @@ import time
 import random
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.keys import Keys
+from retry_policy import RetryPolicy
 
 def random_sleep(min_seconds=1, max_seconds=3):
     """随机等待时间，模拟人类行为"""
@@ -74,17 +75,9 @@ def handle_popup(driver):
     except Exception as e:
         print(f"处理弹窗时出错: {e}")
 
-def retry_operation(operation, max_retries=3, delay=2):
-    """重试操作"""
-    for attempt in range(max_retries):
-        try:
-            return operation()
-        except Exception as e:
-            if attempt == max_retries - 1:
-                raise e
-            print(f"操作失败，{delay}秒后重试... (尝试 {attempt + 1}/{max_retries})")
-            time.sleep(delay)
-            delay *= 2  # 指数退避
+def retry_operation(operation, max_retries=3, delay=2, exceptions=(Exception,)):
+    """重试操作（按统一的重试策略退避，见retry_policy.RetryPolicy）"""
+    return RetryPolicy(exceptions=exceptions, attempts=max_retries, base_delay=delay).call(operation)
 
 def handle_face_recognition_popup(driver, close_selector="a.popClose.fr"):
     """处理人脸识别弹窗"""